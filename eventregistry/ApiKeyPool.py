@@ -0,0 +1,179 @@
+"""
+the ApiKeyPool spreads the requests across multiple API keys.
+
+Each key has its own rate limiter (minimum delay between the requests made with the key) and its own
+statistics. Each request is made with the key that can be used the soonest and, among those, the key
+that has the most remaining tokens (as reported by the x-ratelimit-remaining header). Keys that have
+used up their tokens are rotated out and tried again after some time. Keys whose requests were rejected
+as too frequent (429 response) are not used for a short time, as requested by the Retry-After header.
+
+Use it by providing a list of keys or an instance of ApiKeyPool as the apiKey when creating EventRegistry:
+
+    er = EventRegistry(apiKey = ["key1", "key2", "key3"])
+"""
+import threading, time
+
+
+class ApiKeysExhaustedError(Exception):
+    """raised when all API keys in the pool have used up their available tokens"""
+    def __init__(self, message, retryTime = None):
+        Exception.__init__(self, message)
+        # time (as returned by time.time()) when the first of the keys will be tried again
+        self.retryTime = retryTime
+
+
+
+class ApiKeyPool(object):
+    def __init__(self, apiKeys, minDelayBetweenRequests = 0.5, exhaustedRetryInterval = 3600):
+        """
+        @param apiKeys: list of API keys to use
+        @param minDelayBetweenRequests: the minimum number of seconds between individual api calls made with the same key
+        @param exhaustedRetryInterval: number of seconds after which a key that has used up all tokens is tried again
+        """
+        assert isinstance(apiKeys, (list, tuple)) and len(apiKeys) > 0, "apiKeys should be a non-empty list of API keys"
+        self._minDelayBetweenRequests = minDelayBetweenRequests
+        self._exhaustedRetryInterval = exhaustedRetryInterval
+        self._keys = []
+        self._keyStats = {}
+        for key in apiKeys:
+            if key in self._keyStats:
+                continue
+            self._keys.append(key)
+            self._keyStats[key] = {
+                "requests": 0,
+                "failures": 0,
+                "tokens": 0,
+                "dailyTokens": -1,
+                "remainingTokens": -1,
+                "exhaustedTime": None,
+                "lastRequestTime": 0,
+                "backoffUntil": 0,
+                "lastLatency": None
+            }
+        self._lock = threading.Lock()
+
+
+    def getKeys(self):
+        """return the list of API keys in the pool"""
+        return list(self._keys)
+
+
+    def hasKey(self, apiKey):
+        return apiKey in self._keyStats
+
+
+    def getKeyStats(self, apiKey = None):
+        """
+        return the statistics (number of requests, failures, used tokens, remaining tokens, ...) for the key
+        @param apiKey: the key for which to return the stats. If None, return a dict with stats for all keys
+        """
+        with self._lock:
+            if apiKey is not None:
+                return dict(self._keyStats[apiKey])
+            return dict((key, dict(stats)) for key, stats in self._keyStats.items())
+
+
+    def getDailyTokens(self):
+        """return the sum of daily tokens of all keys for which the value is known (-1 if not known for any key)"""
+        return self._sumKnown("dailyTokens")
+
+
+    def getRemainingTokens(self):
+        """return the sum of remaining tokens of all keys for which the value is known (-1 if not known for any key)"""
+        return self._sumKnown("remainingTokens")
+
+
+    def acquireKey(self):
+        """
+        return the key that should be used for the next request. If needed, wait so that the key's minimum delay
+        between the requests is respected. Raises ApiKeysExhaustedError if all keys have used up their tokens
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                key = self._selectKey(now)
+                if key is None:
+                    retryTime = min(stats["exhaustedTime"] for stats in self._keyStats.values()) + self._exhaustedRetryInterval
+                    raise ApiKeysExhaustedError("All API keys in the pool have used up their available tokens. The first key will be tried again in %d seconds" % max(retryTime - now, 0), retryTime)
+                stats = self._keyStats[key]
+                wait = self._getWait(stats, now)
+                if wait <= 0:
+                    stats["lastRequestTime"] = now
+                    return key
+            time.sleep(wait)
+
+
+    def reportResponse(self, apiKey, statusCode, dailyTokens = -1, remainingTokens = -1, tokens = None, latency = None, retryAfter = None):
+        """
+        report the result of a request made using the key
+        @param apiKey: key used to make the request
+        @param statusCode: http status code of the response
+        @param dailyTokens: value of the x-ratelimit-limit header (-1 if not known)
+        @param remainingTokens: value of the x-ratelimit-remaining header (-1 if not known)
+        @param tokens: number of tokens used by the request (req-tokens header)
+        @param latency: duration of the request in seconds
+        @param retryAfter: number of seconds after which the request can be repeated (Retry-After header of a 429 response, None if not known)
+        """
+        if apiKey not in self._keyStats:
+            return
+        with self._lock:
+            stats = self._keyStats[apiKey]
+            stats["requests"] += 1
+            stats["lastLatency"] = latency
+            if statusCode != 200:
+                stats["failures"] += 1
+            if tokens:
+                stats["tokens"] += tokens
+            if dailyTokens >= 0:
+                stats["dailyTokens"] = dailyTokens
+            if remainingTokens >= 0:
+                stats["remainingTokens"] = remainingTokens
+            # no more tokens left - don't use the key for a long time
+            if remainingTokens == 0:
+                stats["exhaustedTime"] = time.time()
+            # 429 - too many requests made using the key. Wait only briefly before using it again
+            elif statusCode == 429:
+                stats["backoffUntil"] = time.time() + (retryAfter if retryAfter != None else self._minDelayBetweenRequests)
+            elif statusCode == 200:
+                stats["exhaustedTime"] = None
+
+
+    def reportFailure(self, apiKey):
+        """report that a request made with the key failed without a response"""
+        if apiKey not in self._keyStats:
+            return
+        with self._lock:
+            self._keyStats[apiKey]["failures"] += 1
+
+
+    #
+    # internal methods
+
+    def _selectKey(self, now):
+        """
+        return the usable key that can be used the soonest. Among the keys that can be used immediately,
+        return the one with the most remaining tokens
+        """
+        best = None
+        bestScore = None
+        for key in self._keys:
+            stats = self._keyStats[key]
+            if stats["exhaustedTime"] is not None and now - stats["exhaustedTime"] < self._exhaustedRetryInterval:
+                continue
+            wait = max(self._getWait(stats, now), 0)
+            # keys with unknown number of remaining tokens are tried first so that we learn their state
+            remaining = stats["remainingTokens"] if stats["remainingTokens"] >= 0 else float("inf")
+            score = (-wait, remaining)
+            if bestScore is None or score > bestScore:
+                best, bestScore = key, score
+        return best
+
+
+    def _getWait(self, stats, now):
+        """return the number of seconds until the key can be used again (<= 0 if it can be used now)"""
+        return max(stats["lastRequestTime"] + self._minDelayBetweenRequests, stats["backoffUntil"]) - now
+
+
+    def _sumKnown(self, name):
+        values = [stats[name] for stats in self._keyStats.values() if stats[name] >= 0]
+        return sum(values) if len(values) > 0 else -1
@@ -3,6 +3,10 @@ utility classes for Event Registry
 """
 
 import six, warnings, os, sys, re, datetime, time
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    from collections import MutableSequence
 
 
 mainLangs = ["eng", "deu", "zho", "slv", "spa"]
@@ -30,9 +34,16 @@ def deprecated(func):
 
 invalidCharRe = re.compile(r"[\x00-\x08]|\x0b|\x0c|\x0e|\x0f|[\x10-\x19]|[\x1a-\x1f]", re.IGNORECASE)
 def removeInvalidChars(text):
+    # most texts contain no control characters at all - checking that is much faster than searching for them
+    if not six.PY2 and isinstance(text, str) and text.isprintable():
+        return text
     return invalidCharRe.sub("", text)
 
 
+dateRe = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+dateTimeRe = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+
 def tryParseInt(s, base=10, val=None):
     try:
         return int(s, base)
@@ -44,23 +55,167 @@ class Struct(object):
     """
     helper class for converting dict to a native python object
     instead of a["b"]["c"] we can write a.b.c
+
+    the Struct is a view of the dict - the values are not copied. The nested dicts (and lists containing them) are
+    wrapped only when they are accessed, so creating a Struct is cheap also for large responses of which only a few
+    attributes are used. Setting an attribute changes the value in the dict. The lists of dicts (or lists) are returned
+    as StructList views, the lists of plain values are returned as they are.
     """
+    __slots__ = ("_data",)
+
     def __init__(self, data):
-        for name, value in data.items():
-            setattr(self, name, self._wrap(value))
+        object.__setattr__(self, "_data", data)
 
 
-    def _wrap(self, value):
-        if isinstance(value, (tuple, list, set, frozenset)):
-            return type(value)([self._wrap(v) for v in value])
-        else:
-            return Struct(value) if isinstance(value, dict) else value
+    def __getattr__(self, name):
+        # called only for the attributes that are not defined by the class. The special attributes are not looked up
+        # in the data (they are requested e.g. by copy and pickle, also before _data is set)
+        if name.startswith("__") or name == "_data":
+            raise AttributeError(name)
+        try:
+            return _wrapStructValue(self._data[name])
+        except KeyError:
+            raise AttributeError("'Struct' object has no attribute '%s'" % (name))
+
+
+    def __setattr__(self, name, value):
+        self._data[name] = _unwrapStructValue(value)
+
+
+    def __delattr__(self, name):
+        try:
+            del self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(self._data.keys()))
+
+
+    def __getstate__(self):
+        return self._data
+
+
+    def __setstate__(self, data):
+        object.__setattr__(self, "_data", data)
+
+
+    def __repr__(self):
+        return "Struct(%r)" % (self._data,)
 
 
     # does the object have the key
     def has(self, key):
-        return hasattr(self, key)
+        return key in self._data
+
+
+    def toDict(self):
+        """return the dict viewed by the Struct"""
+        return self._data
+
+
+
+class StructList(MutableSequence):
+    """
+    view of a list of dicts (or lists) returned by the Struct. The items are wrapped only when they are accessed, so
+    accessing the items by index is cheap. Setting, appending, inserting and deleting the items changes the viewed list.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return StructList(self._data[index])
+        return _wrapStructValue(self._data[index])
+
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._data[index] = [_unwrapStructValue(v) for v in value]
+        else:
+            self._data[index] = _unwrapStructValue(value)
+
+
+    def __delitem__(self, index):
+        del self._data[index]
+
+
+    def __iter__(self):
+        for value in self._data:
+            yield _wrapStructValue(value)
+
+
+    def __contains__(self, value):
+        return _unwrapStructValue(value) in self._data
+
+
+    def __eq__(self, other):
+        return self._data == _unwrapStructValue(other)
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+
+    def __getstate__(self):
+        return self._data
+
+
+    def __setstate__(self, data):
+        self._data = data
+
+
+    def __repr__(self):
+        return "StructList(%r)" % (self._data,)
+
+
+    def insert(self, index, value):
+        self._data.insert(index, _unwrapStructValue(value))
+
+
+    def index(self, value, *args):
+        return self._data.index(_unwrapStructValue(value), *args)
+
+
+    def count(self, value):
+        return self._data.count(_unwrapStructValue(value))
+
+
+    def toList(self):
+        """return the list viewed by the StructList"""
+        return self._data
+
+
+
+def _wrapStructValue(value):
+    if isinstance(value, dict):
+        return Struct(value)
+    # the lists are assumed to contain items of the same type - only the first item is checked so that
+    # accessing a long list stays cheap. The lists of plain values are returned as they are
+    if isinstance(value, list):
+        if len(value) > 0 and isinstance(value[0], (dict, tuple, list)):
+            return StructList(value)
+    elif isinstance(value, tuple):
+        if len(value) > 0 and isinstance(value[0], (dict, tuple, list)):
+            return tuple(_wrapStructValue(v) for v in value)
+    return value
+
 
+def _unwrapStructValue(value):
+    """return the dict or list viewed by the Struct or StructList (and other values as they are)"""
+    if isinstance(value, (Struct, StructList)):
+        return value._data
+    return value
 
 
 def createStructFromDict(data):
@@ -122,7 +277,7 @@ class QueryParamsBase(object):
         elif isinstance(val, datetime.date):
             return val.isoformat()
         elif isinstance(val, six.string_types):
-            assert re.match("^\d{4}-\d{2}-\d{2}$", val), "date value '%s' was not provided in the 'YYYY-MM-DD' format" % (val)
+            assert dateRe.match(val), "date value '%s' was not provided in the 'YYYY-MM-DD' format" % (val)
             return val
         raise AssertionError("date was not in the expected format")
 
@@ -137,7 +292,7 @@ class QueryParamsBase(object):
                 val = val.astimezone(pytz.utc)
             return val.isoformat()
         elif isinstance(val, six.string_types):
-            assert re.match("^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?$", val), "datetime value '%s' was not provided in the 'YYYY-MM-DDTHH:MM:SS.SSSS' format" % (val)
+            assert dateTimeRe.match(val), "datetime value '%s' was not provided in the 'YYYY-MM-DDTHH:MM:SS.SSSS' format" % (val)
             return val
         raise AssertionError("datetime was not in the recognizable data type. Use datetime or string in ISO format")
 
@@ -0,0 +1,277 @@
+"""
+the CassetteTransport records the requests sent to Event Registry and their responses to a cassette file and replays
+them later without making any network requests (and without using any tokens).
+
+The recorded interactions are keyed by the fingerprint of the request (see getRequestFingerprint()) - the path of the
+called method and the canonical form of its parameters. The api key and the host are not part of the fingerprint,
+so a cassette can be replayed without the api key and with any host. When the same request was recorded multiple times,
+its responses are replayed in the recorded order (the last one is repeated once all have been used). Requests that were
+not recorded get a response with the status 530 (invalid request), so that the client does not retry them.
+
+Queries with dates computed from the current date (e.g. the articles from the last 7 days) would be different on each day,
+so they would not be found in a cassette recorded on an earlier day. Each interaction is therefore also keyed by a second
+fingerprint, in which the dates in the parameters that are within a year of the day of the recording are replaced by
+their distance from that day ("today-7").
+A request that does not match any recorded request exactly is replayed if it matches on the relative dates - e.g.
+a query for the last 7 days recorded a month ago is replayed today. The queries with fixed dates are still matched exactly.
+Disable this using relativeDates = False.
+
+The cassette is a gzip compressed json file. The sessions of the transport can be used by parallel threads, both when
+recording and when replaying.
+
+    # record the interactions
+    transport = CassetteTransport("articles.cassette", mode = "record")
+    er = EventRegistry(apiKey = YOUR_API_KEY, transport = transport)
+    ...
+    transport.save()
+
+    # replay them (with the original durations of the requests)
+    er = EventRegistry(transport = CassetteTransport("articles.cassette", mode = "replay", speed = 1))
+
+The tests can be run with a cassette by setting the ER_TEST_CASSETTE environment variable to its file name. The cassette is
+recorded if the file does not exist yet and replayed otherwise.
+"""
+import json, gzip, time, zlib, re, datetime, threading, six
+from requests.structures import CaseInsensitiveDict
+
+from eventregistry.Transport import Transport, RequestsTransport
+from eventregistry.QueryFingerprint import getRequestFingerprint, jsonEncodedParams
+
+
+# response headers that are not recorded (the replayed bodies are not compressed and the cookies are not needed)
+skippedHeaders = set(["content-encoding", "content-length", "transfer-encoding", "set-cookie"])
+# date (optionally followed by the time) in the parameters of a request
+_dateRe = re.compile(r"^(\d{4}-\d{2}-\d{2})(T[\d:.]*Z?)?$")
+# only the dates at most this many days from today are considered relative to today (the older dates are fixed)
+relativeDateWindow = 366
+
+
+class CassetteResponse(object):
+    """replayed response with the interface of requests.Response used by the client"""
+    def __init__(self, status, headers, text):
+        self.status_code = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+
+    @property
+    def content(self):
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+
+class _CassetteSession(object):
+    """session created by the CassetteTransport. Records the requests sent using the wrapped session or replays them"""
+    def __init__(self, cassette, session):
+        self._cassette = cassette
+        self._session = session
+
+
+    def post(self, url, json = None, data = None, content = None, headers = None, **kwargs):
+        # the compressed request bodies are decoded to compute the fingerprint of the request
+        body = content if content is not None else data
+        params = json if body is None else _decodeBody(body, (headers or {}).get("Content-Encoding"))
+        kwargs.update(dict((key, val) for key, val in [("json", json), ("data", data), ("content", content), ("headers", headers)] if val is not None))
+        return self._cassette._request(self._session, "POST", url, params, kwargs)
+
+
+    def get(self, url, **kwargs):
+        return self._cassette._request(self._session, "GET", url, None, kwargs)
+
+
+    def close(self):
+        if self._session != None:
+            self._session.close()
+
+
+
+class CassetteTransport(Transport):
+    def __init__(self,
+                 fileName,
+                 mode = "auto",
+                 speed = None,
+                 transport = None,
+                 relativeDates = True):
+        """
+        @param fileName: name of the cassette file
+        @param mode: "record" (send the requests using the transport and record them), "replay" (respond with the recorded responses)
+            or "auto" (replay if the cassette file exists, otherwise record)
+        @param speed: when replaying, the responses are delayed by the recorded durations of the requests divided by speed
+            (1 for the original timing, 10 to replay 10 times faster). If None, the responses are returned without a delay
+        @param transport: transport used to send the requests when recording. If None, RequestsTransport is used
+        @param relativeDates: when replaying, a request that was not recorded is replayed if it matches a recorded request
+            after the recent dates in both are replaced by their distance from the day of the request (recording)
+        """
+        assert mode in ["record", "replay", "auto"], "mode should be record, replay or auto"
+        assert speed is None or speed > 0, "speed should be a positive number"
+        self._fileName = fileName
+        self._speed = speed
+        self._relativeDates = relativeDates
+        self._lock = threading.Lock()
+        # fingerprint -> list of the recorded interactions
+        self._interactions = {}
+        # fingerprint with relative dates -> fingerprint of the recorded interactions
+        self._relativeFingerprints = {}
+        # fingerprint -> number of the replayed interactions
+        self._replayCounts = {}
+        self._missCount = 0
+        if mode == "auto":
+            try:
+                self._load()
+                mode = "replay"
+            except IOError:
+                mode = "record"
+        elif mode == "replay":
+            self._load()
+        self._mode = mode
+        self._transport = (transport or RequestsTransport()) if mode == "record" else None
+        # the raw request bodies are passed to the sessions of the recording transport
+        self.bodyArgument = self._transport.bodyArgument if self._transport else Transport.bodyArgument
+
+
+    def getMode(self):
+        """return "record" or "replay" """
+        return self._mode
+
+
+    def newSession(self):
+        return _CassetteSession(self, self._transport.newSession() if self._transport else None)
+
+
+    def save(self, fileName = None):
+        """store the recorded interactions to the cassette file (or to the given fileName)"""
+        with self._lock:
+            interactions = [interaction for fingerprint in sorted(self._interactions) for interaction in self._interactions[fingerprint]]
+        with gzip.open(fileName or self._fileName, "wt", encoding = "utf-8") as f:
+            json.dump({ "version": 1, "interactions": interactions }, f)
+
+
+    def getStats(self):
+        """return the number of recorded interactions, the number of replayed responses and the number of requests that were not found in the cassette"""
+        with self._lock:
+            return {
+                "interactions": sum(len(interactions) for interactions in self._interactions.values()),
+                "replayed": sum(self._replayCounts.values()),
+                "missed": self._missCount
+            }
+
+
+    def close(self):
+        if self._transport != None:
+            self._transport.close()
+
+
+    #
+    # internal methods
+
+    def _load(self):
+        with gzip.open(self._fileName, "rt", encoding = "utf-8") as f:
+            cassette = json.load(f)
+        for interaction in cassette["interactions"]:
+            self._interactions.setdefault(interaction["fingerprint"], []).append(interaction)
+            if interaction.get("relativeFingerprint"):
+                self._relativeFingerprints.setdefault(interaction["relativeFingerprint"], interaction["fingerprint"])
+
+
+    def _request(self, session, method, url, params, kwargs):
+        path = _getPath(url)
+        fingerprint = getRequestFingerprint(path, params)
+        relativeFingerprint = self._getRelativeFingerprint(path, params)
+        if self._mode == "replay":
+            return self._replay(fingerprint, relativeFingerprint, method, path)
+        startTime = time.time()
+        if method == "GET":
+            respInfo = session.get(url, **kwargs)
+        else:
+            respInfo = session.post(url, **kwargs)
+        interaction = {
+            "fingerprint": fingerprint,
+            "relativeFingerprint": relativeFingerprint,
+            "method": method,
+            "path": path,
+            "status": respInfo.status_code,
+            "headers": dict((key, val) for key, val in respInfo.headers.items() if key.lower() not in skippedHeaders),
+            "body": respInfo.text,
+            "duration": time.time() - startTime
+        }
+        with self._lock:
+            self._interactions.setdefault(fingerprint, []).append(interaction)
+        return respInfo
+
+
+    def _replay(self, fingerprint, relativeFingerprint, method, path):
+        with self._lock:
+            if fingerprint not in self._interactions and relativeFingerprint in self._relativeFingerprints:
+                fingerprint = self._relativeFingerprints[relativeFingerprint]
+            interactions = self._interactions.get(fingerprint)
+            if not interactions:
+                self._missCount += 1
+                interaction = None
+            else:
+                index = self._replayCounts.get(fingerprint, 0)
+                self._replayCounts[fingerprint] = index + 1
+                interaction = interactions[min(index, len(interactions) - 1)]
+        if interaction is None:
+            return CassetteResponse(530, {}, json.dumps({ "error": "The %s request to %s was not recorded in the cassette" % (method, path) }))
+        if self._speed != None:
+            time.sleep(interaction["duration"] / self._speed)
+        return CassetteResponse(interaction["status"], interaction["headers"], interaction["body"])
+
+
+    def _getRelativeFingerprint(self, path, params):
+        """return the fingerprint of the request in which the dates are replaced by their distance from today (None if there are no dates)"""
+        if not self._relativeDates or params is None:
+            return None
+        params = dict((key, json.loads(val) if key in jsonEncodedParams and isinstance(val, six.string_types) else val) for key, val in params.items())
+        state = { "dates": 0 }
+        relativeParams = _toRelativeDates(params, self._today(), state)
+        if state["dates"] == 0:
+            return None
+        return getRequestFingerprint(path, relativeParams)
+
+
+    def _today(self):
+        return datetime.date.today()
+
+
+
+def _getPath(url):
+    """return the path of the url (without the host)"""
+    if "://" in url:
+        url = url.split("://", 1)[1]
+        return "/" + url.split("/", 1)[1] if "/" in url else "/"
+    return url
+
+
+def _toRelativeDates(value, today, state):
+    """return the copy of the value in which the dates are replaced by their distance from today (e.g. "today-7")"""
+    if isinstance(value, dict):
+        return dict((key, _toRelativeDates(val, today, state)) for key, val in value.items())
+    if isinstance(value, list):
+        return [_toRelativeDates(val, today, state) for val in value]
+    if isinstance(value, six.string_types):
+        match = _dateRe.match(value)
+        if match:
+            try:
+                date = datetime.datetime.strptime(match.group(1), "%Y-%m-%d").date()
+            except ValueError:
+                return value
+            days = (date - today).days
+            if abs(days) > relativeDateWindow:
+                return value
+            state["dates"] += 1
+            return "today%+d%s" % (days, match.group(2) or "")
+    return value
+
+
+def _decodeBody(data, contentEncoding):
+    """return the json object sent as the (compressed) request body"""
+    if contentEncoding == "gzip":
+        data = zlib.decompress(data, 31)
+    elif contentEncoding == "deflate":
+        data = zlib.decompress(data)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
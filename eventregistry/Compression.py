@@ -0,0 +1,135 @@
+"""
+the RequestCompression compresses the bodies of large requests before they are sent to Event Registry.
+
+Some requests can be large - searching for thousands of article uris, the topic page definition that is sent with
+each page of results or long texts sent to the analytics service. When the json body of a request is larger
+than minSize bytes, it is compressed using gzip or deflate and sent with the corresponding Content-Encoding header.
+
+Compression is negotiated per host. If a host responds with 415 (Unsupported Media Type) or lists the encodings it
+accepts (Accept-Encoding response header) without the used one, the request is repeated without compression and the
+later requests to that host are not compressed.
+
+The responses can be compressed by the server using any of the encodings that can be decoded by the client
+(gzip, deflate and, when the brotli or zstandard modules are installed, br and zstd), as listed by getAcceptEncoding().
+
+Use it by providing an instance as the compression parameter when creating EventRegistry:
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, compression = RequestCompression(minSize = 4096))
+"""
+import json, zlib, threading
+
+
+def getAcceptEncoding():
+    """return the value of the Accept-Encoding header listing the response encodings that can be decoded"""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli
+        encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi
+            encodings.append("br")
+        except ImportError:
+            pass
+    try:
+        # the zstd responses are decoded only by urllib3 2.x
+        import zstandard
+        from urllib3.response import ZstdDecoder
+        encodings.append("zstd")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+
+
+class RequestCompression(object):
+    def __init__(self,
+                 minSize = 1024,
+                 method = "gzip",
+                 level = 6):
+        """
+        @param minSize: the request bodies larger than minSize bytes are compressed
+        @param method: compression method to use - "gzip" or "deflate"
+        @param level: compression level (1 - fastest, 9 - best compression)
+        """
+        assert method in ["gzip", "deflate"], "method should be gzip or deflate"
+        assert 1 <= level <= 9, "level should be between 1 and 9"
+        self._minSize = minSize
+        self._method = method
+        self._level = level
+        self._acceptEncoding = getAcceptEncoding()
+        self._unsupportedHosts = set()
+        self._compressedCount = 0
+        self._uncompressedCount = 0
+        self._originalBytes = 0
+        self._compressedBytes = 0
+        self._lock = threading.Lock()
+
+
+    def isSupported(self, host):
+        """can the requests to the host be compressed"""
+        return host not in self._unsupportedHosts
+
+
+    def encodeBody(self, host, paramDict):
+        """
+        return the headers and the body of the request to the host
+        @returns: tuple (headers, data). data is None if the body should not be compressed (the paramDict should be sent as json)
+        """
+        headers = { "Accept-Encoding": self._acceptEncoding }
+        if not self.isSupported(host):
+            self._addStats(False)
+            return headers, None
+        data = json.dumps(paramDict).encode("utf-8")
+        if len(data) < self._minSize:
+            self._addStats(False)
+            return headers, None
+        # wbits = 31 produces the gzip format, 15 the zlib format used for the "deflate" content encoding
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, 31 if self._method == "gzip" else 15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self._addStats(True, len(data), len(compressed))
+        headers["Content-Type"] = "application/json"
+        headers["Content-Encoding"] = self._method
+        return headers, compressed
+
+
+    def checkResponse(self, host, respInfo, compressed):
+        """
+        check if the host accepted the compressed request
+        @param host: host to which the request was made
+        @param respInfo: the response to the request
+        @param compressed: was the body of the request compressed
+        @returns: False if the request was compressed but the host does not support it and the request should be repeated without compression
+        """
+        acceptEncoding = respInfo.headers.get("Accept-Encoding") if respInfo.headers != None else None
+        if acceptEncoding != None and self._method not in [enc.strip().split(";")[0] for enc in acceptEncoding.lower().split(",")]:
+            self._unsupportedHosts.add(host)
+        if compressed and respInfo.status_code == 415:
+            self._unsupportedHosts.add(host)
+            return False
+        return True
+
+
+    def getStats(self):
+        """return the number of compressed and uncompressed requests and the number of bytes of the compressed bodies before and after compression"""
+        with self._lock:
+            return {
+                "compressed": self._compressedCount,
+                "uncompressed": self._uncompressedCount,
+                "originalBytes": self._originalBytes,
+                "compressedBytes": self._compressedBytes,
+                "unsupportedHosts": sorted(self._unsupportedHosts)
+            }
+
+
+    #
+    # internal methods
+
+    def _addStats(self, compressed, originalBytes = 0, compressedBytes = 0):
+        with self._lock:
+            if compressed:
+                self._compressedCount += 1
+                self._originalBytes += originalBytes
+                self._compressedBytes += compressedBytes
+            else:
+                self._uncompressedCount += 1
@@ -0,0 +1,129 @@
+"""
+the AdaptiveConcurrencyLimiter controls how many requests can be executed in parallel.
+
+The limit is adapted using the AIMD (additive increase, multiplicative decrease) scheme: while the requests
+complete successfully and their latency stays close to the usual latency, the limit is slowly increased (by
+about one request per round trip). When the backend responds with 429 (too many requests) or a server error,
+when a request fails or its latency spikes, the limit is cut by the decreaseFactor.
+
+Use it by providing an instance as the concurrency parameter when creating EventRegistry. Requests made
+from multiple threads will then be executed in parallel (each thread uses its own session):
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, concurrency = AdaptiveConcurrencyLimiter(maxLimit = 8))
+"""
+import threading, time
+
+
+class AdaptiveConcurrencyLimiter(object):
+    def __init__(self,
+                 initialLimit = 2,
+                 minLimit = 1,
+                 maxLimit = 16,
+                 increase = 1,
+                 decreaseFactor = 0.5,
+                 latencyTolerance = 2.0,
+                 latencyAlpha = 0.05):
+        """
+        @param initialLimit: number of parallel requests allowed at the start
+        @param minLimit: the limit is never decreased below this value
+        @param maxLimit: the limit is never increased above this value
+        @param increase: by how much the limit is increased after limit successful requests (i.e. about once per round trip)
+        @param decreaseFactor: factor by which the limit is multiplied on 429 or 5xx responses, failures and latency spikes
+        @param latencyTolerance: a request is considered a latency spike if it takes more than latencyTolerance times the usual latency
+        @param latencyAlpha: weight of the latest latency when computing the usual (average) latency
+        """
+        assert 1 <= minLimit <= initialLimit <= maxLimit, "the limits should satisfy 1 <= minLimit <= initialLimit <= maxLimit"
+        assert 0 < decreaseFactor < 1, "decreaseFactor should be between 0 and 1"
+        self._minLimit = minLimit
+        self._maxLimit = maxLimit
+        self._increase = increase
+        self._decreaseFactor = decreaseFactor
+        self._latencyTolerance = latencyTolerance
+        self._latencyAlpha = latencyAlpha
+        self._limit = float(initialLimit)
+        self._inFlight = 0
+        self._avgLatency = None
+        self._lastDecreaseTime = 0
+        self._increaseCount = 0
+        self._decreaseCount = 0
+        self._cond = threading.Condition()
+
+
+    def getLimit(self):
+        """return the current number of requests that can be executed in parallel"""
+        return max(int(self._limit), self._minLimit)
+
+
+    def getInFlight(self):
+        """return the number of requests that are currently being executed"""
+        return self._inFlight
+
+
+    def getStats(self):
+        """return the current limit, the number of requests in flight, average latency and the number of increases and decreases of the limit"""
+        with self._cond:
+            return {
+                "limit": self.getLimit(),
+                "inFlight": self._inFlight,
+                "avgLatency": self._avgLatency,
+                "increases": self._increaseCount,
+                "decreases": self._decreaseCount
+            }
+
+
+    def acquire(self, timeout = None):
+        """
+        wait until the request can be executed without exceeding the limit
+        @param timeout: max number of seconds to wait. None to wait indefinitely
+        @returns True if the request can be executed, False if the timeout has passed
+        """
+        endTime = None if timeout == None else time.time() + timeout
+        with self._cond:
+            while self._inFlight >= self.getLimit():
+                remaining = None if endTime == None else endTime - time.time()
+                if remaining != None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._inFlight += 1
+        return True
+
+
+    def release(self):
+        """report that the request has completed and let the waiting requests continue"""
+        with self._cond:
+            self._inFlight = max(self._inFlight - 1, 0)
+            self._cond.notify_all()
+
+
+    def reportResult(self, latency = None, statusCode = None):
+        """
+        report the outcome of a request attempt and adapt the limit accordingly
+        @param latency: duration of the request in seconds
+        @param statusCode: http status code of the response. None if the request failed without a response
+        """
+        with self._cond:
+            overloaded = statusCode == None or statusCode == 429 or statusCode >= 500
+            spike = latency != None and self._avgLatency != None and latency > self._latencyTolerance * self._avgLatency
+            if overloaded or spike:
+                self._decrease()
+            elif statusCode == 200:
+                self._limit = min(self._limit + float(self._increase) / max(self._limit, 1), self._maxLimit)
+                self._increaseCount += 1
+            # latency spikes are not included in the usual latency
+            if latency != None and statusCode == 200 and not spike:
+                self._avgLatency = latency if self._avgLatency == None else self._latencyAlpha * latency + (1 - self._latencyAlpha) * self._avgLatency
+            self._cond.notify_all()
+
+
+    #
+    # internal methods
+
+    def _decrease(self):
+        # the requests that were in flight at the time of the previous decrease report the same overload -
+        # decrease the limit at most once per round trip
+        now = time.time()
+        if now - self._lastDecreaseTime < (self._avgLatency or 0):
+            return
+        self._lastDecreaseTime = now
+        self._limit = max(self._limit * self._decreaseFactor, self._minLimit)
+        self._decreaseCount += 1
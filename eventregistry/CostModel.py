@@ -0,0 +1,66 @@
+"""
+the RequestCostModel learns from the responses what is the cost (in tokens) of requests made to different endpoints.
+The cost of each request is reported by Event Registry in the 'req-tokens' response header, while the
+'req-archive' header reports if the request was executed on the archive data.
+"""
+import threading
+
+from eventregistry.Base import tryParseInt
+
+
+class RequestCostModel(object):
+    def __init__(self,
+                 defaultTokensPerRequest = 1,
+                 defaultArchiveTokensPerRequest = 5):
+        """
+        @param defaultTokensPerRequest: assumed number of tokens per request on recent data, used until the cost of requests to the endpoint is observed
+        @param defaultArchiveTokensPerRequest: assumed number of tokens per request executed on the archive, used until the cost of such requests is observed
+        """
+        self._defaultTokens = { False: defaultTokensPerRequest, True: defaultArchiveTokensPerRequest }
+        # (methodUrl, usedArchive) -> [number of observed requests, total used tokens]
+        self._observations = {}
+        self._lock = threading.Lock()
+
+
+    def addObservation(self, methodUrl, tokens, usedArchive = False):
+        """
+        remember the cost of an executed request
+        @param methodUrl: url on er (e.g. "/api/v1/article")
+        @param tokens: number of tokens used by the request (value of the 'req-tokens' header). Ignored if None or not a number
+        @param usedArchive: was the archive used for the request (value of the 'req-archive' header)
+        """
+        if tokens is None:
+            return
+        if not isinstance(tokens, (int, float)):
+            tokens = tryParseInt(tokens, val = None)
+            if tokens is None:
+                return
+        with self._lock:
+            obs = self._observations.setdefault((methodUrl, bool(usedArchive)), [0, 0])
+            obs[0] += 1
+            obs[1] += tokens
+
+
+    def getObservationCount(self, methodUrl, usedArchive = False):
+        """return the number of observed requests to the endpoint"""
+        return self._observations.get((methodUrl, bool(usedArchive)), [0, 0])[0]
+
+
+    def estimateTokensPerRequest(self, methodUrl, usedArchive = False):
+        """
+        return the expected number of tokens for a single request to the endpoint
+        @param methodUrl: url on er (e.g. "/api/v1/article")
+        @param usedArchive: will the request be executed on the archive
+        """
+        with self._lock:
+            count, tokens = self._observations.get((methodUrl, bool(usedArchive)), [0, 0])
+        if count == 0:
+            return self._defaultTokens[bool(usedArchive)]
+        return float(tokens) / count
+
+
+    def estimateTokens(self, methodUrl, requestCount, usedArchive = False):
+        """
+        return the expected number of tokens for requestCount requests to the endpoint
+        """
+        return requestCount * self.estimateTokensPerRequest(methodUrl, usedArchive)
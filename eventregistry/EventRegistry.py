@@ -2,10 +2,27 @@
 main class responsible for obtaining results from the Event Registry
 """
 import six, os, sys, traceback, json, re, requests, time
-import threading
+import threading, logging, tempfile
+from six.moves import queue
 
 from eventregistry.Base import *
 from eventregistry.ReturnInfo import *
+from eventregistry.CostModel import RequestCostModel
+from eventregistry.ApiKeyPool import ApiKeyPool, ApiKeysExhaustedError
+from eventregistry.HostPool import HostPool
+from eventregistry.Hedging import HedgePolicy
+from eventregistry.ConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from eventregistry.RequestScheduler import RequestScheduler
+from eventregistry.RequestContext import RequestContext, RequestTimeoutError, RequestCancelledError
+from eventregistry.Transport import RequestsTransport
+from eventregistry.Compression import RequestCompression
+from eventregistry.RequestLog import RequestLog, _getResponseSize
+from eventregistry.Metrics import MetricsRegistry, _getRequestSize
+from eventregistry.Tracing import noopSpan
+from eventregistry.Profiling import Profiler
+from eventregistry.QueryFingerprint import getQueryFingerprint
+
+logger = logging.getLogger(__name__)
 
 
 class EventRegistry(object):
@@ -22,23 +39,72 @@ class EventRegistry(object):
                  repeatFailedRequestCount = -1,
                  allowUseOfArchive = True,
                  verboseOutput = False,
-                 settingsFName = None):
+                 settingsFName = None,
+                 tokenBudget = None,
+                 retryDelay = 3,
+                 healthCheckInterval = None,
+                 hedging = None,
+                 requestTimeout = 60,
+                 callTimeout = None,
+                 concurrency = None,
+                 scheduler = None,
+                 transport = None,
+                 compression = None,
+                 metrics = None,
+                 tracer = None,
+                 profiler = None,
+                 versionCheck = True,
+                 versionCheckTtl = 86400):
         """
         @param apiKey: API key that should be used to make the requests to the Event Registry. API key is assigned to each user account and can be obtained on this page: http://eventregistry.org/me?tab=settings
+            To spread the requests over multiple API keys, provide a list of keys or an instance of ApiKeyPool
         @param host: host to use to access the Event Registry backend. Use None to use the default host.
-        @param hostAnalytics: the host address to use to perform the analytics api calls
-        @param logging: log all requests made to a 'requests_log.txt' file
+            To balance the requests over multiple hosts and fail over when a host is down, provide a list of hosts or an instance of HostPool
+        @param hostAnalytics: the host address to use to perform the analytics api calls. Can also be a list of hosts or an instance of HostPool
+        @param logging: if True, log all requests to the 'requests_log.jsonl' file in the current working directory. Can also be a path of the log file or an instance of RequestLog
         @param minDelayBetweenRequests: the minimum number of seconds between individual api calls
         @param repeatFailedRequestCount: if a request fails (for example, because ER is down), what is the max number of times the request should be repeated (-1 for indefinitely)
         @param allowUseOfArchive: default is True. Determines if the queries made should potentially be executed on the archive data. If False, all queries (regardless how the date conditions are set) will be
                 executed on data from the last 31 days. Queries executed on the archive are more expensive so set it to False if you are just interested in recent data
         @param verboseOutput: if True, additional info about query times etc will be printed to console
         @param settingsFName: If provided it should be a full path to 'settings.json' file where apiKey an/or host can be loaded from. If None, we will look for the settings file in the eventregistry module folder
-        """
-        self._host = host
-        self._hostAnalytics = hostAnalytics
+        @param tokenBudget: an optional instance of TokenBudgetManager that throttles or pauses the requests of less important jobs when the daily token budget is getting low
+        @param retryDelay: number of seconds to wait before repeating a failed request when there is no other healthy host to repeat it on
+        @param healthCheckInterval: if set, the health of the hosts is checked in a background thread every healthCheckInterval seconds
+        @param hedging: if True or an instance of HedgePolicy, slow requests to the read endpoints are hedged - a second copy of the request is sent
+            (to another host, if available) and the response that arrives first is used
+        @param requestTimeout: max number of seconds to wait for the response of a single request attempt. None to wait indefinitely
+            (a hung connection then blocks also the other requests that wait for it)
+        @param callTimeout: max number of seconds for a call (including all repeated attempts), after which RequestTimeoutError is raised.
+            None for no limit. A deadline for a group of calls can also be set using the RequestContext
+        @param concurrency: if set to an instance of AdaptiveConcurrencyLimiter (or True), the requests made from multiple threads are executed in parallel.
+            The number of parallel requests is adapted to the latency and errors of the responses. If None, a single request is executed at a time
+        @param scheduler: if set to an instance of RequestScheduler (or True), the waiting requests are executed in the order of their priority
+            and fairly shared among the tenants (as set in the RequestContext)
+        @param transport: an instance of Transport that creates the sessions used to send the requests. If None, RequestsTransport (requests.Session) is used.
+            Use Http2Transport to multiplex the parallel requests over a few HTTP/2 connections
+        @param compression: if True or an instance of RequestCompression, the bodies of large requests are compressed (if supported by the host)
+            and the compressed responses are accepted in all encodings that can be decoded
+        @param metrics: if True or an instance of MetricsRegistry, the latencies, sizes, tokens and wait times of the requests are recorded per endpoint
+        @param tracer: an instance of Tracer that records the spans of the executed queries, downloaded pages, request attempts and waiting
+        @param profiler: if True or an instance of Profiler, the CPU time and memory allocations of building the parameters, making the requests
+            and decoding the responses are measured and the memory is traced after each page downloaded by the iterators
+        @param versionCheck: if True, check in the background (when the first request is made) if there is a newer version of the module
+        @param versionCheckTtl: number of seconds for which the latest version obtained by the version check is cached on disk
+        """
+        # the settings file is read and the hosts are set up when they are needed for the first time (see _loadSettings())
+        self._hostArg = host
+        self._hostAnalyticsArg = hostAnalytics
+        self._settingsFName = settingsFName
+        self._healthCheckInterval = healthCheckInterval
+        self._settingsLock = threading.RLock()
+        self._versionCheck = versionCheck
+        self._versionCheckTtl = versionCheckTtl
+        self._versionCheckStarted = False
+        self._versionCacheFName = os.path.join(tempfile.gettempdir(), "eventregistry_version.json")
         self._lastException = None
-        self._logRequests = logging
+        self._requestLog = self._createRequestLog(logging)
+        self._customRequestLogs = {}
         self._minDelayBetweenRequests = minDelayBetweenRequests
         self._repeatFailedRequestCount = repeatFailedRequestCount
         self._allowUseOfArchive = allowUseOfArchive
@@ -47,40 +113,53 @@ class EventRegistry(object):
         self._headers = {}
         self._dailyAvailableRequests = -1
         self._remainingAvailableRequests = -1
+        # model of the token cost of the requests, learned from the response headers
+        self._costModel = RequestCostModel()
+        self._tokenBudget = tokenBudget
+        self._retryDelay = retryDelay
+        self._requestTimeout = requestTimeout
+        self._callTimeout = callTimeout
 
         # lock for making sure we make one request at a time - requests module otherwise sometimes returns incomplete json objects
         self._lock = threading.Lock()
-        self._reqSession = requests.Session()
-        self._apiKey = apiKey
+        self._transport = transport or RequestsTransport()
+        self._reqSession = self._transport.newSession()
+        # when the requests are executed in parallel, the limiter is used instead of the lock and each thread uses its own session
+        self._concurrencyLimiter = AdaptiveConcurrencyLimiter() if concurrency is True else (concurrency or None)
+        self._localSessions = threading.local()
+        self._rateLock = threading.Lock()
+        self._scheduler = RequestScheduler() if scheduler is True else (scheduler or None)
+        # the scheduler should allow as many requests in flight as the concurrency limiter
+        if self._scheduler and self._concurrencyLimiter:
+            self._scheduler.setMaxConcurrent(self._concurrencyLimiter.getLimit)
+        # analytics requests use their own lock and session so that they don't wait for the search requests
+        self._lockAnalytics = threading.Lock()
+        self._reqSessionAnalytics = self._transport.newSession()
+        self._healthCheckSession = None
+        # hedged requests are made in parallel so each of them uses its own session from this pool
+        self._hedgePolicy = HedgePolicy() if hedging is True else (hedging or None)
+        self._hedgeSessions = []
+        self._hedgeLock = threading.Lock()
+        self._compression = RequestCompression() if compression is True else (compression or None)
+        self._metrics = MetricsRegistry() if metrics is True else (metrics or None)
+        if self._metrics:
+            self._metrics.addCollector(self._collectMetrics)
+        self._tracer = tracer
+        self._profiler = Profiler() if profiler is True else (profiler or None)
+        # when multiple keys are provided, the requests are spread over them using the ApiKeyPool
+        if isinstance(apiKey, (list, tuple)):
+            apiKey = ApiKeyPool(apiKey, minDelayBetweenRequests = minDelayBetweenRequests)
+        self._apiKeyPool = apiKey if isinstance(apiKey, ApiKeyPool) else None
+        self._apiKeyArg = None if self._apiKeyPool else apiKey
         self._extraParams = None
 
-        # if there is a settings.json file in the directory then try using it to load the API key from it
-        # and to read the host name from it (if custom host is not specified)
-        currPath = os.path.split(os.path.realpath(__file__))[0]
-        settFName = settingsFName or os.path.join(currPath, "settings.json")
-        if apiKey:
-            print("using user provided API key for making requests")
-
-        if os.path.exists(settFName):
-            settings = json.load(open(settFName))
-            self._host = host or settings.get("host", "http://eventregistry.org")
-            self._hostAnalytics = hostAnalytics or settings.get("hostAnalytics", "http://analytics.eventregistry.org")
-            # if api key is set, then use it when making the requests
-            if "apiKey" in settings and not apiKey:
-                print("found apiKey in settings file which will be used for making requests")
-                self._apiKey = settings["apiKey"]
-        else:
-            self._host = host or "http://eventregistry.org"
-            self._hostAnalytics = hostAnalytics or "http://analytics.eventregistry.org"
-
-        if self._apiKey == None:
-            print("No API key was provided. You will be allowed to perform only a very limited number of requests per day.")
-        self._requestLogFName = os.path.join(currPath, "requests_log.txt")
 
-        print("Event Registry host: %s" % (self._host))
-        print("Text analytics host: %s" % (self._hostAnalytics))
-        # check what is the version of your module compared to the latest one
-        self.checkVersion()
+    def __getattr__(self, name):
+        # the API key and the hosts are set up when they are accessed for the first time
+        if name in ("_apiKey", "_host", "_hostAnalytics", "_hostPool", "_hostAnalyticsPool") and "_settingsLock" in self.__dict__:
+            self._loadSettings()
+            return self.__dict__[name]
+        raise AttributeError(name)
 
 
     def checkVersion(self):
@@ -88,17 +167,14 @@ class EventRegistry(object):
         check what is the latest version of the python sdk and report in case there is a newer version
         """
         try:
-            respInfo = self._reqSession.get(self._host + "/static/pythonSDKVersion.txt")
-            if respInfo.status_code != 200 or len(respInfo.text) > 20:
+            latestVersion = self._getLatestVersion()
+            if latestVersion == None:
                 return
-            latestVersion = respInfo.text.strip()
             import eventregistry._version as _version
             currentVersion = _version.__version__
             for (latest, current) in zip(latestVersion.split("."), currentVersion.split(".")):
                 if int(latest) > int(current):
-                    print("==============\nYour version of the module is outdated, please update to the latest version")
-                    print("Your version is %s while the latest is %s" % (currentVersion, latestVersion))
-                    print("Update by calling: pip install --upgrade eventregistry\n==============")
+                    logger.warning("Your version of the module (%s) is outdated, the latest version is %s. Update by calling: pip install --upgrade eventregistry", currentVersion, latestVersion)
                     return
                 # in case the server mistakenly has a lower version that the user has, don't report an error
                 elif int(latest) < int(current):
@@ -108,8 +184,13 @@ class EventRegistry(object):
 
 
     def setLogging(self, val):
-        """should all requests be logged to a file or not?"""
-        self._logRequests = val
+        """should all requests be logged to a file or not? val can also be a path of the log file or an instance of RequestLog"""
+        self._requestLog = self._createRequestLog(val)
+
+
+    def getRequestLog(self):
+        """return the RequestLog instance used to log the requests (or None if the requests are not logged)"""
+        return self._requestLog
 
 
     def setExtraParams(self, params):
@@ -122,6 +203,64 @@ class EventRegistry(object):
         return self._host
 
 
+    def getHostPool(self):
+        """return the HostPool instance with the hosts used for the search requests"""
+        return self._hostPool
+
+
+    def getScheduler(self):
+        """return the RequestScheduler instance that orders the waiting requests (or None if not used)"""
+        return self._scheduler
+
+
+    def getTransport(self):
+        """return the Transport instance that creates the sessions used to send the requests"""
+        return self._transport
+
+
+    def getMetrics(self):
+        """return the MetricsRegistry instance that records the metrics of the requests (or None if the metrics are not recorded)"""
+        return self._metrics
+
+
+    def getTracer(self):
+        """return the Tracer instance that records the spans (or None if tracing is not used)"""
+        return self._tracer
+
+
+    def getProfiler(self):
+        """return the Profiler instance that measures the phases of the requests (or None if profiling is not used)"""
+        return self._profiler
+
+
+    def getCompression(self):
+        """return the RequestCompression instance used to compress the large requests (or None if the requests are not compressed)"""
+        return self._compression
+
+
+    def getConcurrencyLimiter(self):
+        """return the AdaptiveConcurrencyLimiter instance used to execute the requests in parallel (or None if requests are executed one at a time)"""
+        return self._concurrencyLimiter
+
+
+    def getHedgePolicy(self):
+        """return the HedgePolicy instance used for hedging the requests (or None if the requests are not hedged)"""
+        return self._hedgePolicy
+
+
+    def getHostAnalyticsPool(self):
+        """return the HostPool instance with the hosts used for the analytics requests"""
+        return self._hostAnalyticsPool
+
+
+    def checkHostHealth(self):
+        """
+        check the health of all search and analytics hosts. Hosts that are not healthy are not used until they recover
+        """
+        self._hostPool.checkHealth(self._checkSearchHost)
+        self._hostAnalyticsPool.checkHealth(self._checkAnalyticsHost)
+
+
     def getLastException(self):
         """return the last exception"""
         return self._lastException
@@ -152,10 +291,27 @@ class EventRegistry(object):
 
 
     def getUsageInfo(self):
-        """return the number of used and total available tokens. Can be used at any time (also before making queries)"""
+        """
+        return the number of used and total available tokens. Can be used at any time (also before making queries)
+        If multiple API keys are used, the returned values are the sums for all keys
+        """
+        if self._apiKeyPool:
+            usage = { "availableTokens": 0, "usedTokens": 0 }
+            for apiKey in self._apiKeyPool.getKeys():
+                ret = self.jsonRequest("/api/v1/usage", { "apiKey": apiKey })
+                for name in usage:
+                    usage[name] += ret.get(name, 0)
+            return usage
         return self.jsonRequest("/api/v1/usage", { "apiKey": self._apiKey })
 
 
+    def getApiKeyPool(self):
+        """
+        return the ApiKeyPool instance used to spread the requests over multiple API keys (or None if a single key is used)
+        """
+        return self._apiKeyPool
+
+
     def getServiceStatus(self):
         """return the status of various services used in Event Registry pipeline"""
         return self.jsonRequest("/api/v1/getServiceStatus", {"apiKey": self._apiKey})
@@ -181,6 +337,7 @@ class EventRegistry(object):
     def getLastHeaders(self):
         """
         return the headers returned in the response object of the last executed request
+        (when requests are executed in parallel, the request that completed last)
         """
         return self._headers
 
@@ -208,6 +365,81 @@ class EventRegistry(object):
         return self.getLastHeader("req-archive", "0") == "1"
 
 
+    def getTokenBudget(self):
+        """
+        return the TokenBudgetManager instance used by this instance (or None if not used)
+        """
+        return self._tokenBudget
+
+
+    def getCostModel(self):
+        """
+        return the RequestCostModel instance with the token costs of the requests observed so far
+        """
+        return self._costModel
+
+
+    def explain(self, query, maxItems = -1, pageSize = None, shards = 1, allowUseOfArchive = None):
+        """
+        estimate the number of pages, requests and tokens that will be needed to download all results of the query.
+        Only a single cheap probe request (returning a single result) is made to obtain the number of matching results
+        and to check if the archive will be used. The cost per request is estimated from the costs of previous requests.
+        @param query: instance of QueryArticles, QueryArticlesIter, QueryEvents, QueryEventsIter or QueryEventArticlesIter
+        @param maxItems: the maximum number of items that will be downloaded (-1 for all matching items)
+        @param pageSize: number of items downloaded per request. If None, the page size used by the iterators is assumed
+        @param shards: number of parts into which the download will be split (each part is paged separately)
+        @param allowUseOfArchive: potentially override the value set when constructing EventRegistry class
+        @returns dict with the estimate, e.g. { "totalResults": 5000, "pages": 50, "requests": 50, "tokens": 50, "usesArchive": False, ... }
+        """
+        from eventregistry.QueryArticles import QueryArticles, RequestArticlesInfo
+        from eventregistry.QueryEvents import QueryEvents, RequestEventsInfo
+        from eventregistry.QueryEvent import QueryEventArticlesIter, RequestEventArticles
+        assert shards >= 1, "shards parameter should be at least 1"
+        if isinstance(query, QueryArticles):
+            probe, defaultPageSize = RequestArticlesInfo(page = 1, count = 1), 100
+            getResults = lambda res: res.get("articles", {})
+        elif isinstance(query, QueryEvents):
+            probe, defaultPageSize = RequestEventsInfo(page = 1, count = 1), 50
+            getResults = lambda res: res.get("events", {})
+        elif isinstance(query, QueryEventArticlesIter):
+            probe, defaultPageSize = RequestEventArticles(**dict(query.queryParams, page = 1, count = 1)), 100
+            getResults = lambda res: res.get(query.queryParams["eventUri"], {}).get("articles", {})
+        else:
+            assert False, "query parameter should be an instance of QueryArticles, QueryEvents or QueryEventArticlesIter (or their iterators)"
+        pageSize = pageSize or defaultPageSize
+
+        # make the probe request without modifying the result types requested by the query
+        resultTypeList = query.resultTypeList
+        query.resultTypeList = [probe]
+        try:
+            res = self.execQuery(query, allowUseOfArchive = allowUseOfArchive)
+        finally:
+            query.resultTypeList = resultTypeList
+        if "error" in res:
+            print("Error while computing the query estimate: " + res["error"])
+        totalResults = getResults(res).get("totalResults", 0)
+        usesArchive = self.getLastReqArchiveUse()
+        items = totalResults if maxItems < 0 else min(totalResults, maxItems)
+        # each shard downloads its part of the items page by page
+        itemsPerShard = (items + shards - 1) // shards
+        pages = shards * ((itemsPerShard + pageSize - 1) // pageSize) if items > 0 else 0
+        tokensPerRequest = self._costModel.estimateTokensPerRequest(query._getPath(), usesArchive)
+        return {
+            "endpoint": query._getPath(),
+            "totalResults": totalResults,
+            "items": items,
+            "pageSize": pageSize,
+            "shards": shards,
+            "pages": pages,
+            "requests": pages,
+            "usesArchive": usesArchive,
+            "tokensPerRequest": tokensPerRequest,
+            "tokens": pages * tokensPerRequest,
+            "probeTokens": tryParseInt(self.getLastHeader("req-tokens", ""), val = None),
+            "remainingAvailableRequests": self._remainingAvailableRequests
+        }
+
+
     def execQuery(self, query, allowUseOfArchive = None):
         """
         main method for executing the search queries.
@@ -218,9 +450,13 @@ class EventRegistry(object):
         """
         assert isinstance(query, QueryParamsBase), "query parameter should be an instance of a class that has Query as a base class, such as QueryArticles or QueryEvents"
         # don't modify original query params
-        allParams = query._getQueryParams()
-        # make the request
-        respInfo = self.jsonRequest(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive)
+        with self._phase("params"):
+            allParams = query._getQueryParams()
+        with self._span("execQuery", queryType = type(query).__name__) as span:
+            if self._tracer:
+                span.setAttribute("fingerprint", getQueryFingerprint(query))
+            # make the request
+            respInfo = self.jsonRequest(query._getPath(), allParams, allowUseOfArchive = allowUseOfArchive)
         return respInfo
 
 
@@ -234,77 +470,152 @@ class EventRegistry(object):
             If not None set it to boolean to determine if the request can be executed on the archive data or not
             If left to None then the value set in the EventRegistry constructor will be used
         """
-        self._sleepIfNecessary()
-        self._lastException = None
-
-        self._lock.acquire()
-        if self._logRequests:
-            try:
-                with open(customLogFName or self._requestLogFName, "a") as log:
-                    if paramDict != None:
-                        log.write("# " + json.dumps(paramDict) + "\n")
-                    log.write(methodUrl + "\n\n")
-            except Exception as ex:
-                self._lastException = ex
-
-        if paramDict == None:
-            paramDict = {}
-        # if we have api key then add it to the paramDict
-        if self._apiKey:
-            paramDict["apiKey"] = self._apiKey
-        # if we want to ignore the archive, set the flag
-        if allowUseOfArchive != None:
-            if not allowUseOfArchive:
+        context = RequestContext.getCurrent()
+        context.checkActive()
+        deadline = self._getDeadline(context)
+        # load the settings before waiting for the budget, the scheduler and the lock, so that an invalid settings file fails the call without holding them
+        self._loadSettings()
+        if self._versionCheck and not self._versionCheckStarted:
+            self._startVersionCheck()
+        waitStart = time.time()
+        # wait if the budget of tokens for requests of this priority is getting low
+        if self._tokenBudget:
+            self._tokenBudget.beforeRequest(self, methodUrl, paramDict, context, deadline)
+            waitStart = self._recordWait("budget", waitStart)
+        # wait until the scheduler allows the request to be made
+        if self._scheduler:
+            self._scheduler.acquire(deadline)
+            waitStart = self._recordWait("scheduler", waitStart)
+        lock = self._concurrencyLimiter or self._lock
+        locked = False
+        try:
+            # when using multiple keys, the delay between the requests is maintained for each key separately
+            if self._apiKeyPool is None:
+                self._sleepIfNecessary()
+                waitStart = self._recordWait("rate", waitStart)
+            self._acquireBeforeDeadline(lock, context, deadline)
+            locked = True
+            self._recordWait("lock", waitStart)
+            requestLog = self._getRequestLog(customLogFName)
+            if paramDict == None:
+                paramDict = {}
+            # if we have api key then add it to the paramDict
+            if self._apiKey:
+                paramDict["apiKey"] = self._apiKey
+            # if we want to ignore the archive, set the flag
+            if allowUseOfArchive != None:
+                if not allowUseOfArchive:
+                    paramDict["forceMaxDataTimeWindow"] = 31
+            # if we didn't override the parameter then check what we've set when constructing the EventRegistry class
+            elif self._allowUseOfArchive == False:
                 paramDict["forceMaxDataTimeWindow"] = 31
-        # if we didn't override the parameter then check what we've set when constructing the EventRegistry class
-        elif self._allowUseOfArchive == False:
-            paramDict["forceMaxDataTimeWindow"] = 31
-        # if we also have some extra parameters, then set those too
-        if self._extraParams:
-            paramDict.update(self._extraParams)
-
-        tryCount = 0
-        self._headers = {}  # reset any past data
-        returnData = None
-        respInfo = None
-        while self._repeatFailedRequestCount < 0 or tryCount < self._repeatFailedRequestCount:
-            tryCount += 1
-            try:
-                url = self._host + methodUrl
-
-                # make the request
-                respInfo = self._reqSession.post(url, json = paramDict)
-                # remember the returned headers
-                self._headers = respInfo.headers
-                # if we got some error codes print the error and repeat the request after a short time period
-                if respInfo.status_code != 200:
-                    raise Exception(respInfo.text)
-                # did we get a warning. if yes, print it
-                if self.getLastHeader("warning"):
-                    print("=========== WARNING ===========\n%s\n===============================" % (self.getLastHeader("warning")))
-                # remember the available requests
-                self._dailyAvailableRequests = tryParseInt(self.getLastHeader("x-ratelimit-limit", ""), val = -1)
-                self._remainingAvailableRequests = tryParseInt(self.getLastHeader("x-ratelimit-remaining", ""), val = -1)
+            # if we also have some extra parameters, then set those too
+            if self._extraParams:
+                paramDict.update(self._extraParams)
+            # a request for a specific key of the key pool (e.g. usage info) should use that key
+            fixedApiKey = paramDict.get("apiKey") if self._apiKeyPool and self._apiKeyPool.hasKey(paramDict.get("apiKey")) else None
+
+            # parallel requests are executed when using the concurrency limiter - the headers and the exception of this
+            # request are kept in local variables and only published as the last ones when the request completes
+            tryCount = 0
+            headers = {}
+            lastException = None
+            returnData = None
+            respInfo = None
+            failedHosts = []
+            while self._repeatFailedRequestCount < 0 or tryCount < self._repeatFailedRequestCount:
+                tryCount += 1
+                apiKey = None
+                startTime = None
+                # don't repeat the request after the deadline or if it was cancelled
                 try:
-                    returnData = respInfo.json()
+                    self._checkDeadline(context, deadline, lastException)
+                except (RequestTimeoutError, RequestCancelledError) as ex:
+                    lastException = ex
                     break
-                except Exception as ex:
-                    print("EventRegistry.jsonRequest(): Exception while parsing the returned json object. Repeating the query...")
-                    open("invalidJsonResponse.json", "w").write(respInfo.text)
-            except Exception as ex:
-                self._lastException = ex
-                print("Event Registry exception while executing the request:")
-                if self._verboseOutput:
-                    print("endpoint: %s\nParams: %s" % (url, json.dumps(paramDict, indent=4)))
-                self.printLastException()
-                # in case of invalid input parameters, don't try to repeat the search
-                if respInfo != None and respInfo.status_code == 530:
+                try:
+                    host = self._hostPool.selectHost(exclude = failedHosts)
+                    url = host + methodUrl
+                    if self._apiKeyPool:
+                        apiKey = fixedApiKey or self._apiKeyPool.acquireKey()
+                        paramDict["apiKey"] = apiKey
+
+                    # make the request
+                    startTime = time.time()
+                    respInfo = None
+                    with self._phase("request"):
+                        if self._hedgePolicy and self._hedgePolicy.isHedgeable(methodUrl):
+                            respInfo, host, hedgeException = self._hedgedPost(methodUrl, host, paramDict, self._getAttemptTimeout(deadline))
+                        else:
+                            respInfo = self._post(self._getSession(), host, url, paramDict, self._getAttemptTimeout(deadline))
+                            hedgeException = None
+                    if hedgeException != None:
+                        raise hedgeException
+                    self._reportAttempt(requestLog, methodUrl, host, paramDict, startTime, tryCount, respInfo)
+                    # remember the returned headers
+                    headers = respInfo.headers
+                    self._reportHostUsage(self._hostPool, host, respInfo, time.time() - startTime)
+                    if self._concurrencyLimiter:
+                        self._concurrencyLimiter.reportResult(time.time() - startTime, respInfo.status_code)
+                    if apiKey:
+                        self._reportApiKeyUsage(apiKey, respInfo, time.time() - startTime)
+                    # if we got some error codes print the error and repeat the request after a short time period
+                    if respInfo.status_code != 200:
+                        raise Exception(respInfo.text)
+                    # did we get a warning. if yes, print it
+                    if headers.get("warning"):
+                        print("=========== WARNING ===========\n%s\n===============================" % (headers.get("warning")))
+                    # remember the available requests
+                    dailyAvailableRequests = tryParseInt(headers.get("x-ratelimit-limit", ""), val = -1)
+                    remainingAvailableRequests = tryParseInt(headers.get("x-ratelimit-remaining", ""), val = -1)
+                    # when using multiple keys, the available requests are the sums for all keys
+                    if self._apiKeyPool:
+                        dailyAvailableRequests = self._apiKeyPool.getDailyTokens()
+                        remainingAvailableRequests = self._apiKeyPool.getRemainingTokens()
+                    self._dailyAvailableRequests = dailyAvailableRequests
+                    self._remainingAvailableRequests = remainingAvailableRequests
+                    self._costModel.addObservation(methodUrl, headers.get("req-tokens"), headers.get("req-archive", "0") == "1")
+                    if self._tokenBudget:
+                        self._tokenBudget.afterRequest(methodUrl, tryParseInt(headers.get("req-tokens", ""), val = None))
+                        self._tokenBudget.update(dailyAvailableRequests, remainingAvailableRequests)
+                    try:
+                        with self._span("decode"), self._phase("decode"):
+                            returnData = respInfo.json()
+                        break
+                    except Exception as ex:
+                        print("EventRegistry.jsonRequest(): Exception while parsing the returned json object. Repeating the query...")
+                        open("invalidJsonResponse.json", "w").write(respInfo.text)
+                except ApiKeysExhaustedError as ex:
+                    # none of the keys can be used for a long time - repeating the request would not help
+                    lastException = ex
                     break
-                print("The request will be automatically repeated in 3 seconds...")
-                time.sleep(3)   # sleep for X seconds on error
-        self._lock.release()
+                except Exception as ex:
+                    lastException = ex
+                    if apiKey and respInfo == None:
+                        self._apiKeyPool.reportFailure(apiKey)
+                    # the host failed if the request was sent but no response was received
+                    if startTime != None and respInfo == None:
+                        self._hostPool.reportFailure(host)
+                        self._reportAttempt(requestLog, methodUrl, host, paramDict, startTime, tryCount, error = ex)
+                        if self._concurrencyLimiter:
+                            self._concurrencyLimiter.reportResult(time.time() - startTime, None)
+                    print("Event Registry exception while executing the request:")
+                    if self._verboseOutput:
+                        print("endpoint: %s\nParams: %s" % (url, json.dumps(paramDict, indent=4)))
+                    print(str(lastException))
+                    # in case of invalid input parameters, don't try to repeat the search
+                    if respInfo != None and respInfo.status_code == 530:
+                        break
+                    self._waitBeforeRetry(self._hostPool, host, respInfo, failedHosts, context, deadline)
+            self._headers = headers
+            self._lastException = lastException
+        finally:
+            if locked:
+                lock.release()
+            if self._scheduler:
+                self._scheduler.release()
         if returnData == None:
-            raise self._lastException or Exception("No valid return data provided")
+            raise lastException or Exception("No valid return data provided")
         return returnData
 
 
@@ -316,40 +627,77 @@ class EventRegistry(object):
         """
         if self._apiKey:
             paramDict["apiKey"] = self._apiKey
-        self._lock.acquire()
-        returnData = None
-        respInfo = None
-        self._lastException = None
-        self._headers = {}  # reset any past data
-        tryCount = 0
-        while self._repeatFailedRequestCount < 0 or tryCount < self._repeatFailedRequestCount:
-            tryCount += 1
-            try:
-                url = self._hostAnalytics + methodUrl
-                # make the request
-                respInfo = self._reqSession.post(url, json = paramDict)
-                # remember the returned headers
-                self._headers = respInfo.headers
-                # if we got some error codes print the error and repeat the request after a short time period
-                if respInfo.status_code != 200:
-                    raise Exception(respInfo.text)
-                returnData = respInfo.json()
-                break
-            except Exception as ex:
-                self._lastException = ex
-                print("Event Registry Analytics exception while executing the request:")
-                if self._verboseOutput:
-                    print("endpoint: %s\nParams: %s" % (url, json.dumps(paramDict, indent=4)))
-                self.printLastException()
-                # in case of invalid input parameters, don't try to repeat the action
-                if respInfo != None and respInfo.status_code == 530:
-                    print("The request will not be repeated since we received a response code 530")
+        context = RequestContext.getCurrent()
+        context.checkActive()
+        deadline = self._getDeadline(context)
+        self._acquireBeforeDeadline(self._lockAnalytics, context, deadline)
+        try:
+            returnData = None
+            respInfo = None
+            headers = {}
+            lastException = None
+            tryCount = 0
+            failedHosts = []
+            while self._repeatFailedRequestCount < 0 or tryCount < self._repeatFailedRequestCount:
+                tryCount += 1
+                apiKey = None
+                startTime = None
+                # don't repeat the request after the deadline or if it was cancelled
+                try:
+                    self._checkDeadline(context, deadline, lastException)
+                except (RequestTimeoutError, RequestCancelledError) as ex:
+                    lastException = ex
                     break
-                print("The request will be automatically repeated in 3 seconds...")
-                time.sleep(3)   # sleep for X seconds on error
-        self._lock.release()
+                try:
+                    host = self._hostAnalyticsPool.selectHost(exclude = failedHosts)
+                    url = host + methodUrl
+                    if self._apiKeyPool:
+                        apiKey = self._apiKeyPool.acquireKey()
+                        paramDict["apiKey"] = apiKey
+                    # make the request
+                    startTime = time.time()
+                    respInfo = None
+                    with self._phase("request"):
+                        respInfo = self._post(self._reqSessionAnalytics, host, url, paramDict, self._getAttemptTimeout(deadline))
+                    self._reportAttempt(self._requestLog, methodUrl, host, paramDict, startTime, tryCount, respInfo)
+                    # remember the returned headers
+                    headers = respInfo.headers
+                    self._reportHostUsage(self._hostAnalyticsPool, host, respInfo, time.time() - startTime)
+                    if apiKey:
+                        self._reportApiKeyUsage(apiKey, respInfo, time.time() - startTime)
+                    # if we got some error codes print the error and repeat the request after a short time period
+                    if respInfo.status_code != 200:
+                        raise Exception(respInfo.text)
+                    with self._span("decode"), self._phase("decode"):
+                        returnData = respInfo.json()
+                    break
+                except ApiKeysExhaustedError as ex:
+                    # none of the keys can be used for a long time - repeating the request would not help
+                    lastException = ex
+                    break
+                except Exception as ex:
+                    lastException = ex
+                    if apiKey and respInfo == None:
+                        self._apiKeyPool.reportFailure(apiKey)
+                    # the host failed if the request was sent but no response was received
+                    if startTime != None and respInfo == None:
+                        self._hostAnalyticsPool.reportFailure(host)
+                        self._reportAttempt(self._requestLog, methodUrl, host, paramDict, startTime, tryCount, error = ex)
+                    print("Event Registry Analytics exception while executing the request:")
+                    if self._verboseOutput:
+                        print("endpoint: %s\nParams: %s" % (url, json.dumps(paramDict, indent=4)))
+                    print(str(lastException))
+                    # in case of invalid input parameters, don't try to repeat the action
+                    if respInfo != None and respInfo.status_code == 530:
+                        print("The request will not be repeated since we received a response code 530")
+                        break
+                    self._waitBeforeRetry(self._hostAnalyticsPool, host, respInfo, failedHosts, context, deadline)
+            self._headers = headers
+            self._lastException = lastException
+        finally:
+            self._lockAnalytics.release()
         if returnData == None:
-            raise self._lastException or Exception("No valid return data provided")
+            raise lastException or Exception("No valid return data provided")
         return returnData
 
     #
@@ -662,12 +1010,394 @@ class EventRegistry(object):
     #
     # internal methods
 
+    def _loadSettings(self):
+        """
+        set up the API key and the hosts. If there is a settings.json file then try using it to load the API key from it
+        and to read the host name from it (if custom host is not specified)
+        """
+        if "_hostPool" in self.__dict__:
+            return
+        with self._settingsLock:
+            if "_hostPool" in self.__dict__:
+                return
+            apiKey = self._apiKeyArg
+            host = self._hostArg
+            hostAnalytics = self._hostAnalyticsArg
+            if apiKey or self._apiKeyPool:
+                logger.debug("using user provided API key for making requests")
+            settFName = self._settingsFName or os.path.join(os.path.split(os.path.realpath(__file__))[0], "settings.json")
+            if os.path.exists(settFName):
+                with open(settFName) as f:
+                    settings = json.load(f)
+                host = host or settings.get("host", "http://eventregistry.org")
+                hostAnalytics = hostAnalytics or settings.get("hostAnalytics", "http://analytics.eventregistry.org")
+                # if api key is set, then use it when making the requests
+                if "apiKey" in settings and not apiKey and not self._apiKeyPool:
+                    logger.debug("found apiKey in settings file which will be used for making requests")
+                    apiKey = settings["apiKey"]
+            else:
+                host = host or "http://eventregistry.org"
+                hostAnalytics = hostAnalytics or "http://analytics.eventregistry.org"
+            if apiKey == None and self._apiKeyPool == None:
+                logger.warning("No API key was provided. You will be allowed to perform only a very limited number of requests per day.")
+
+            # the requests are balanced over the hosts in the pools. _host and _hostAnalytics are the primary hosts
+            hostPool = host if isinstance(host, HostPool) else HostPool(host)
+            hostAnalyticsPool = hostAnalytics if isinstance(hostAnalytics, HostPool) else HostPool(hostAnalytics)
+            self._apiKey = apiKey
+            self._host = hostPool.getPrimaryHost()
+            self._hostAnalytics = hostAnalyticsPool.getPrimaryHost()
+            self._hostAnalyticsPool = hostAnalyticsPool
+            # set last since its presence marks that the settings were loaded
+            self._hostPool = hostPool
+            logger.debug("Event Registry host: %s, text analytics host: %s", ", ".join(hostPool.getHosts()), ", ".join(hostAnalyticsPool.getHosts()))
+            if self._healthCheckInterval:
+                hostPool.startHealthChecks(self._checkSearchHost, self._healthCheckInterval)
+                hostAnalyticsPool.startHealthChecks(self._checkAnalyticsHost, self._healthCheckInterval)
+
+
+    def _startVersionCheck(self):
+        """check the version of the module in a background thread (only once)"""
+        self._versionCheckStarted = True
+        thread = threading.Thread(target = self.checkVersion, name = "EventRegistryVersionCheck")
+        thread.daemon = True
+        thread.start()
+
+
+    def _getLatestVersion(self):
+        """return the latest version of the module. The version is cached on disk for versionCheckTtl seconds"""
+        try:
+            with open(self._versionCacheFName) as f:
+                cache = json.load(f)
+            if time.time() - cache["time"] < self._versionCheckTtl:
+                return cache["latestVersion"]
+        except Exception:
+            pass
+        respInfo = self._newSession().get(self._host + "/static/pythonSDKVersion.txt", timeout = 5)
+        if respInfo.status_code != 200 or len(respInfo.text) > 20:
+            return None
+        latestVersion = respInfo.text.strip()
+        try:
+            with open(self._versionCacheFName, "w") as f:
+                json.dump({ "time": time.time(), "latestVersion": latestVersion }, f)
+        except Exception:
+            pass
+        return latestVersion
+
+
+    def _reportApiKeyUsage(self, apiKey, respInfo, latency):
+        """report to the key pool the state of the key used to make the request"""
+        self._apiKeyPool.reportResponse(apiKey, respInfo.status_code,
+            dailyTokens = tryParseInt(respInfo.headers.get("x-ratelimit-limit", ""), val = -1),
+            remainingTokens = tryParseInt(respInfo.headers.get("x-ratelimit-remaining", ""), val = -1),
+            tokens = tryParseInt(respInfo.headers.get("req-tokens", ""), val = None),
+            latency = latency,
+            retryAfter = tryParseInt(respInfo.headers.get("Retry-After", ""), val = None))
+
+
+    def _reportHostUsage(self, hostPool, host, respInfo, latency):
+        """report to the host pool if the host responded successfully. Server errors (5xx) are counted as failures of the host"""
+        if respInfo.status_code >= 500 and respInfo.status_code != 530:
+            hostPool.reportFailure(host)
+        else:
+            hostPool.reportSuccess(host, latency)
+
+
+    def _waitBeforeRetry(self, hostPool, host, respInfo, failedHosts, context, deadline):
+        """
+        after a failed request decide where to repeat it. If the host failed and there is another healthy host,
+        the request is repeated there immediately, otherwise we wait for retryDelay seconds (but not beyond the deadline)
+        """
+        if respInfo == None or respInfo.status_code >= 500:
+            failedHosts.append(host)
+            if hostPool.hasAlternative(failedHosts):
+                print("The request will be automatically repeated on another host...")
+                return
+        # all hosts were tried - start a new round after the delay
+        del failedHosts[:]
+        delay = self._retryDelay
+        if deadline != None:
+            delay = min(delay, max(deadline - time.time(), 0))
+        print("The request will be automatically repeated in %s seconds..." % (delay))
+        context.sleep(delay)   # sleep for X seconds on error. Wakes up if the request is cancelled
+
+
+    def _getDeadline(self, context):
+        """return the time by which the call has to complete, considering the callTimeout and the deadline of the context. None if no limit"""
+        deadline = context.deadline
+        if self._callTimeout != None:
+            callDeadline = time.time() + self._callTimeout
+            deadline = callDeadline if deadline == None else min(deadline, callDeadline)
+        return deadline
+
+
+    def _getAttemptTimeout(self, deadline):
+        """return the timeout for a single request attempt so that it completes before the deadline"""
+        timeout = self._requestTimeout
+        if deadline != None:
+            remaining = max(deadline - time.time(), 0.001)
+            timeout = remaining if timeout == None else min(timeout, remaining)
+        return timeout
+
+
+    def _checkDeadline(self, context, deadline, lastException = None):
+        """raise an exception if the call was cancelled or the deadline has passed. The lastException of the call is included in the message"""
+        context.checkActive()
+        if deadline != None and time.time() >= deadline:
+            msg = "The request could not be completed before the deadline"
+            if lastException != None:
+                msg += ". Last error: %s" % (lastException)
+            raise RequestTimeoutError(msg)
+
+
+    def _acquireBeforeDeadline(self, lock, context, deadline):
+        """
+        acquire the lock (or the concurrency limiter). Raise RequestTimeoutError if it can't be acquired before the deadline
+        and RequestCancelledError if the call is cancelled while waiting
+        """
+        while True:
+            # wake up periodically to check for cancellation
+            timeout = 0.5 if deadline == None else min(max(deadline - time.time(), 0), 0.5)
+            if lock.acquire(timeout = timeout):
+                return
+            context.checkActive()
+            if deadline != None and time.time() >= deadline:
+                raise RequestTimeoutError("The request could not be started before the deadline")
+
+
+    def _hedgedPost(self, methodUrl, host, paramDict, timeout):
+        """
+        make the request to the host. If it doesn't complete within the hedge delay, send the same request also to another host
+        and use the response that arrives first.
+        @returns tuple (respInfo, host, exception) for the first request that returned a response, or for the last failed request if none did
+        """
+        results = queue.Queue()
+        context = RequestContext.getCurrent()
+        state = { "done": False }
+
+        def send(sendHost, params, isHedge):
+            session = self._acquireHedgeSession()
+            startTime = time.time()
+            try:
+                respInfo = self._post(session, sendHost, sendHost + methodUrl, params, timeout)
+                if respInfo.status_code == 200:
+                    self._hedgePolicy.addLatency(methodUrl, time.time() - startTime)
+                result = (sendHost, respInfo, None, time.time() - startTime, isHedge)
+            except Exception as ex:
+                result = (sendHost, None, ex, time.time() - startTime, isHedge)
+            finally:
+                self._releaseHedgeSession(session)
+            with self._hedgeLock:
+                if not state["done"]:
+                    results.put(result)
+                    return
+            # the other request already won - just account for this one
+            with context:
+                self._reportHedgeLoser(methodUrl, result)
+
+        self._hedgePolicy.registerRequest()
+        startTime = time.time()
+        threading.Thread(target = send, args = (host, paramDict, False)).start()
+        delay = self._hedgePolicy.getHedgeDelay(methodUrl)
+        pending = 1
+        while True:
+            timeout = None if delay is None else max(delay - (time.time() - startTime), 0)
+            try:
+                result = results.get(timeout = timeout)
+            except queue.Empty:
+                # the request is slow - send a hedged request unless that would use too many tokens
+                delay = None
+                tightBudget = self._tokenBudget != None and self._tokenBudget.isTight()
+                if not tightBudget and self._hedgePolicy.tryAcquireHedge():
+                    hedgeHost = self._hostPool.selectHost(exclude = [host])
+                    threading.Thread(target = send, args = (hedgeHost, dict(paramDict), True)).start()
+                    pending += 1
+                continue
+            pending -= 1
+            if (result[1] != None and result[1].status_code < 500) or pending == 0:
+                break
+            # this request failed but the other one might still succeed
+            self._reportHedgeLoser(methodUrl, result)
+        with self._hedgeLock:
+            state["done"] = True
+            # requests that completed in the meantime are also losers
+            while not results.empty():
+                self._reportHedgeLoser(methodUrl, results.get())
+        sendHost, respInfo, ex, latency, isHedge = result
+        if isHedge and respInfo != None:
+            self._hedgePolicy.reportHedgeWin()
+        return respInfo, sendHost, ex
+
+
+    def _reportHedgeLoser(self, methodUrl, result):
+        """account for the host usage and the tokens of a request whose response was not used"""
+        host, respInfo, ex, latency, isHedge = result
+        if respInfo == None:
+            self._hostPool.reportFailure(host)
+            return
+        self._reportHostUsage(self._hostPool, host, respInfo, latency)
+        if self._tokenBudget and respInfo.status_code == 200:
+            self._tokenBudget.afterRequest(methodUrl, tryParseInt(respInfo.headers.get("req-tokens", ""), val = None))
+
+
+    def _acquireHedgeSession(self):
+        with self._hedgeLock:
+            if len(self._hedgeSessions) > 0:
+                return self._hedgeSessions.pop()
+        return self._newSession()
+
+
+    def _releaseHedgeSession(self, session):
+        with self._hedgeLock:
+            self._hedgeSessions.append(session)
+
+
+    def _createRequestLog(self, val):
+        """return the RequestLog for the value of the logging parameter (True, path of the log file or an instance of RequestLog)"""
+        if isinstance(val, RequestLog):
+            return val
+        if isinstance(val, six.string_types):
+            return RequestLog(val)
+        return RequestLog() if val else None
+
+
+    def _getRequestLog(self, customLogFName = None):
+        """return the RequestLog to use for a request. Requests with a customLogFName are logged to that file"""
+        if self._requestLog is None or customLogFName is None:
+            return self._requestLog
+        with self._settingsLock:
+            if customLogFName not in self._customRequestLogs:
+                self._customRequestLogs[customLogFName] = RequestLog(customLogFName)
+            return self._customRequestLogs[customLogFName]
+
+
+    def _reportAttempt(self, requestLog, methodUrl, host, paramDict, startTime, attempt, respInfo = None, error = None):
+        """log the request attempt and record it in the metrics"""
+        latency = time.time() - startTime
+        if self._tracer:
+            span = self._tracer.startSpan("attempt", startTime, endpoint = methodUrl, host = host, attempt = attempt)
+            span.setAttribute("status", respInfo.status_code if respInfo != None else None)
+            if error != None:
+                span.setAttribute("error", str(error))
+            span.end()
+        if requestLog:
+            requestLog.log(methodUrl, host, paramDict, startTime, latency, respInfo, attempt, error)
+        if self._metrics:
+            if attempt > 1:
+                self._metrics.recordRetry(methodUrl)
+            if respInfo is None:
+                self._metrics.recordRequest(methodUrl, latency)
+            else:
+                self._metrics.recordRequest(methodUrl, latency, respInfo.status_code, _getRequestSize(respInfo), _getResponseSize(respInfo),
+                    tryParseInt(respInfo.headers.get("req-tokens", ""), val = None), respInfo.headers.get("req-archive") == "1")
+
+
+    def _recordWait(self, reason, waitStart):
+        """record in the metrics the time waited since waitStart. Returns the current time"""
+        now = time.time()
+        if self._metrics:
+            self._metrics.recordWait(reason, now - waitStart)
+        if self._tracer:
+            self._tracer.startSpan("wait", waitStart, reason = reason).end()
+        return now
+
+
+    def _span(self, name, **attributes):
+        """return the span to use in a with statement when tracing is enabled. Otherwise return a span that does nothing"""
+        if self._tracer:
+            return self._tracer.span(name, **attributes)
+        return noopSpan
+
+
+    def _phase(self, name):
+        """return the context manager measuring the phase when profiling is enabled. Otherwise return a span that does nothing"""
+        if self._profiler:
+            return self._profiler.phase(name)
+        return noopSpan
+
+
+    def _reportIteratorPage(self, iterator, page, itemCount):
+        """record a page of results downloaded by an iterator"""
+        if self._metrics:
+            self._metrics.recordPage(iterator, itemCount)
+        if self._profiler:
+            self._profiler.pageDone(iterator, page)
+
+
+    def _collectMetrics(self):
+        """return the current values of the gauges exported with the metrics"""
+        gauges = [("remaining_tokens", {}, self._remainingAvailableRequests)]
+        if self._concurrencyLimiter:
+            gauges.append(("concurrency_limit", {}, self._concurrencyLimiter.getLimit()))
+            gauges.append(("in_flight_requests", {}, self._concurrencyLimiter.getInFlight()))
+        if self._scheduler:
+            for priority, depth in self._scheduler.getStats()["queueDepth"].items():
+                gauges.append(("queue_depth", { "priority": priority }, depth))
+        return gauges
+
+
+    def _post(self, session, host, url, paramDict, timeout):
+        """send the request to the host using the session. The large request bodies are compressed if enabled and supported by the host"""
+        if self._compression is None:
+            return session.post(url, json = paramDict, timeout = timeout)
+        headers, data = self._compression.encodeBody(host, paramDict)
+        if data is None:
+            respInfo = session.post(url, json = paramDict, timeout = timeout, headers = headers)
+        else:
+            # requests expects the raw body as data and httpx as content
+            respInfo = session.post(url, timeout = timeout, headers = headers, **{ self._transport.bodyArgument: data })
+        if not self._compression.checkResponse(host, respInfo, data is not None):
+            # the host does not accept compressed requests - repeat the request without compression
+            respInfo = session.post(url, json = paramDict, timeout = timeout, headers = headers)
+        return respInfo
+
+
+    def _newSession(self):
+        return self._transport.newSession()
+
+
+    def _checkHost(self, url, params = None):
+        """make a health check request to the url. return the duration of the request or None if the host is not healthy"""
+        if self._healthCheckSession is None:
+            self._healthCheckSession = self._newSession()
+        startTime = time.time()
+        if params is None:
+            respInfo = self._healthCheckSession.get(url, timeout = 10)
+        else:
+            respInfo = self._healthCheckSession.post(url, json = params, timeout = 10)
+        if respInfo.status_code >= 500:
+            return None
+        return time.time() - startTime
+
+
+    def _checkSearchHost(self, host):
+        apiKey = self._apiKeyPool.getKeys()[0] if self._apiKeyPool else self._apiKey
+        return self._checkHost(host + "/api/v1/getServiceStatus", { "apiKey": apiKey })
+
+
+    def _checkAnalyticsHost(self, host):
+        return self._checkHost(host)
+
+
+    def _getSession(self):
+        """return the session to use for the search requests. When the requests are executed in parallel, each thread has its own session"""
+        if self._concurrencyLimiter is None:
+            return self._reqSession
+        session = getattr(self._localSessions, "session", None)
+        if session is None:
+            session = self._localSessions.session = self._newSession()
+        return session
+
+
     def _sleepIfNecessary(self):
         """ensure that queries are not made too fast"""
-        t = time.time()
-        if t - self._lastQueryTime < self._minDelayBetweenRequests:
-            time.sleep(self._minDelayBetweenRequests - (t - self._lastQueryTime))
-        self._lastQueryTime = t
+        # reserve the time slot for the request so that requests from parallel threads are also spaced out
+        with self._rateLock:
+            t = time.time()
+            wait = self._lastQueryTime + self._minDelayBetweenRequests - t
+            self._lastQueryTime = max(t, self._lastQueryTime + self._minDelayBetweenRequests)
+        if wait > 0:
+            time.sleep(wait)
 
 
 
@@ -0,0 +1,112 @@
+"""
+the HedgePolicy decides when a hedged (duplicate) request should be made to reduce the tail latency.
+
+If a request to one of the idempotent read endpoints (searching of articles and events, suggestions) has not
+completed within the given percentile of the latencies observed for that endpoint, a second copy of the request
+is sent (to another host, if available) and the response that arrives first is used. Since each hedged request
+costs additional tokens, the number of hedged requests is limited to a fraction of all requests.
+
+Use it by providing an instance as the hedging parameter when creating EventRegistry:
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, host = [host1, host2], hedging = HedgePolicy(percentile = 95))
+"""
+import threading, collections
+
+
+# endpoints that only read the data and can be safely repeated
+hedgeableEndpoints = ["/api/v1/article", "/api/v1/event"]
+hedgeableEndpointPrefixes = ["/api/v1/suggest"]
+
+
+class HedgePolicy(object):
+    def __init__(self,
+                 percentile = 95,
+                 minDelay = 0.05,
+                 maxHedgeFraction = 0.1,
+                 minSamples = 20,
+                 windowSize = 200,
+                 endpoints = None):
+        """
+        @param percentile: the hedged request is sent if the request has not completed within this percentile of the observed latencies
+        @param minDelay: the minimum number of seconds to wait before the hedged request is sent
+        @param maxHedgeFraction: the max number of hedged requests as a fraction of all requests to the hedgeable endpoints
+        @param minSamples: number of latencies that have to be observed for an endpoint before the requests to it are hedged
+        @param windowSize: number of the most recent latencies per endpoint used to compute the percentile
+        @param endpoints: list of endpoints whose requests can be hedged. If None, the searches of articles and events and the suggest endpoints are hedged
+        """
+        assert 0 < percentile < 100, "percentile should be between 0 and 100"
+        assert 0 <= maxHedgeFraction <= 1, "maxHedgeFraction should be between 0 and 1"
+        self._percentile = percentile
+        self._minDelay = minDelay
+        self._maxHedgeFraction = maxHedgeFraction
+        self._minSamples = minSamples
+        self._windowSize = windowSize
+        self._endpoints = endpoints
+        self._latencies = {}
+        self._requestCount = 0
+        self._hedgeCount = 0
+        self._hedgeWinCount = 0
+        self._lock = threading.Lock()
+
+
+    def isHedgeable(self, methodUrl):
+        """can the requests to the endpoint be hedged"""
+        if self._endpoints is not None:
+            return methodUrl in self._endpoints
+        return methodUrl in hedgeableEndpoints or any(methodUrl.startswith(prefix) for prefix in hedgeableEndpointPrefixes)
+
+
+    def addLatency(self, methodUrl, latency):
+        """remember the latency (in seconds) of a completed request to the endpoint"""
+        with self._lock:
+            if methodUrl not in self._latencies:
+                self._latencies[methodUrl] = collections.deque(maxlen = self._windowSize)
+            self._latencies[methodUrl].append(latency)
+
+
+    def getLatencyPercentile(self, methodUrl, percentile = None):
+        """
+        return the percentile of the recent latencies of the requests to the endpoint (None if no latencies were observed)
+        @param percentile: percentile to compute. If None, the percentile set in the constructor is used
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(methodUrl, []))
+        if len(latencies) == 0:
+            return None
+        percentile = percentile or self._percentile
+        return latencies[min(int(len(latencies) * percentile / 100.0), len(latencies) - 1)]
+
+
+    def getHedgeDelay(self, methodUrl):
+        """return the number of seconds after which the request to the endpoint should be hedged (None if it should not be hedged)"""
+        with self._lock:
+            if len(self._latencies.get(methodUrl, [])) < self._minSamples:
+                return None
+        return max(self.getLatencyPercentile(methodUrl), self._minDelay)
+
+
+    def registerRequest(self):
+        """count a request made to a hedgeable endpoint"""
+        with self._lock:
+            self._requestCount += 1
+
+
+    def tryAcquireHedge(self):
+        """return True if another hedged request can be made without exceeding the maxHedgeFraction"""
+        with self._lock:
+            if self._hedgeCount + 1 > self._maxHedgeFraction * self._requestCount:
+                return False
+            self._hedgeCount += 1
+            return True
+
+
+    def reportHedgeWin(self):
+        """report that the hedged request completed before the original one"""
+        with self._lock:
+            self._hedgeWinCount += 1
+
+
+    def getStats(self):
+        """return the number of requests, hedged requests and the number of times the hedged request won"""
+        with self._lock:
+            return { "requests": self._requestCount, "hedges": self._hedgeCount, "hedgeWins": self._hedgeWinCount }
@@ -0,0 +1,169 @@
+"""
+the HostPool keeps a list of hosts that provide the same service and selects which one should be used for the next request.
+
+Requests are sent to the healthy host with the lowest (exponentially weighted) average latency. So that the pool
+notices when the latency of the other hosts improves, a healthy host that was not used for probeInterval seconds
+is used for the next request (probe) to measure its current latency. Hosts that fail
+repeatedly (passive health checking) or that don't respond to the health check requests (active health checking)
+are marked as down and are not used for some time. When a request to a host fails, it can be immediately
+repeated on another host (failover).
+"""
+import threading, time
+
+
+class HostPool(object):
+    def __init__(self, hosts, failureThreshold = 3, downInterval = 30, latencyAlpha = 0.3, probeInterval = 30):
+        """
+        @param hosts: a single host or a list of hosts (e.g. ["http://eventregistry.org", "http://backup.eventregistry.org"])
+        @param failureThreshold: number of consecutive failures after which the host is marked as down
+        @param downInterval: number of seconds for which a host that is down is not used
+        @param latencyAlpha: weight of the latest latency when computing the average latency of the host
+        @param probeInterval: number of seconds after which a healthy host that was not used is selected for a single request
+            to update its average latency. If None, the host with the lowest average latency is always selected
+        """
+        if not isinstance(hosts, (list, tuple)):
+            hosts = [hosts]
+        assert len(hosts) > 0, "at least one host has to be provided"
+        self._hosts = list(hosts)
+        self._failureThreshold = failureThreshold
+        self._downInterval = downInterval
+        self._latencyAlpha = latencyAlpha
+        self._probeInterval = probeInterval
+        self._hostStats = {}
+        for host in self._hosts:
+            self._hostStats[host] = {
+                "requests": 0,
+                "failures": 0,
+                "consecutiveFailures": 0,
+                "avgLatency": None,
+                "downUntil": 0,
+                "lastUsed": 0
+            }
+        self._lock = threading.Lock()
+        self._healthCheckThread = None
+
+
+    def getHosts(self):
+        """return the list of all hosts in the pool"""
+        return list(self._hosts)
+
+
+    def getPrimaryHost(self):
+        """return the first host in the pool"""
+        return self._hosts[0]
+
+
+    def getHostStats(self, host = None):
+        """
+        return the statistics (number of requests and failures, average latency, ...) of the host
+        @param host: host for which to return the stats. If None, return a dict with stats for all hosts
+        """
+        with self._lock:
+            if host is not None:
+                return dict(self._hostStats[host])
+            return dict((host, dict(stats)) for host, stats in self._hostStats.items())
+
+
+    def isHealthy(self, host):
+        """is the host currently considered to be healthy"""
+        return self._hostStats[host]["downUntil"] <= time.time()
+
+
+    def selectHost(self, exclude = None):
+        """
+        return the host that should be used for the next request
+        @param exclude: optional list of hosts that should not be used (e.g. because the request already failed on them).
+            If all healthy hosts are excluded, the best excluded host is returned
+        """
+        exclude = exclude or []
+        now = time.time()
+        with self._lock:
+            candidates = [host for host in self._hosts if self._hostStats[host]["downUntil"] <= now]
+            if len(candidates) == 0:
+                # all hosts are down. use the one that should recover the soonest
+                return min(self._hosts, key = lambda host: self._hostStats[host]["downUntil"])
+            notExcluded = [host for host in candidates if host not in exclude]
+            if len(notExcluded) > 0:
+                candidates = notExcluded
+            # hosts without any measured latency are tried first
+            best = min(candidates, key = lambda host: self._hostStats[host]["avgLatency"] or 0)
+            if self._probeInterval is not None:
+                # probe the host that was not used for the longest time (if it was not used for probeInterval seconds)
+                stale = [host for host in candidates if host != best and self._hostStats[host]["avgLatency"] is not None and
+                    now - self._hostStats[host]["lastUsed"] >= self._probeInterval]
+                if len(stale) > 0:
+                    best = min(stale, key = lambda host: self._hostStats[host]["lastUsed"])
+            self._hostStats[best]["lastUsed"] = now
+            return best
+
+
+    def hasAlternative(self, exclude):
+        """is there a healthy host that is not in the exclude list"""
+        now = time.time()
+        with self._lock:
+            return any(host not in exclude and self._hostStats[host]["downUntil"] <= now for host in self._hosts)
+
+
+    def reportSuccess(self, host, latency):
+        """report that a request to the host succeeded and took latency seconds"""
+        with self._lock:
+            stats = self._hostStats.get(host)
+            if stats is None:
+                return
+            stats["requests"] += 1
+            stats["consecutiveFailures"] = 0
+            stats["downUntil"] = 0
+            stats["lastUsed"] = max(stats["lastUsed"], time.time())
+            if stats["avgLatency"] is None:
+                stats["avgLatency"] = latency
+            else:
+                stats["avgLatency"] = self._latencyAlpha * latency + (1 - self._latencyAlpha) * stats["avgLatency"]
+
+
+    def reportFailure(self, host, markDown = False):
+        """
+        report that a request to the host failed
+        @param markDown: if True, the host is immediately marked as down
+        """
+        with self._lock:
+            stats = self._hostStats.get(host)
+            if stats is None:
+                return
+            stats["requests"] += 1
+            stats["failures"] += 1
+            stats["consecutiveFailures"] += 1
+            if markDown or stats["consecutiveFailures"] >= self._failureThreshold:
+                stats["downUntil"] = time.time() + self._downInterval
+
+
+    def checkHealth(self, checkFunc):
+        """
+        actively check the health of all hosts
+        @param checkFunc: function that receives the host and returns the number of seconds it took to check it, or None if the host is not healthy
+        """
+        for host in self._hosts:
+            try:
+                latency = checkFunc(host)
+            except Exception:
+                latency = None
+            if latency is None:
+                self.reportFailure(host, markDown = True)
+            else:
+                self.reportSuccess(host, latency)
+
+
+    def startHealthChecks(self, checkFunc, interval):
+        """
+        start a background thread that checks the health of the hosts every interval seconds
+        @param checkFunc: see checkHealth()
+        @param interval: number of seconds between two health checks
+        """
+        if self._healthCheckThread is not None:
+            return
+        def run():
+            while True:
+                self.checkHealth(checkFunc)
+                time.sleep(interval)
+        self._healthCheckThread = threading.Thread(target = run, name = "HostPoolHealthCheck")
+        self._healthCheckThread.daemon = True
+        self._healthCheckThread.start()
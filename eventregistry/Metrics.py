@@ -0,0 +1,287 @@
+"""
+the MetricsRegistry collects the metrics of the requests made to Event Registry.
+
+For each endpoint it records the histogram of the request latencies, the number of requests per status code,
+the request and response bytes, the number of repeated attempts, the tokens used (req-tokens header) and the number
+of requests executed on the archive (req-archive header). It also records the time the requests spent waiting
+(for the token budget, the scheduler, the rate limit and the lock) and the pages downloaded by the iterators.
+
+The metrics can be exported in the Prometheus text format using toPrometheus(), served from a local http
+endpoint (startHttpServer()) or periodically passed to a callback (startPeriodicExport()):
+
+    metrics = MetricsRegistry()
+    er = EventRegistry(apiKey = YOUR_API_KEY, metrics = metrics)
+    metrics.startHttpServer(port = 9100)     # scrape http://127.0.0.1:9100/metrics
+"""
+import bisect, threading, time, collections, logging
+
+# upper bounds (in seconds) of the buckets of the latency histograms
+defaultLatencyBuckets = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+# upper bounds (in seconds) of the buckets of the wait time histograms
+defaultWaitBuckets = [0.001, 0.01, 0.1, 0.5, 1, 5, 30, 60]
+
+
+class Histogram(object):
+    def __init__(self, buckets):
+        """
+        histogram of the observed values
+        @param buckets: sorted list of the upper bounds of the buckets. Values above the last bound are counted only in the +Inf bucket
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+    def getPercentile(self, percentile):
+        """return the upper bound of the bucket containing the given percentile of the values (None if there are no values)"""
+        if self.count == 0:
+            return None
+        target = self.count * percentile / 100.0
+        total = 0
+        for i, count in enumerate(self.counts):
+            total += count
+            if total >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+
+
+
+class MetricsRegistry(object):
+    def __init__(self,
+                 latencyBuckets = None,
+                 waitBuckets = None,
+                 prefix = "eventregistry"):
+        """
+        @param latencyBuckets: upper bounds (in seconds) of the buckets of the latency histograms
+        @param waitBuckets: upper bounds (in seconds) of the buckets of the wait time histograms
+        @param prefix: prefix of the names of the exported metrics
+        """
+        self._latencyBuckets = sorted(latencyBuckets or defaultLatencyBuckets)
+        self._waitBuckets = sorted(waitBuckets or defaultWaitBuckets)
+        self._prefix = prefix
+        # (metric name, tuple of label pairs) -> value
+        self._counters = collections.defaultdict(float)
+        # (metric name, tuple of label pairs) -> Histogram
+        self._histograms = {}
+        # iterator name -> [time of the first page, time of the last page]
+        self._pageTimes = {}
+        # functions returning the list of (metric name, labels dict, value) of the gauges
+        self._collectors = []
+        self._lock = threading.Lock()
+
+
+    def recordRequest(self, endpoint, latency, statusCode = None, requestBytes = None, responseBytes = None, tokens = None, archive = False):
+        """
+        record a request attempt
+        @param endpoint: the called endpoint (e.g. "/api/v1/article")
+        @param latency: number of seconds until the response was received (or the request failed)
+        @param statusCode: http status code of the response. None if no response was received
+        @param requestBytes: size of the request body
+        @param responseBytes: size of the response body
+        @param tokens: number of tokens used by the request
+        @param archive: was the request executed on the archive
+        """
+        labels = (("endpoint", endpoint),)
+        with self._lock:
+            self._observe("request_duration_seconds", labels, latency, self._latencyBuckets)
+            self._counters[("requests_total", labels + (("status", str(statusCode) if statusCode != None else "error"),))] += 1
+            if requestBytes != None:
+                self._counters[("request_bytes_total", labels)] += requestBytes
+            if responseBytes != None:
+                self._counters[("response_bytes_total", labels)] += responseBytes
+            if tokens != None:
+                self._counters[("tokens_total", labels)] += tokens
+            if archive:
+                self._counters[("archive_requests_total", labels)] += 1
+
+
+    def recordRetry(self, endpoint):
+        """record that a failed request to the endpoint was repeated"""
+        with self._lock:
+            self._counters[("retries_total", (("endpoint", endpoint),))] += 1
+
+
+    def recordWait(self, reason, seconds):
+        """
+        record the time a request had to wait before it was sent
+        @param reason: what the request was waiting for - "budget", "scheduler", "rate" or "lock"
+        @param seconds: number of seconds the request waited
+        """
+        with self._lock:
+            self._observe("wait_seconds", (("reason", reason),), seconds, self._waitBuckets)
+
+
+    def recordPage(self, iterator, itemCount):
+        """
+        record a page of results downloaded by an iterator
+        @param iterator: name of the iterator (e.g. "QueryArticlesIter")
+        @param itemCount: number of results on the page
+        """
+        now = time.time()
+        labels = (("iterator", iterator),)
+        with self._lock:
+            self._counters[("iterator_pages_total", labels)] += 1
+            self._counters[("iterator_items_total", labels)] += itemCount
+            times = self._pageTimes.setdefault(iterator, [now, now])
+            times[1] = now
+
+
+    def addCollector(self, collector):
+        """
+        add a function that returns the current values of gauges as a list of tuples (metric name, labels dict, value)
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+
+    def getCounter(self, name, **labels):
+        """return the value of the counter with the given name and labels (e.g. getCounter("retries_total", endpoint = "/api/v1/article"))"""
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+    def getHistogram(self, name, **labels):
+        """return the Histogram with the given name and labels (None if no values were observed)"""
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+
+    def getPagesPerSecond(self, iterator):
+        """return the average number of pages per second downloaded by the iterator (None if not enough pages were downloaded)"""
+        with self._lock:
+            pages = self._counters.get(("iterator_pages_total", (("iterator", iterator),)), 0)
+            times = self._pageTimes.get(iterator)
+        if times is None or pages < 2 or times[1] <= times[0]:
+            return None
+        # the time to the first page is not known - count the pages after it
+        return (pages - 1) / (times[1] - times[0])
+
+
+    def toPrometheus(self):
+        """return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key = lambda item: item[0])
+            collectors = list(self._collectors)
+        lines = []
+        lastName = None
+        for (name, labels), value in counters:
+            if name != lastName:
+                lines.append("# TYPE %s_%s counter" % (self._prefix, name))
+                lastName = name
+            lines.append("%s_%s%s %s" % (self._prefix, name, _formatLabels(labels), _formatValue(value)))
+        for (name, labels), hist in histograms:
+            if name != lastName:
+                lines.append("# TYPE %s_%s histogram" % (self._prefix, name))
+                lastName = name
+            total = 0
+            for bound, count in zip(hist.buckets + [float("inf")], hist.counts):
+                total += count
+                lines.append("%s_%s_bucket%s %d" % (self._prefix, name, _formatLabels(labels + (("le", _formatValue(bound)),)), total))
+            lines.append("%s_%s_sum%s %s" % (self._prefix, name, _formatLabels(labels), _formatValue(hist.sum)))
+            lines.append("%s_%s_count%s %d" % (self._prefix, name, _formatLabels(labels), hist.count))
+        gauges = []
+        for collector in collectors:
+            try:
+                gauges.extend((name, tuple(sorted(labels.items())), value) for name, labels, value in collector())
+            except Exception:
+                continue
+        for name, labels, value in sorted(gauges, key = lambda gauge: gauge[:2]):
+            if name != lastName:
+                lines.append("# TYPE %s_%s gauge" % (self._prefix, name))
+                lastName = name
+            lines.append("%s_%s%s %s" % (self._prefix, name, _formatLabels(labels), _formatValue(value)))
+        return "\n".join(lines) + "\n"
+
+
+    def startHttpServer(self, port = 0, addr = "127.0.0.1"):
+        """
+        serve the metrics in the Prometheus format from a background thread
+        @param port: port to listen on. Use 0 to pick a free port
+        @param addr: address to listen on
+        @returns: the http server. Its port is server.server_address[1]. Call server.shutdown() to stop it
+        """
+        from six.moves import BaseHTTPServer, socketserver
+        registry = self
+
+        class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.toPrometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class MetricsServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        server = MetricsServer((addr, port), MetricsHandler)
+        thread = threading.Thread(target = server.serve_forever, name = "EventRegistryMetrics")
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+    def startPeriodicExport(self, callback, interval = 60):
+        """
+        call the callback with the metrics in the Prometheus format every interval seconds (in a background thread)
+        @returns: threading.Event that stops the export when set
+        """
+        stop = threading.Event()
+
+        def export():
+            while not stop.wait(interval):
+                try:
+                    callback(self.toPrometheus())
+                except Exception as ex:
+                    logging.getLogger(__name__).warning("Failed to export the metrics: %s", ex)
+
+        thread = threading.Thread(target = export, name = "EventRegistryMetricsExport")
+        thread.daemon = True
+        thread.start()
+        return stop
+
+
+    #
+    # internal methods
+
+    def _observe(self, name, labels, value, buckets):
+        hist = self._histograms.get((name, labels))
+        if hist is None:
+            hist = self._histograms[(name, labels)] = Histogram(buckets)
+        hist.observe(value)
+
+
+
+def _getRequestSize(respInfo):
+    """return the number of bytes of the request body that was sent to get the response (None if not known)"""
+    request = getattr(respInfo, "request", None)
+    # requests.PreparedRequest has the body, httpx.Request the content
+    body = getattr(request, "body", None) if request != None else None
+    if body is None and request != None:
+        body = getattr(request, "content", None)
+    return len(body) if body != None else None
+
+
+def _formatLabels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join('%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels) + "}"
+
+
+def _formatValue(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
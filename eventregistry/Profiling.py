@@ -0,0 +1,241 @@
+"""
+the Profiler shows where the client spends its time and memory.
+
+When a profiler is provided to EventRegistry, the work done by the client is split into phases - building of the
+query parameters (for the iterators also the requested result of each page, including ReturnInfo.getParams()), sending
+the requests and waiting for the responses, and decoding of the returned json. For each phase the profiler measures
+the number of calls, the wall and CPU time and the memory allocated (retained) in it. A background thread samples the stacks of the profiled threads to find the functions in which
+the time is spent - the samples outside of the phases (e.g. in the code that consumes the results of an iterator)
+are reported as the "other" phase. After each page downloaded by an iterator, a tracemalloc snapshot is taken and the
+lines of code with the largest growth of allocated memory since the previous page are reported.
+
+    profiler = Profiler()
+    er = EventRegistry(apiKey = YOUR_API_KEY, profiler = profiler)
+    for art in QueryArticlesIter(keywords = "Obama").execQuery(er, maxItems = 5000):
+        pass
+    profiler.stop()
+    print(profiler.formatReport())
+"""
+import sys, os, time, threading, collections
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class _Phase(object):
+    """context manager measuring a phase in the current thread"""
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+
+    def __enter__(self):
+        self._stack = self._profiler._getStack()
+        self._stack.append(self._name)
+        self._memory = self._profiler._getTracedMemory()
+        self._cpuTime = _threadTime()
+        self._startTime = time.time()
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        wallTime = time.time() - self._startTime
+        cpuTime = _threadTime() - self._cpuTime
+        allocated = self._profiler._getTracedMemory() - self._memory
+        self._stack.pop()
+        self._profiler._addPhase(self._name, wallTime, cpuTime, allocated)
+
+
+
+class Profiler(object):
+    def __init__(self,
+                 sampleInterval = 0.005,
+                 traceMemory = True,
+                 snapshotEvery = 1,
+                 topCount = 10):
+        """
+        @param sampleInterval: number of seconds between the samples of the stacks of the profiled threads
+        @param traceMemory: if True, the memory allocations are traced using tracemalloc (slows down the execution)
+        @param snapshotEvery: take a tracemalloc snapshot after every snapshotEvery pages downloaded by the iterators. 0 to not take snapshots
+        @param topCount: number of functions and lines of code to report
+        """
+        self._sampleInterval = sampleInterval
+        self._traceMemory = traceMemory and tracemalloc != None
+        self._snapshotEvery = snapshotEvery
+        self._topCount = topCount
+        # phase name -> [calls, wall time, cpu time, allocated bytes]
+        self._phases = collections.defaultdict(lambda: [0, 0.0, 0.0, 0])
+        # phase name -> Counter of the sampled functions
+        self._samples = collections.defaultdict(collections.Counter)
+        # thread id -> stack of the phases entered in the thread
+        self._stacks = {}
+        self._pages = []
+        self._lastSnapshot = None
+        self._pageCount = 0
+        self._startedTracemalloc = False
+        self._running = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+
+    def start(self):
+        """start sampling the profiled threads (and tracing the memory allocations). Called automatically when the first phase is entered"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            if self._traceMemory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._startedTracemalloc = True
+            self._thread = threading.Thread(target = self._sample, name = "EventRegistryProfiler")
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def stop(self):
+        """stop sampling and tracing the memory"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            thread = self._thread
+        thread.join()
+        if self._startedTracemalloc:
+            tracemalloc.stop()
+            self._startedTracemalloc = False
+
+
+    def phase(self, name):
+        """
+        return a context manager that measures the code executed in it as the given phase:
+            with profiler.phase("params"):
+                params = query._getQueryParams()
+        """
+        if not self._running:
+            self.start()
+        return _Phase(self, name)
+
+
+    def pageDone(self, iterator, page):
+        """
+        called when an iterator has downloaded a page. Records the allocated memory and the lines that allocated the most since the previous page
+        @param iterator: name of the iterator (e.g. "QueryArticlesIter")
+        @param page: number of the downloaded page
+        """
+        if not self._traceMemory or not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        pageInfo = { "iterator": iterator, "page": page, "memory": current, "peakMemory": peak }
+        self._pageCount += 1
+        if self._snapshotEvery > 0 and self._pageCount % self._snapshotEvery == 0:
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            if self._lastSnapshot != None:
+                stats = snapshot.compare_to(self._lastSnapshot, "lineno")[:self._topCount]
+                pageInfo["topAllocations"] = [{ "line": "%s:%d" % (stat.traceback[0].filename, stat.traceback[0].lineno), "sizeDiff": stat.size_diff, "size": stat.size }
+                    for stat in stats]
+            self._lastSnapshot = snapshot
+        with self._lock:
+            self._pages.append(pageInfo)
+
+
+    def getReport(self):
+        """
+        return the dict with the measurements of the phases, the functions sampled most often in each phase and the memory after each page
+        """
+        with self._lock:
+            phases = dict((name, list(values)) for name, values in self._phases.items())
+            samples = dict((name, collections.Counter(counter)) for name, counter in self._samples.items())
+            pages = list(self._pages)
+        report = { "phases": {}, "pages": pages, "sampleInterval": self._sampleInterval }
+        for name in set(phases) | set(samples):
+            calls, wallTime, cpuTime, allocated = phases.get(name, [0, 0.0, 0.0, 0])
+            counter = samples.get(name, collections.Counter())
+            report["phases"][name] = {
+                "calls": calls,
+                "wallTime": wallTime,
+                "cpuTime": cpuTime,
+                "allocatedBytes": allocated,
+                "samples": sum(counter.values()),
+                "topFunctions": counter.most_common(self._topCount)
+            }
+        return report
+
+
+    def formatReport(self):
+        """return the report as text"""
+        report = self.getReport()
+        totalSamples = max(sum(phase["samples"] for phase in report["phases"].values()), 1)
+        lines = ["%-10s %8s %10s %10s %8s %14s" % ("phase", "calls", "wall (s)", "cpu (s)", "samples", "allocated (B)")]
+        phases = sorted(report["phases"].items(), key = lambda item: -item[1]["samples"])
+        for name, phase in phases:
+            lines.append("%-10s %8d %10.3f %10.3f %7.1f%% %14d" % (name, phase["calls"], phase["wallTime"], phase["cpuTime"],
+                100.0 * phase["samples"] / totalSamples, phase["allocatedBytes"]))
+        for name, phase in phases:
+            if len(phase["topFunctions"]) > 0:
+                lines.append("")
+                lines.append("most sampled functions in phase '%s':" % (name))
+                for function, count in phase["topFunctions"]:
+                    lines.append("  %6d  %s" % (count, function))
+        if len(report["pages"]) > 0:
+            lastPage = report["pages"][-1]
+            lines.append("")
+            lines.append("traced memory after %d pages: %d B (peak %d B)" % (len(report["pages"]), lastPage["memory"], lastPage["peakMemory"]))
+            for pageInfo in reversed(report["pages"]):
+                if "topAllocations" in pageInfo:
+                    lines.append("largest allocations since the previous snapshot (%s, page %d):" % (pageInfo["iterator"], pageInfo["page"]))
+                    for alloc in pageInfo["topAllocations"]:
+                        lines.append("  %+12d B  %s" % (alloc["sizeDiff"], alloc["line"]))
+                    break
+        return "\n".join(lines)
+
+
+    #
+    # internal methods
+
+    def _getStack(self):
+        tid = threading.current_thread().ident
+        stack = self._stacks.get(tid)
+        if stack is None:
+            stack = self._stacks[tid] = []
+        return stack
+
+
+    def _getTracedMemory(self):
+        if self._traceMemory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+
+    def _addPhase(self, name, wallTime, cpuTime, allocated):
+        with self._lock:
+            values = self._phases[name]
+            values[0] += 1
+            values[1] += wallTime
+            values[2] += cpuTime
+            values[3] += allocated
+
+
+    def _sample(self):
+        """sample the stacks of the threads that have entered a phase"""
+        ownId = threading.current_thread().ident
+        while self._running:
+            time.sleep(self._sampleInterval)
+            frames = sys._current_frames()
+            with self._lock:
+                for tid, stack in list(self._stacks.items()):
+                    frame = frames.get(tid)
+                    if frame is None or tid == ownId:
+                        continue
+                    phase = stack[-1] if len(stack) > 0 else "other"
+                    code = frame.f_code
+                    self._samples[phase]["%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), frame.f_lineno)] += 1
+
+
+
+def _threadTime():
+    """return the CPU time of the current thread (of the process in older versions of python)"""
+    if hasattr(time, "thread_time"):
+        return time.thread_time()
+    return time.clock() if hasattr(time, "clock") else time.time()
@@ -2,6 +2,8 @@
 from eventregistry.Base import *
 from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
+from eventregistry.RequestContext import RequestContext
+from eventregistry.QueryOptimizer import ComplexQueryOptimizer
 
 
 class QueryArticles(Query):
@@ -215,11 +217,17 @@ class QueryArticles(Query):
 
 
     @staticmethod
-    def initWithComplexQuery(query):
+    def initWithComplexQuery(query, optimize = False):
         """
         create a query using a complex article query
+        @param query: complex query as ComplexArticleQuery instance, string or a python dict
+        @param optimize: if True, the query is first rewritten by the ComplexQueryOptimizer into a simpler equivalent query.
+            An AssertionError is raised if the query can never match any results
         """
         q = QueryArticles()
+        # rewrite the query into a simpler equivalent query. Fails if the query can never match any results
+        if optimize:
+            query = ComplexQueryOptimizer(forArticles = True).optimizeOrFail(query)
         # provided an instance of ComplexArticleQuery
         if isinstance(query, ComplexArticleQuery):
             q._setVal("query", json.dumps(query.getQuery()))
@@ -267,6 +275,8 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
         """
         self._er = eventRegistry
+        # the pages are downloaded within the request context (deadline, cancellation) in which the iteration was started
+        self._context = RequestContext.getCurrent()
         self._sortBy = sortBy
         self._sortByAsc = sortByAsc
         self._returnInfo = returnInfo
@@ -282,12 +292,17 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
 
 
     @staticmethod
-    def initWithComplexQuery(query):
+    def initWithComplexQuery(query, optimize = False):
         """
         @param query: complex query as ComplexArticleQuery instance, string or a python dict
+        @param optimize: if True, the query is first rewritten by the ComplexQueryOptimizer into a simpler equivalent query.
+            An AssertionError is raised if the query can never match any results
         """
         q = QueryArticlesIter()
 
+        # rewrite the query into a simpler equivalent query. Fails if the query can never match any results
+        if optimize:
+            query = ComplexQueryOptimizer(forArticles = True).optimizeOrFail(query)
         # provided an instance of ComplexArticleQuery
         if isinstance(query, ComplexArticleQuery):
             q._setVal("query", json.dumps(query.getQuery()))
@@ -321,18 +336,21 @@ class QueryArticlesIter(QueryArticles, six.Iterator):
         # if we have already obtained all pages, then exit
         if self._totalPages != None and self._articlePage > self._totalPages:
             return
-        self.setRequestedResult(RequestArticlesInfo(page=self._articlePage,
-            sortBy=self._sortBy, sortByAsc=self._sortByAsc,
-            returnInfo = self._returnInfo))
+        with self._er._phase("params"):
+            self.setRequestedResult(RequestArticlesInfo(page=self._articlePage, count=self._articleBatchSize,
+                sortBy=self._sortBy, sortByAsc=self._sortByAsc,
+                returnInfo = self._returnInfo))
         if self._er._verboseOutput:
             print("Downloading article page %d..." % (self._articlePage))
-        res = self._er.execQuery(self)
+        with self._context, self._er._span("iteratorPage", iterator = "QueryArticlesIter", page = self._articlePage):
+            res = self._er.execQuery(self)
         if "error" in res:
             print("Error while obtaining a list of articles: " + res["error"])
         else:
             self._totalPages = res.get("articles", {}).get("pages", 0)
         results = res.get("articles", {}).get("results", [])
         self._articleList.extend(results)
+        self._er._reportIteratorPage("QueryArticlesIter", self._articlePage, len(results))
 
 
     def __iter__(self):
@@ -3,6 +3,7 @@ from eventregistry.Base import *
 from eventregistry.ReturnInfo import *
 from eventregistry.QueryArticles import QueryArticles, RequestArticlesInfo
 from eventregistry.Query import *
+from eventregistry.RequestContext import RequestContext
 
 
 class QueryEvent(Query):
@@ -173,6 +174,9 @@ class QueryEventArticlesIter(QueryEvent, six.Iterator):
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
         """
         self._er = eventRegistry
+        # the pages are downloaded within the request context (deadline, cancellation) in which the iteration was started
+        self._context = RequestContext.getCurrent()
+        self._articleBatchSize = 100    # always download max - uses the fewest requests
         self._articlePage = 0
         self._totalPages = None
         # if we want to return only a subset of items:
@@ -199,18 +203,22 @@ class QueryEventArticlesIter(QueryEvent, six.Iterator):
         if self._er._verboseOutput:
             print("Downloading article page %d from event %s" % (self._articlePage, eventUri))
 
-        self.setRequestedResult(RequestEventArticles(
-            page = self._articlePage,
-            sortBy = self._articlesSortBy, sortByAsc = self._articlesSortByAsc,
-            returnInfo = self._returnInfo,
-            **self.queryParams))
-        res = self._er.execQuery(self)
+        with self._er._phase("params"):
+            self.setRequestedResult(RequestEventArticles(
+                page = self._articlePage,
+                count = self._articleBatchSize,
+                sortBy = self._articlesSortBy, sortByAsc = self._articlesSortByAsc,
+                returnInfo = self._returnInfo,
+                **self.queryParams))
+        with self._context, self._er._span("iteratorPage", iterator = "QueryEventArticlesIter", page = self._articlePage):
+            res = self._er.execQuery(self)
         if "error" in res:
             print(res["error"])
         else:
             self._totalPages = res.get(eventUri, {}).get("articles", {}).get("pages", 0)
         arts = res.get(eventUri, {}).get("articles", {}).get("results", [])
         self._articleList.extend(arts)
+        self._er._reportIteratorPage("QueryEventArticlesIter", self._articlePage, len(arts))
 
 
     def __iter__(self):
@@ -2,6 +2,8 @@
 from eventregistry.Base import *
 from eventregistry.ReturnInfo import *
 from eventregistry.Query import *
+from eventregistry.RequestContext import RequestContext
+from eventregistry.QueryOptimizer import ComplexQueryOptimizer
 
 
 class QueryEvents(Query):
@@ -180,11 +182,17 @@ class QueryEvents(Query):
 
 
     @staticmethod
-    def initWithComplexQuery(query):
+    def initWithComplexQuery(query, optimize = False):
         """
         create a query using a complex event query
+        @param query: complex query as ComplexEventQuery instance, string or a python dict
+        @param optimize: if True, the query is first rewritten by the ComplexQueryOptimizer into a simpler equivalent query.
+            An AssertionError is raised if the query can never match any results
         """
         q = QueryEvents()
+        # rewrite the query into a simpler equivalent query. Fails if the query can never match any results
+        if optimize:
+            query = ComplexQueryOptimizer(forArticles = False).optimizeOrFail(query)
         # provided an instance of ComplexEventQuery
         if isinstance(query, ComplexEventQuery):
             q._setVal("query", json.dumps(query.getQuery()))
@@ -235,6 +243,8 @@ class QueryEventsIter(QueryEvents, six.Iterator):
         @param maxItems: maximum number of items to be returned. Used to stop iteration sooner than results run out
         """
         self._er = eventRegistry
+        # the pages are downloaded within the request context (deadline, cancellation) in which the iteration was started
+        self._context = RequestContext.getCurrent()
         self._sortBy = sortBy
         self._sortByAsc = sortByAsc
         self._returnInfo = returnInfo
@@ -250,8 +260,16 @@ class QueryEventsIter(QueryEvents, six.Iterator):
 
 
     @staticmethod
-    def initWithComplexQuery(query):
+    def initWithComplexQuery(query, optimize = False):
+        """
+        @param query: complex query as ComplexEventQuery instance, string or a python dict
+        @param optimize: if True, the query is first rewritten by the ComplexQueryOptimizer into a simpler equivalent query.
+            An AssertionError is raised if the query can never match any results
+        """
         q = QueryEventsIter()
+        # rewrite the query into a simpler equivalent query. Fails if the query can never match any results
+        if optimize:
+            query = ComplexQueryOptimizer(forArticles = False).optimizeOrFail(query)
         # provided an instance of ComplexEventQuery
         if isinstance(query, ComplexEventQuery):
             q._setVal("query", json.dumps(query.getQuery()))
@@ -273,19 +291,22 @@ class QueryEventsIter(QueryEvents, six.Iterator):
         # if we have already obtained all pages, then exit
         if self._totalPages != None and self._eventPage > self._totalPages:
             return
-        self.setRequestedResult(RequestEventsInfo(page=self._eventPage, count=self._eventBatchSize,
-            sortBy= self._sortBy, sortByAsc=self._sortByAsc,
-            returnInfo = self._returnInfo))
+        with self._er._phase("params"):
+            self.setRequestedResult(RequestEventsInfo(page=self._eventPage, count=self._eventBatchSize,
+                sortBy= self._sortBy, sortByAsc=self._sortByAsc,
+                returnInfo = self._returnInfo))
         # download articles and make sure that we set the same archive flag as it was returned when we were processing the uriList request
         if self._er._verboseOutput:
             print("Downloading event page %d..." % (self._eventPage))
-        res = self._er.execQuery(self)
+        with self._context, self._er._span("iteratorPage", iterator = "QueryEventsIter", page = self._eventPage):
+            res = self._er.execQuery(self)
         if "error" in res:
             print("Error while obtaining a list of events: " + res["error"])
         else:
             self._totalPages = res.get("events", {}).get("pages", 0)
         results = res.get("events", {}).get("results", [])
         self._eventList.extend(results)
+        self._er._reportIteratorPage("QueryEventsIter", self._eventPage, len(results))
 
 
     def __iter__(self):
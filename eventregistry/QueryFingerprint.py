@@ -0,0 +1,156 @@
+"""
+utilities for computing a canonical (normalized) form of a query and a fingerprint (hash) of it
+
+the same query can be provided in many byte-different forms (different order of dict keys,
+lists vs QueryItems, dates as strings or date objects, complex queries as dicts or json strings, ...).
+All such variants have the same canonical form and therefore also the same fingerprint, which makes
+the fingerprint usable as a key for caching, de-duplication of requests, etc.
+"""
+import six, json, hashlib, datetime
+
+from eventregistry.Base import QueryParamsBase, QueryItems
+from eventregistry.Query import _QueryCore
+
+
+# parameters that have no influence on the returned results and are not part of the canonical form
+ignoredParams = set(["apiKey"])
+
+# parameters that contain a json encoded object (complex queries, topic page definitions)
+jsonEncodedParams = set(["query", "topicPage"])
+
+# properties in complex queries that can be removed if they have the default value
+complexQueryDefaults = { "keywordLoc": "body" }
+
+# operators that are only relevant if the corresponding property contains multiple values
+operatorParams = {
+    "keywordOper": "keyword",
+    "conceptOper": "conceptUri",
+    "categoryOper": "categoryUri",
+    "sourceOper": "sourceUri",
+    "sourceGroupOper": "sourceGroupUri",
+    "authorOper": "authorUri"
+}
+
+
+def _isScalar(val):
+    return val is None or isinstance(val, (six.string_types, six.integer_types, float, bool))
+
+
+def _sortKey(val):
+    return json.dumps(val, sort_keys = True, separators = (",", ":"))
+
+
+def _canonicalizeValue(val, inComplexQuery):
+    """return the canonical version of a single value"""
+    if isinstance(val, QueryItems):
+        val = { val.getOper(): val.getItems() }
+    if isinstance(val, _QueryCore):
+        val = val.getQuery()
+    if isinstance(val, datetime.datetime):
+        return QueryParamsBase.encodeDateTime(val)
+    if isinstance(val, datetime.date):
+        return QueryParamsBase.encodeDate(val)
+    if isinstance(val, six.binary_type):
+        return val.decode("utf8")
+    if isinstance(val, dict):
+        return _canonicalizeDict(val, inComplexQuery)
+    if isinstance(val, (list, tuple, set, frozenset)):
+        items = [_canonicalizeValue(v, inComplexQuery) for v in val]
+        if len(items) == 1 and _isScalar(items[0]):
+            return items[0]
+        # the order of values is irrelevant in lists of simple values
+        if all(_isScalar(v) for v in items):
+            return sorted(items, key = _sortKey)
+        return items
+    return val
+
+
+def _canonicalizeDict(obj, inComplexQuery):
+    ret = {}
+    for key, val in obj.items():
+        if isinstance(key, six.binary_type):
+            key = key.decode("utf8")
+        if inComplexQuery and complexQueryDefaults.get(key, None) == val:
+            continue
+        val = _canonicalizeValue(val, inComplexQuery)
+        # the order of the conditions in the $and and $or lists has no effect on the results
+        if key in ("$and", "$or") and isinstance(val, list):
+            # a single condition in $and/$or is equivalent to the condition itself
+            if len(val) == 1 and len(obj) == 1:
+                return val[0] if isinstance(val[0], dict) else { key: val[0] }
+            val = sorted(val, key = _sortKey)
+        ret[key] = val
+    # an { "$and": "x" } or { "$or": "x" } with a single value is just the value
+    if len(ret) == 1 and inComplexQuery:
+        key = list(ret.keys())[0]
+        if key in ("$and", "$or") and _isScalar(ret[key]):
+            return ret[key]
+    return ret
+
+
+def canonicalizeParams(paramDict):
+    """
+    return the canonical version of the parameters that are sent to Event Registry
+    @param paramDict: dict with the parameters of the request (as returned by Query._getQueryParams())
+    """
+    ret = {}
+    for key, val in paramDict.items():
+        if key in ignoredParams or val is None:
+            continue
+        if key in jsonEncodedParams:
+            if isinstance(val, six.string_types):
+                val = json.loads(val)
+            ret[key] = _canonicalizeValue(val, True)
+        else:
+            ret[key] = _canonicalizeValue(val, False)
+    # operators are irrelevant if there are less than two values for the property
+    for operName, propName in operatorParams.items():
+        if operName in ret and not isinstance(ret.get(propName), list):
+            del ret[operName]
+    return ret
+
+
+def canonicalizeQuery(query):
+    """
+    return the canonical (normalized) version of the query
+    @param query: an instance of a class based on QueryParamsBase (QueryArticles, QueryEvents, ...),
+        an instance of ComplexArticleQuery, ComplexEventQuery, CombinedQuery or BaseQuery,
+        or a complex query provided as a python dict or a string containing the json object
+    """
+    if isinstance(query, QueryParamsBase):
+        # queries that don't have the result type set yet are represented only by the conditions
+        if len(getattr(query, "resultTypeList", [None])) == 0:
+            return canonicalizeParams(query.queryParams)
+        return canonicalizeParams(query._getQueryParams())
+    if isinstance(query, _QueryCore):
+        return _canonicalizeValue(query.getQuery(), True)
+    if isinstance(query, six.string_types):
+        return _canonicalizeValue(json.loads(query), True)
+    if isinstance(query, dict):
+        return _canonicalizeValue(query, True)
+    assert False, "The query parameter was not a query instance, a complex query, a string or a python dict"
+
+
+def _hashCanonical(obj):
+    encoded = json.dumps(obj, sort_keys = True, separators = (",", ":"), ensure_ascii = False)
+    return hashlib.sha1(encoded.encode("utf8")).hexdigest()
+
+
+def getQueryFingerprint(query):
+    """
+    return the fingerprint of the query - a hex string that is the same for all equivalent forms of the query
+    @param query: any of the query types supported by canonicalizeQuery()
+    """
+    canonical = canonicalizeQuery(query)
+    if hasattr(query, "_getPath"):
+        canonical = { "path": query._getPath(), "params": canonical }
+    return _hashCanonical(canonical)
+
+
+def getRequestFingerprint(methodUrl, paramDict):
+    """
+    return the fingerprint of a request made using EventRegistry.jsonRequest()
+    @param methodUrl: url on er (e.g. "/api/v1/article")
+    @param paramDict: dict with the parameters of the request
+    """
+    return _hashCanonical({ "path": methodUrl, "params": canonicalizeParams(paramDict or {}) })
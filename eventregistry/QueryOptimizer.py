@@ -0,0 +1,348 @@
+"""
+optimizer for the complex queries (trees of CombinedQuery and BaseQuery conditions)
+
+the optimizer rewrites a complex query into an equivalent query that is simpler to execute:
+nested $and/$or conditions are flattened, duplicated conditions are removed, simple conditions
+are merged into a single condition and date ranges are folded. It also detects the queries that
+can never match any results, so that one does not have to pay for a request to find that out.
+"""
+import six, json, copy
+
+from eventregistry.Query import _QueryCore, ComplexArticleQuery, ComplexEventQuery
+from eventregistry.QueryFingerprint import _canonicalizeValue, _sortKey
+
+
+# properties of a BaseQuery that can contain multiple values combined using $and or $or
+multiValueProps = set(["keyword", "conceptUri", "categoryUri", "sourceUri", "locationUri", "lang", "sourceLocationUri", "sourceGroupUri", "authorUri"])
+# properties for which an article can have only a single value. $and between different values can never match
+articleSingleValueProps = set(["lang", "sourceUri"])
+
+
+class ComplexQueryOptimizer(object):
+    """
+    rewrites complex article or event queries into equivalent, but simpler queries.
+    Use getChanges() after calling optimize() to see what was changed and neverMatches()
+    to check if the query can match any results at all.
+    """
+    def __init__(self, forArticles = True):
+        """
+        @param forArticles: True if the query will be used to search for articles, False if it will be used for events.
+            If an instance of ComplexArticleQuery or ComplexEventQuery is optimized, the value is determined automatically.
+        """
+        self._forArticles = forArticles
+        self._changes = []
+        self._neverMatchReasons = []
+
+
+    def getChanges(self):
+        """return the list of descriptions of the changes made to the query by the last call to optimize()"""
+        return self._changes
+
+
+    def neverMatches(self):
+        """return True if the last optimized query can never match any results"""
+        return len(self._neverMatchReasons) > 0
+
+
+    def getNeverMatchReasons(self):
+        """return the list of reasons why the last optimized query can not match any results"""
+        return self._neverMatchReasons
+
+
+    def optimize(self, query):
+        """
+        return the optimized version of the query as a python dict
+        @param query: an instance of ComplexArticleQuery, ComplexEventQuery, CombinedQuery or BaseQuery, a python dict or a string containing the json object
+        """
+        self._changes = []
+        self._neverMatchReasons = []
+        forArticles = self._forArticles
+        if isinstance(query, ComplexArticleQuery):
+            self._forArticles = True
+        elif isinstance(query, ComplexEventQuery):
+            self._forArticles = False
+        try:
+            if isinstance(query, _QueryCore):
+                query = query.getQuery()
+            elif isinstance(query, six.string_types):
+                query = json.loads(query)
+            assert isinstance(query, dict), "The query parameter was not a complex query, a string or a python dict"
+            query = copy.deepcopy(query)
+            # a complex query with $query and potentially $filter
+            if "$query" in query:
+                query["$query"] = self._optimizeCond(query["$query"])
+                self._checkFilter(query.get("$filter", {}))
+                return query
+            # just the conditions
+            return self._optimizeCond(query)
+        finally:
+            self._forArticles = forArticles
+
+
+    def optimizeOrFail(self, query):
+        """
+        return the optimized version of the query as a python dict. Raise an AssertionError if the query can never match any results
+        @param query: query in any of the forms supported by optimize()
+        """
+        ret = self.optimize(query)
+        assert not self.neverMatches(), "The complex query can never match any results: " + "; ".join(self._neverMatchReasons)
+        return ret
+
+
+    #
+    # internal methods
+
+    def _addChange(self, text):
+        self._changes.append(text)
+
+
+    def _addNeverMatch(self, text):
+        self._neverMatchReasons.append(text)
+
+
+    def _key(self, cond):
+        return _sortKey(_canonicalizeValue(cond, True))
+
+
+    def _isCombined(self, cond):
+        return "$and" in cond or "$or" in cond
+
+
+    def _optimizeCond(self, cond):
+        """optimize a single condition (BaseQuery or CombinedQuery as a dict) and return it"""
+        if "$not" in cond:
+            start = len(self._neverMatchReasons)
+            cond["$not"] = self._optimizeCond(cond["$not"])
+            # excluding results of a condition that can never match does not exclude anything
+            if len(self._neverMatchReasons) > start:
+                del self._neverMatchReasons[start:]
+                del cond["$not"]
+                self._addChange("removed a $not condition that can never match")
+        if self._isCombined(cond):
+            cond = self._optimizeCombined(cond)
+        else:
+            cond = self._optimizeBase(cond)
+        # a condition that excludes itself can not match anything
+        if "$not" in cond:
+            positive = dict((key, val) for key, val in cond.items() if key != "$not")
+            if self._key(positive) == self._key(cond["$not"]):
+                self._addNeverMatch("the condition %s is excluded by its own $not" % (json.dumps(positive, sort_keys = True)))
+        return cond
+
+
+    def _optimizeCombined(self, cond):
+        oper = "$and" if "$and" in cond else "$or"
+        children = []
+        failedChildren = []
+        failedReasons = []
+        for child in cond[oper]:
+            start = len(self._neverMatchReasons)
+            child = self._optimizeCond(child)
+            # conditions in $or that can never match don't have any effect on the results
+            if oper == "$or" and len(self._neverMatchReasons) > start:
+                failedReasons.extend(self._neverMatchReasons[start:])
+                del self._neverMatchReasons[start:]
+                failedChildren.append(child)
+            else:
+                children.append(child)
+        if len(children) == 0:
+            children = failedChildren
+            self._neverMatchReasons.extend(failedReasons)
+        elif len(failedChildren) > 0:
+            self._addChange("removed %d condition(s) that can never match from $or" % (len(failedChildren)))
+
+        # flatten nested conditions that use the same operator
+        flat = []
+        for child in children:
+            if oper in child and len(child) == 1:
+                self._addChange("flattened a nested %s condition" % (oper))
+                flat.extend(child[oper])
+            else:
+                flat.append(child)
+
+        # remove duplicated conditions
+        unique = []
+        seen = set()
+        for child in flat:
+            key = self._key(child)
+            if key in seen:
+                self._addChange("removed a duplicated condition %s" % (json.dumps(child, sort_keys = True)))
+                continue
+            seen.add(key)
+            unique.append(child)
+
+        if oper == "$and":
+            unique = self._mergeAndConds(unique)
+            if "$not" in cond:
+                notKey = self._key(cond["$not"])
+                for child in unique:
+                    if self._key(child) == notKey:
+                        self._addNeverMatch("the condition %s is required and excluded at the same time" % (json.dumps(child, sort_keys = True)))
+        else:
+            unique = self._mergeOrConds(unique)
+
+        # a combined condition with a single child is equivalent to the child
+        if len(unique) == 1:
+            child = unique[0]
+            if "$not" not in cond:
+                self._addChange("replaced %s with a single condition by the condition itself" % (oper))
+                return child
+            if "$not" not in child:
+                self._addChange("replaced %s with a single condition by the condition itself" % (oper))
+                child["$not"] = cond["$not"]
+                return child
+        ret = { oper: unique }
+        if "$not" in cond:
+            ret["$not"] = cond["$not"]
+        return ret
+
+
+    def _optimizeBase(self, cond):
+        """normalize the values in a simple condition and check if it can match anything"""
+        if cond.get("keywordLoc") == "body":
+            del cond["keywordLoc"]
+        for prop in list(cond.keys()):
+            if prop in multiValueProps and isinstance(cond[prop], dict):
+                oper = list(cond[prop].keys())[0]
+                items = cond[prop][oper]
+                uniqueItems = []
+                for item in items:
+                    if item not in uniqueItems:
+                        uniqueItems.append(item)
+                if len(uniqueItems) < len(items):
+                    self._addChange("removed duplicated values of '%s'" % (prop))
+                if len(uniqueItems) == 1:
+                    self._addChange("replaced %s with a single value of '%s' by the value itself" % (oper, prop))
+                    cond[prop] = uniqueItems[0]
+                else:
+                    cond[prop] = { oper: uniqueItems }
+        self._checkBase(cond)
+        return cond
+
+
+    def _checkBase(self, cond):
+        if cond.get("dateStart") and cond.get("dateEnd") and cond["dateStart"] > cond["dateEnd"]:
+            self._addNeverMatch("dateStart %s is after dateEnd %s" % (cond["dateStart"], cond["dateEnd"]))
+        if "minArticlesInEvent" in cond and "maxArticlesInEvent" in cond and cond["minArticlesInEvent"] > cond["maxArticlesInEvent"]:
+            self._addNeverMatch("minArticlesInEvent is larger than maxArticlesInEvent")
+        if self._forArticles:
+            for prop in articleSingleValueProps:
+                val = cond.get(prop)
+                if isinstance(val, dict) and "$and" in val and len(val["$and"]) > 1:
+                    self._addNeverMatch("an article can not have multiple values of '%s' at the same time (%s)" % (prop, ", ".join(val["$and"])))
+
+
+    def _checkFilter(self, filter):
+        if filter.get("minSentiment") is not None and filter.get("maxSentiment") is not None and filter["minSentiment"] > filter["maxSentiment"]:
+            self._addNeverMatch("minSentiment is larger than maxSentiment")
+        if filter.get("startSourceRankPercentile", 0) >= filter.get("endSourceRankPercentile", 100):
+            self._addNeverMatch("startSourceRankPercentile is not lower than endSourceRankPercentile")
+
+
+    def _isSimple(self, cond):
+        """is the condition a simple condition without exclusions"""
+        return not self._isCombined(cond) and "$not" not in cond
+
+
+    def _andValues(self, val1, val2):
+        """return the value that requires both val1 and val2 or None if such a value can not be expressed"""
+        if val1 == val2:
+            return val1
+        items = []
+        for val in [val1, val2]:
+            if isinstance(val, six.string_types):
+                items.append(val)
+            elif isinstance(val, dict) and "$and" in val:
+                items.extend(val["$and"])
+            else:
+                return None
+        uniqueItems = []
+        for item in items:
+            if item not in uniqueItems:
+                uniqueItems.append(item)
+        return { "$and": uniqueItems } if len(uniqueItems) > 1 else uniqueItems[0]
+
+
+    def _mergeAnd(self, cond1, cond2):
+        """merge two simple conditions that both have to match into one. Return None if not possible"""
+        if "keyword" in cond1 and "keyword" in cond2 and cond1.get("keywordLoc", "body") != cond2.get("keywordLoc", "body"):
+            return None
+        if "dateMention" in cond1 and "dateMention" in cond2 and cond1["dateMention"] != cond2["dateMention"]:
+            return None
+        merged = dict(cond1)
+        for prop, val in cond2.items():
+            if prop not in merged:
+                merged[prop] = val
+            elif prop == "keywordLoc":
+                merged[prop] = cond1[prop] if "keyword" in cond1 else val
+            elif prop in ("dateStart", "minArticlesInEvent"):
+                merged[prop] = max(merged[prop], val)
+            elif prop in ("dateEnd", "maxArticlesInEvent"):
+                merged[prop] = min(merged[prop], val)
+            elif prop in multiValueProps:
+                andVal = self._andValues(merged[prop], val)
+                if andVal is None:
+                    return None
+                merged[prop] = andVal
+            elif merged[prop] != val:
+                return None
+        if merged.get("keywordLoc") is not None and "keyword" not in merged:
+            del merged["keywordLoc"]
+        return merged
+
+
+    def _mergeAndConds(self, conds):
+        merged = []
+        for cond in conds:
+            if self._isSimple(cond):
+                for i, other in enumerate(merged):
+                    if not self._isSimple(other):
+                        continue
+                    newCond = self._mergeAnd(other, cond)
+                    if newCond is not None:
+                        if ("dateStart" in cond and "dateStart" in other) or ("dateEnd" in cond and "dateEnd" in other):
+                            self._addChange("folded date ranges of conditions in $and")
+                        self._addChange("merged conditions %s and %s in $and" % (json.dumps(other, sort_keys = True), json.dumps(cond, sort_keys = True)))
+                        merged[i] = newCond
+                        self._checkBase(newCond)
+                        break
+                else:
+                    merged.append(cond)
+            else:
+                merged.append(cond)
+        return merged
+
+
+    def _mergeOrConds(self, conds):
+        """merge simple conditions in $or that differ only in the value of a single property"""
+        merged = []
+        for cond in conds:
+            if self._isSimple(cond):
+                for i, other in enumerate(merged):
+                    if not self._isSimple(other) or set(other.keys()) != set(cond.keys()):
+                        continue
+                    diffProps = [prop for prop in cond if cond[prop] != other[prop]]
+                    if len(diffProps) != 1 or diffProps[0] not in multiValueProps:
+                        continue
+                    prop = diffProps[0]
+                    items = []
+                    for val in [other[prop], cond[prop]]:
+                        if isinstance(val, six.string_types):
+                            items.append(val)
+                        elif isinstance(val, dict) and "$or" in val:
+                            items.extend(val["$or"])
+                        else:
+                            items = None
+                            break
+                    if items is None:
+                        continue
+                    self._addChange("merged conditions %s and %s in $or" % (json.dumps(other, sort_keys = True), json.dumps(cond, sort_keys = True)))
+                    newCond = dict(other)
+                    newCond[prop] = { "$or": [item for j, item in enumerate(items) if item not in items[:j]] }
+                    merged[i] = newCond
+                    break
+                else:
+                    merged.append(cond)
+            else:
+                merged.append(cond)
+        return merged
@@ -0,0 +1,238 @@
+"""
+compact record types for the returned articles, events, stories, concepts, sources and locations.
+
+The results of a large download (e.g. millions of articles from QueryArticlesIter) take a lot of memory when they are
+kept as dicts, since each dict has its own hash table. The records store the values in __slots__ instead. Each record
+type has a slot for every property that can be requested using the corresponding flags (ArticleInfoFlags, EventInfoFlags,
+StoryInfoFlags, ConceptInfoFlags, SourceInfoFlags, LocationInfoFlags). Only the returned properties are set - the
+properties that were not requested are missing (hasattr() and has() return False), the same as for the Struct. The
+returned properties that have no slot (e.g. added in a newer version of the API) are kept in an overflow dict and can
+be accessed in the same way. The nested sources, concepts, locations, stories and articles are decoded to records as well.
+
+    decoder = RecordDecoder()
+    articles = [art for art in decoder.iterate(QueryArticlesIter(keywords = "Obama").execQuery(er), Article)]
+    print(articles[0].title, articles[0].source.title)
+
+    # or decode a whole response (bytes, str or dict)
+    res = decoder.decode(er.execQuery(QueryArticles(keywords = "Obama")))
+    print(res["articles"]["results"][0].uri)
+
+When orjson is installed, it is used to decode the responses given as bytes or str.
+"""
+import six, json
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class Record(object):
+    """base class of the records"""
+    __slots__ = ("_extra",)
+    _fieldSet = frozenset()
+    # property name -> record type of the value (or of the items of the list)
+    _nested = {}
+
+    def __init__(self, data):
+        extra = None
+        for key, value in data.items():
+            if key in self._fieldSet:
+                recordType = self._nested.get(key)
+                if recordType != None and value is not None:
+                    value = _decodeValue(recordType, value)
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+
+
+    def __getattr__(self, name):
+        # called only for the properties that were not set. The properties without a slot are looked up in the overflow dict
+        if name.startswith("__") or name == "_extra":
+            raise AttributeError(name)
+        extra = self._extra
+        if extra is None or name not in extra:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        return extra[name]
+
+
+    def __getstate__(self):
+        return self.toDict()
+
+
+    def __setstate__(self, data):
+        self.__init__(data)
+
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.toDict() == other.toDict()
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.toDict())
+
+
+    def has(self, key):
+        """was the property returned"""
+        return hasattr(self, key)
+
+
+    def get(self, key, default = None):
+        """return the value of the property or default if it was not returned"""
+        return getattr(self, key, default)
+
+
+    def getExtra(self):
+        """return the dict with the returned properties that have no slot in the record"""
+        return dict(self._extra or {})
+
+
+    def toDict(self):
+        """return the record (and the nested records) as a dict, as returned by the API"""
+        ret = {}
+        for key in type(self).__slots__:
+            if hasattr(self, key):
+                ret[key] = _encodeValue(getattr(self, key))
+        if self._extra:
+            ret.update(self._extra)
+        return ret
+
+
+
+class Location(Record):
+    """location of an article, event, concept or source (LocationInfoFlags)"""
+    __slots__ = ("type", "label", "wikiUri", "geoNamesId", "lat", "long", "population", "area", "continent",
+        "featureCode", "country")
+    _fieldSet = frozenset(__slots__)
+
+
+
+class Concept(Record):
+    """concept of an article, event or story (ConceptInfoFlags)"""
+    __slots__ = ("uri", "type", "score", "label", "synonyms", "image", "description", "trendingScore", "location")
+    _fieldSet = frozenset(__slots__)
+
+
+
+class Source(Record):
+    """news source (SourceInfoFlags)"""
+    __slots__ = ("uri", "dataType", "title", "description", "location", "ranking", "image", "thumbImage", "favicon", "socialMedia")
+    _fieldSet = frozenset(__slots__)
+
+
+
+class Article(Record):
+    """article (ArticleInfoFlags)"""
+    __slots__ = ("uri", "lang", "isDuplicate", "date", "time", "dateTime", "dateTimePub", "dataType", "sim", "wgt", "relevance",
+        "url", "title", "body", "source", "eventUri", "authors", "concepts", "categories", "links", "videos", "image",
+        "shares", "sentiment", "location", "dates", "extractedDates", "originalArticle", "duplicateList", "storyUri")
+    _fieldSet = frozenset(__slots__)
+
+
+
+class Story(Record):
+    """story - cluster of articles in the same language (StoryInfoFlags)"""
+    __slots__ = ("uri", "lang", "count", "eventUri", "wgt", "location", "date", "title", "summary", "concepts", "categories",
+        "medoidArticle", "infoArticle", "commonDates", "socialScore", "images")
+    _fieldSet = frozenset(__slots__)
+
+
+
+class Event(Record):
+    """event (EventInfoFlags)"""
+    __slots__ = ("uri", "eventDate", "totalArticleCount", "wgt", "relevance", "sentiment", "title", "summary", "articleCounts",
+        "concepts", "categories", "location", "images", "commonDates", "infoArticle", "stories", "socialScore")
+    _fieldSet = frozenset(__slots__)
+
+
+Location._nested = { "country": Location }
+Concept._nested = { "location": Location }
+Source._nested = { "location": Location }
+Article._nested = { "source": Source, "concepts": Concept, "location": Location, "originalArticle": Article, "duplicateList": Article }
+Story._nested = { "location": Location, "concepts": Concept, "medoidArticle": Article, "infoArticle": Article }
+Event._nested = { "concepts": Concept, "location": Location, "infoArticle": Article, "stories": Story }
+
+
+
+class RecordDecoder(object):
+    def __init__(self, loads = None):
+        """
+        decoder of the responses to the records
+        @param loads: function used to decode the responses given as bytes or str. If None, orjson.loads is used when
+            orjson is installed and json.loads otherwise
+        """
+        self._loads = loads or _loads
+
+
+    def decode(self, content):
+        """
+        decode the response to a dict in which the lists of the returned articles and events are lists of records
+        @param content: response as bytes, str or dict (e.g. as returned by EventRegistry.execQuery())
+        @returns: dict with the same content as the response. The "articles" and "events" results (also the ones returned
+            under the uri of the event by QueryEvent) are lists of Article and Event records
+        """
+        data = self._loads(content) if isinstance(content, (bytes, six.text_type)) else content
+        ret = self._decodeResults(data)
+        for key, value in ret.items():
+            if key not in ("articles", "events") and isinstance(value, dict):
+                ret[key] = self._decodeResults(value)
+        return ret
+
+
+    def decodeArticles(self, content):
+        """return the list of Article records in the response (bytes, str or dict) to a query for articles"""
+        return self.decode(content).get("articles", {}).get("results", [])
+
+
+    def decodeEvents(self, content):
+        """return the list of Event records in the response (bytes, str or dict) to a query for events"""
+        return self.decode(content).get("events", {}).get("results", [])
+
+
+    def iterate(self, items, recordType = Article):
+        """
+        return a generator decoding the items returned by an iterator (e.g. QueryArticlesIter) to records
+        @param items: iterable of the returned dicts
+        @param recordType: Article, Event, Story, Concept, Source or Location
+        """
+        for item in items:
+            yield recordType(item)
+
+
+    #
+    # internal methods
+
+    def _decodeResults(self, data):
+        """return the copy of the dict in which the articles and events results are decoded to records"""
+        ret = dict(data)
+        for key, recordType in (("articles", Article), ("events", Event)):
+            value = data.get(key)
+            if isinstance(value, dict) and isinstance(value.get("results"), list):
+                ret[key] = dict(value)
+                ret[key]["results"] = [recordType(item) for item in value["results"]]
+        return ret
+
+
+
+def _decodeValue(recordType, value):
+    if isinstance(value, dict):
+        return recordType(value)
+    if isinstance(value, list):
+        return [recordType(v) if isinstance(v, dict) else v for v in value]
+    return value
+
+
+def _encodeValue(value):
+    if isinstance(value, Record):
+        return value.toDict()
+    if isinstance(value, list):
+        return [v.toDict() if isinstance(v, Record) else v for v in value]
+    return value
@@ -0,0 +1,141 @@
+"""
+the RequestContext describes on behalf of which job the requests to Event Registry are made.
+The context is set for the current thread using the with statement and applies to all requests
+made inside it (including the requests made by the iterators):
+
+    with RequestContext(jobId = "dailyExport", priority = "backfill"):
+        for art in QueryArticlesIter(keywords = "Apple").execQuery(er):
+            ...
+
+A context can also set a deadline for all requests made inside it. The requests are not repeated after
+the deadline and RequestTimeoutError is raised instead. The requests can be cancelled from another thread by
+calling cancel() on the context - the request that is currently waiting to be repeated and all subsequent
+requests then raise RequestCancelledError:
+
+    with RequestContext(timeout = 60) as ctx:
+        res = er.execQuery(q)
+"""
+import threading, time
+
+
+# supported priority classes, from the most to the least important
+priorityClasses = ["interactive", "feed", "backfill"]
+
+
+class RequestTimeoutError(Exception):
+    """raised when a request could not be completed before the deadline"""
+    pass
+
+
+
+class RequestCancelledError(Exception):
+    """raised when the requests were cancelled by calling RequestContext.cancel()"""
+    pass
+
+
+
+class RequestContext(object):
+    _local = threading.local()
+
+    def __init__(self, jobId = None, priority = "feed", tenantId = None, timeout = None, deadline = None):
+        """
+        @param jobId: name of the job that makes the requests. Used to track the spending of tokens per job
+        @param priority: priority of the requests. "interactive" (user is waiting for the results),
+            "feed" (regular processing, default) or "backfill" (bulk downloads that can wait)
+        @param tenantId: name of the team or customer on behalf of which the requests are made. Used by the RequestScheduler to share the requests fairly
+        @param timeout: number of seconds (from first entering the context) within which all requests have to complete. None for no limit
+        @param deadline: time (as returned by time.time()) by which all requests have to complete. None for no limit
+        """
+        assert priority in priorityClasses, "priority should be one of: " + ", ".join(priorityClasses)
+        self.jobId = jobId
+        self.priority = priority
+        self.tenantId = tenantId
+        self._timeout = timeout
+        self.deadline = deadline
+        self._parent = None
+        self._cancelled = threading.Event()
+
+
+    def __enter__(self):
+        # entering the default context (e.g. by an iterator that was created outside of any context) has no effect
+        if self is _defaultContext:
+            return self
+        stack = RequestContext._getStack()
+        # the context can be entered multiple times (e.g. by the iterators for each downloaded page or in other threads).
+        # The enclosing context is the one in which it was first entered
+        if self._parent is None and len(stack) > 0 and self not in stack:
+            self._parent = stack[-1]
+        if self._timeout is not None:
+            deadline = time.time() + self._timeout
+            self.deadline = deadline if self.deadline is None else min(self.deadline, deadline)
+            self._timeout = None
+        # the requests have to complete also before the deadline of the enclosing context
+        if self._parent is not None and self._parent.deadline is not None:
+            self.deadline = self._parent.deadline if self.deadline is None else min(self.deadline, self._parent.deadline)
+        stack.append(self)
+        return self
+
+
+    def __exit__(self, excType, excValue, tb):
+        if self is not _defaultContext:
+            RequestContext._getStack().pop()
+
+
+    def cancel(self):
+        """cancel the requests made in this context. Can be called from any thread"""
+        self._cancelled.set()
+
+
+    def isCancelled(self):
+        """were the requests in this context (or in the enclosing context) cancelled"""
+        return self._cancelled.is_set() or (self._parent is not None and self._parent.isCancelled())
+
+
+    def getRemainingTime(self):
+        """return the number of seconds until the deadline (None if there is no deadline)"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.time(), 0)
+
+
+    def checkActive(self):
+        """raise RequestCancelledError or RequestTimeoutError if the requests were cancelled or the deadline has passed"""
+        if self.isCancelled():
+            raise RequestCancelledError("The requests were cancelled")
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise RequestTimeoutError("The requests could not be completed before the deadline")
+
+
+    def sleep(self, seconds):
+        """
+        sleep for the given number of seconds, but not beyond the deadline. Wakes up immediately when the context is cancelled
+        """
+        remaining = self.getRemainingTime()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        while seconds > 0 and not self.isCancelled():
+            # cancelling of the enclosing contexts is noticed by periodically checking them
+            step = min(seconds, 0.1) if self._parent is not None else seconds
+            startTime = time.time()
+            self._cancelled.wait(step)
+            seconds -= time.time() - startTime
+
+
+    @staticmethod
+    def _getStack():
+        if not hasattr(RequestContext._local, "stack"):
+            RequestContext._local.stack = []
+        return RequestContext._local.stack
+
+
+    @staticmethod
+    def getCurrent():
+        """return the context that applies to the requests made in the current thread"""
+        stack = RequestContext._getStack()
+        if len(stack) > 0:
+            return stack[-1]
+        return _defaultContext
+
+
+
+_defaultContext = RequestContext()
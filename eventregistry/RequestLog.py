@@ -0,0 +1,242 @@
+"""
+the RequestLog writes a structured log of the requests made to Event Registry.
+
+Each request attempt is logged as one json line with the time, endpoint, host, duration, status code,
+number of response bytes, the tokens used (req-tokens header) and the use of the archive (req-archive header).
+
+Logging a request only puts the entry into a queue. The entries are serialized and written to the file in batches
+by a background thread, so logging does not slow down the requests. The entries that are still queued when the
+process exits are written by close(), which is called automatically at exit. When the file grows over maxBytes or is older
+than maxAge seconds, it is rotated (requests_log.jsonl -> requests_log.jsonl.1.gz, ...) and the old file is compressed.
+
+Use it by providing an instance (or just a file name) as the logging parameter when creating EventRegistry:
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, logging = RequestLog("/var/log/er/requests.jsonl", maxBytes = 50 * 1024 * 1024))
+"""
+import os, json, time, gzip, shutil, threading, logging, atexit
+from six.moves import queue
+
+
+class RequestLog(object):
+    def __init__(self,
+                 fileName = "requests_log.jsonl",
+                 maxBytes = 10 * 1024 * 1024,
+                 maxAge = None,
+                 backupCount = 5,
+                 compress = True,
+                 flushInterval = 1.0,
+                 maxQueueSize = 100000,
+                 logParams = True):
+        """
+        @param fileName: path of the log file. Relative paths are relative to the current working directory
+        @param maxBytes: the file is rotated when it grows over maxBytes. None to not rotate based on the size
+        @param maxAge: the file is rotated when it is older than maxAge seconds. None to not rotate based on the time
+        @param backupCount: number of rotated files to keep
+        @param compress: compress the rotated files using gzip
+        @param flushInterval: max number of seconds before the logged entries are written to the file
+        @param maxQueueSize: max number of entries waiting to be written. When the queue is full, new entries are dropped
+        @param logParams: include the parameters of the requests in the log (without the API key)
+        """
+        self._fileName = os.path.abspath(fileName)
+        self._maxBytes = maxBytes
+        self._maxAge = maxAge
+        self._backupCount = backupCount
+        self._compress = compress
+        self._flushInterval = flushInterval
+        self._logParams = logParams
+        self._queue = queue.Queue(maxQueueSize)
+        self._file = None
+        self._fileOpenTime = None
+        self._writtenCount = 0
+        self._droppedCount = 0
+        self._rotationCount = 0
+        self._thread = None
+        self._threadLock = threading.Lock()
+        # held while writing to the file and while closing it
+        self._fileLock = threading.Lock()
+
+
+    def getFileName(self):
+        """return the path of the log file"""
+        return self._fileName
+
+
+    def log(self, methodUrl, host = None, paramDict = None, startTime = None, duration = None, respInfo = None, attempt = 1, error = None):
+        """
+        log a request attempt. The entry is written to the file by the background thread
+        @param methodUrl: endpoint that was called
+        @param host: host to which the request was made
+        @param paramDict: parameters of the request
+        @param startTime: time when the request was made
+        @param duration: number of seconds until the response was received (or the request failed)
+        @param respInfo: the response to the request (None if no response was received)
+        @param attempt: number of the attempt (1 for the first attempt, 2 for the first repeated attempt, ...)
+        @param error: the exception raised while making the request, if any
+        """
+        entry = {
+            "time": startTime or time.time(),
+            "endpoint": methodUrl,
+            "host": host,
+            "attempt": attempt,
+            "duration": duration
+        }
+        if self._logParams and paramDict != None:
+            # the parameters are modified by the later attempts - keep a copy
+            entry["params"] = dict(paramDict)
+        if respInfo != None:
+            entry["status"] = respInfo.status_code
+            entry["responseBytes"] = _getResponseSize(respInfo)
+            entry["tokens"] = respInfo.headers.get("req-tokens")
+            entry["archive"] = respInfo.headers.get("req-archive")
+        if error != None:
+            entry["error"] = str(error)
+        if self._thread is None:
+            self._startWriter()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._droppedCount += 1
+
+
+    def flush(self, timeout = None):
+        """
+        wait until all logged entries are written to the file
+        @param timeout: max number of seconds to wait
+        @returns: True if all entries were written
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout = timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+
+    def close(self, timeout = 10):
+        """
+        write the queued entries and close the log file. Called automatically when the process exits.
+        Entries logged after closing are written to the file again
+        @param timeout: max number of seconds to wait for the queued entries to be written
+        @returns: True if all entries were written
+        """
+        written = self.flush(timeout)
+        with self._fileLock:
+            if self._file != None:
+                self._file.close()
+                self._file = None
+        return written
+
+
+    def getStats(self):
+        """return the number of written and dropped entries, the number of queued entries and the number of rotations"""
+        return {
+            "written": self._writtenCount,
+            "dropped": self._droppedCount,
+            "queued": self._queue.qsize(),
+            "rotations": self._rotationCount
+        }
+
+
+    #
+    # internal methods
+
+    def _startWriter(self):
+        with self._threadLock:
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._writeEntries, name = "EventRegistryRequestLog")
+                self._thread.daemon = True
+                self._thread.start()
+                # the writer is a daemon thread - write the remaining entries before the process exits
+                atexit.register(self.close)
+
+
+    def _writeEntries(self):
+        """get the entries from the queue and write them to the file in batches"""
+        while True:
+            batch = [self._queue.get()]
+            # collect the entries logged in the meantime
+            deadline = time.time() + self._flushInterval
+            while len(batch) < 1000 and not isinstance(batch[-1], threading.Event):
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout = timeout))
+                except queue.Empty:
+                    break
+            try:
+                with self._fileLock:
+                    self._writeBatch([entry for entry in batch if isinstance(entry, dict)])
+            except Exception as ex:
+                logging.getLogger(__name__).warning("Failed to write the request log: %s", ex)
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    entry.set()
+
+
+    def _writeBatch(self, entries):
+        if len(entries) == 0:
+            return
+        if self._file != None and self._shouldRotate():
+            self._rotate()
+        if self._file is None:
+            dirName = os.path.dirname(self._fileName)
+            if not os.path.exists(dirName):
+                os.makedirs(dirName)
+            self._file = open(self._fileName, "a")
+            self._fileOpenTime = time.time()
+        lines = []
+        for entry in entries:
+            if "params" in entry:
+                entry["params"].pop("apiKey", None)
+            lines.append(json.dumps(entry) + "\n")
+        self._file.write("".join(lines))
+        self._file.flush()
+        self._writtenCount += len(entries)
+
+
+    def _shouldRotate(self):
+        if self._maxBytes != None and self._file.tell() >= self._maxBytes:
+            return True
+        return self._maxAge != None and time.time() - self._fileOpenTime >= self._maxAge
+
+
+    def _rotate(self):
+        """rename the current file to fileName.1 (and the older files to fileName.2, ...), compressing it if needed"""
+        self._file.close()
+        self._file = None
+        ext = ".gz" if self._compress else ""
+        for i in range(self._backupCount - 1, 0, -1):
+            src = "%s.%d%s" % (self._fileName, i, ext)
+            if os.path.exists(src):
+                dst = "%s.%d%s" % (self._fileName, i + 1, ext)
+                if os.path.exists(dst):
+                    os.remove(dst)
+                os.rename(src, dst)
+        dst = "%s.1%s" % (self._fileName, ext)
+        if os.path.exists(dst):
+            os.remove(dst)
+        if self._backupCount <= 0:
+            os.remove(self._fileName)
+        elif self._compress:
+            with open(self._fileName, "rb") as src, gzip.open(dst, "wb") as out:
+                shutil.copyfileobj(src, out)
+            os.remove(self._fileName)
+        else:
+            os.rename(self._fileName, dst)
+        self._rotationCount += 1
+
+
+
+def _getResponseSize(respInfo):
+    """return the number of bytes of the response body as received (compressed, if the Content-Length header is set)"""
+    length = respInfo.headers.get("Content-Length")
+    if length != None:
+        try:
+            return int(length)
+        except ValueError:
+            pass
+    content = getattr(respInfo, "content", None)
+    return len(content) if content != None else len(respInfo.text.encode("utf-8"))
@@ -0,0 +1,142 @@
+"""
+the RequestScheduler decides in which order the requests waiting to be executed are sent to Event Registry.
+
+Each request belongs to a flow, determined by the priority and the tenant set in the RequestContext. The flows are
+served using weighted fair queuing - each flow gets a share of the requests proportional to its weight (the weight
+of the priority class multiplied by the weight of the tenant). Requests that wait for a long time are aged - their
+position in the queue improves the longer they wait, so that the low priority requests still get through.
+
+Use it by providing an instance as the scheduler parameter when creating EventRegistry:
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, scheduler = RequestScheduler())
+    with RequestContext(priority = "interactive", tenantId = "teamA"):
+        er.suggestConcepts("Oba")
+"""
+import threading, time, collections
+
+from eventregistry.RequestContext import RequestContext, RequestTimeoutError, RequestCancelledError
+
+
+class RequestScheduler(object):
+    def __init__(self,
+                 maxConcurrent = 1,
+                 priorityWeights = None,
+                 tenantWeights = None,
+                 agingInterval = 30):
+        """
+        @param maxConcurrent: number of requests that can be executed at the same time. Can also be a function returning the number
+        @param priorityWeights: dict with the weight of each priority class. Default is { "interactive": 100, "feed": 10, "backfill": 1 }
+        @param tenantWeights: optional dict with the weights of tenants. Tenants that are not listed have weight 1
+        @param agingInterval: number of seconds after which a waiting request is moved ahead in the queue by one request of weight 1
+        """
+        self._maxConcurrent = maxConcurrent
+        self._priorityWeights = priorityWeights or { "interactive": 100, "feed": 10, "backfill": 1 }
+        self._tenantWeights = tenantWeights or {}
+        self._agingInterval = agingInterval
+        self._waiting = []
+        self._inFlight = 0
+        self._virtualTime = 0.0
+        self._flowFinishTime = {}
+        # priority -> [number of served requests, total wait time, max wait time]
+        self._waitStats = collections.defaultdict(lambda: [0, 0.0, 0.0])
+        self._cond = threading.Condition()
+
+
+    def setMaxConcurrent(self, maxConcurrent):
+        """set the number of requests that can be executed at the same time (a number or a function returning the number)"""
+        with self._cond:
+            self._maxConcurrent = maxConcurrent
+            self._dispatch()
+
+
+    def getQueueDepth(self, priority = None):
+        """
+        return the number of waiting requests
+        @param priority: if set, return only the number of waiting requests of this priority
+        """
+        with self._cond:
+            return len([w for w in self._waiting if priority == None or w["priority"] == priority])
+
+
+    def getStats(self):
+        """
+        return the queue depth per priority class and tenant, the number of requests in flight and the wait times per priority class
+        """
+        with self._cond:
+            queueDepth = collections.defaultdict(int)
+            tenantQueueDepth = collections.defaultdict(int)
+            for w in self._waiting:
+                queueDepth[w["priority"]] += 1
+                tenantQueueDepth[w["tenantId"]] += 1
+            waitTimes = {}
+            for priority, (count, total, maxWait) in self._waitStats.items():
+                waitTimes[priority] = { "served": count, "avgWait": total / count if count > 0 else 0, "maxWait": maxWait }
+            return {
+                "queueDepth": dict(queueDepth),
+                "tenantQueueDepth": dict(tenantQueueDepth),
+                "inFlight": self._inFlight,
+                "waitTimes": waitTimes
+            }
+
+
+    def acquire(self, deadline = None):
+        """
+        wait until the request made in the current RequestContext is allowed to be executed
+        @param deadline: time (as returned by time.time()) after which RequestTimeoutError is raised if the request is still waiting
+        """
+        context = RequestContext.getCurrent()
+        flow = (context.priority, context.tenantId)
+        weight = float(self._priorityWeights.get(context.priority, 1)) * self._tenantWeights.get(context.tenantId, 1)
+        with self._cond:
+            start = max(self._virtualTime, self._flowFinishTime.get(flow, 0))
+            waiter = {
+                "priority": context.priority,
+                "tenantId": context.tenantId,
+                "start": start,
+                "finish": start + 1.0 / weight,
+                "enqueueTime": time.time(),
+                "granted": False
+            }
+            self._flowFinishTime[flow] = waiter["finish"]
+            self._waiting.append(waiter)
+            self._dispatch()
+            while not waiter["granted"]:
+                timeout = None if deadline == None else deadline - time.time()
+                if context.isCancelled() or (timeout != None and timeout <= 0):
+                    self._waiting.remove(waiter)
+                    if context.isCancelled():
+                        raise RequestCancelledError("The request was cancelled while waiting in the queue")
+                    raise RequestTimeoutError("The request could not be started before the deadline")
+                # wake up periodically to check for cancellation
+                self._cond.wait(0.5 if timeout == None else min(timeout, 0.5))
+
+
+    def release(self):
+        """report that the request has completed so that the next waiting request can be executed"""
+        with self._cond:
+            self._inFlight = max(self._inFlight - 1, 0)
+            self._dispatch()
+
+
+    #
+    # internal methods
+
+    def _getMaxConcurrent(self):
+        return self._maxConcurrent() if callable(self._maxConcurrent) else self._maxConcurrent
+
+
+    def _dispatch(self):
+        """start the waiting requests with the lowest (aged) finish time while there are free slots"""
+        now = time.time()
+        while len(self._waiting) > 0 and self._inFlight < self._getMaxConcurrent():
+            waiter = min(self._waiting, key = lambda w: w["finish"] - (now - w["enqueueTime"]) / self._agingInterval)
+            self._waiting.remove(waiter)
+            waiter["granted"] = True
+            self._inFlight += 1
+            self._virtualTime = max(self._virtualTime, waiter["start"])
+            wait = now - waiter["enqueueTime"]
+            stats = self._waitStats[waiter["priority"]]
+            stats[0] += 1
+            stats[1] += wait
+            stats[2] = max(stats[2], wait)
+        self._cond.notify_all()
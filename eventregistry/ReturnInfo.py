@@ -7,10 +7,85 @@ a parameter in all query requests
 """
 import os, json
 
+
+class _FlagsDict(dict):
+    """
+    dict with the flags or values of a ReturnInfoFlagsBase instance. Any change of the dict marks its owner as changed
+    """
+    def __init__(self, owner, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._owner = owner
+
+
+    def _changed(self):
+        # the owner is not set yet while the dict is unpickled
+        owner = getattr(self, "_owner", None)
+        if owner != None:
+            owner._markChanged()
+
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._changed()
+
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed()
+
+
+    def clear(self):
+        dict.clear(self)
+        self._changed()
+
+
+    def pop(self, *args):
+        value = dict.pop(self, *args)
+        self._changed()
+        return value
+
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self._changed()
+        return item
+
+
+    def setdefault(self, key, default = None):
+        value = dict.setdefault(self, key, default)
+        self._changed()
+        return value
+
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._changed()
+
+
+
 class ReturnInfoFlagsBase(object):
     """
     base class for the return info types
     """
+    # replaced by a new object on each change of the flags and values of the instance
+    _changeMarker = None
+
+    def __setattr__(self, name, value):
+        # keep the flags and values in dicts that report their changes, also when they are replaced
+        if name in ("flags", "vals"):
+            value = _FlagsDict(self, value)
+        object.__setattr__(self, name, value)
+        if name in ("flags", "vals"):
+            self._markChanged()
+
+
+    def _markChanged(self):
+        """
+        mark the flags or values as changed. ReturnInfo compares the marker with the one from the time when it cached its parameters
+        (assigning a new object is atomic, unlike incrementing a counter, and works also when the flags are used by several ReturnInfo objects)
+        """
+        object.__setattr__(self, "_changeMarker", object())
+
 
     def _setFlag(self, name, val, defVal):
         """set the objects property propName if the dictKey key exists in dict and it is not the same as default value defVal"""
@@ -490,25 +565,19 @@ class ReturnInfo:
 
 
     def getParams(self, prefix = ""):
-        dict = {}
-        dict.update(self.articleInfo._getFlags())
-        dict.update(self.eventInfo._getFlags())
-        dict.update(self.sourceInfo._getFlags())
-        dict.update(self.conceptInfo._getFlags())
-        dict.update(self.categoryInfo._getFlags())
-        dict.update(self.locationInfo._getFlags())
-        dict.update(self.storyInfo._getFlags())
-        dict.update(self.conceptClassInfo._getFlags())
-        dict.update(self.conceptFolderInfo._getFlags())
-
-        dict.update(self.articleInfo._getVals())
-        dict.update(self.eventInfo._getVals())
-        dict.update(self.sourceInfo._getVals())
-        dict.update(self.conceptInfo._getVals())
-        dict.update(self.categoryInfo._getVals())
-        dict.update(self.locationInfo._getVals())
-        dict.update(self.storyInfo._getVals())
-        dict.update(self.conceptClassInfo._getVals())
-        dict.update(self.conceptFolderInfo._getVals())
-        return dict
+        infos = (self.articleInfo, self.eventInfo, self.sourceInfo, self.conceptInfo, self.categoryInfo,
+            self.locationInfo, self.storyInfo, self.conceptClassInfo, self.conceptFolderInfo)
+        # the parameters are the same until the flags are changed or replaced
+        markers = tuple([info._changeMarker for info in infos])
+        cached = getattr(self, "_cachedParams", None)
+        # the markers are plain objects, so they are compared by identity
+        if cached != None and cached[0] == infos and cached[1] == markers:
+            return dict(cached[2])
+        params = {}
+        for info in infos:
+            params.update(info._getFlags())
+        for info in infos:
+            params.update(info._getVals())
+        self._cachedParams = (infos, markers, params)
+        return dict(params)
 
@@ -0,0 +1,239 @@
+"""
+the TokenBudgetManager keeps track of the tokens spent by the requests and makes sure that the daily
+token budget is not used up by the less important jobs. When the number of remaining tokens gets low,
+the requests of the jobs with lower priority (see RequestContext) are first throttled and then paused,
+so that the requests of the critical ("interactive") jobs can still be made near the end of the quota day.
+
+The number of remaining tokens is obtained from the 'x-ratelimit-*' headers of the responses and
+periodically synced using EventRegistry.getUsageInfo().
+"""
+import threading, time, datetime, collections, logging
+
+from eventregistry.RequestContext import RequestContext, RequestTimeoutError
+
+
+class TokenBudgetExceededError(Exception):
+    """raised when a request could not be made within maxPauseSeconds because the token budget was used up"""
+    pass
+
+
+
+class TokenBudgetManager(object):
+    def __init__(self,
+                 reserveFractions = None,
+                 throttleMargin = 0.05,
+                 throttleDelay = 2,
+                 pauseCheckInterval = 60,
+                 maxPauseSeconds = None,
+                 resyncInterval = 600,
+                 forecastWindow = 3600,
+                 resetHourUtc = 0,
+                 degradeReturnInfo = False,
+                 degradedBodyLen = 300):
+        """
+        @param reserveFractions: dict with the fraction of the daily tokens that should be kept available for more important jobs.
+            Requests with a given priority are paused when the remaining tokens drop below the reserve for that priority.
+            Default is { "interactive": 0, "feed": 0.05, "backfill": 0.2 }
+        @param throttleMargin: requests are throttled (delayed) when the remaining tokens are within this fraction of the daily tokens above the reserve
+        @param throttleDelay: number of seconds by which each throttled request is delayed
+        @param pauseCheckInterval: how often (in seconds) to check if a paused request can continue
+        @param maxPauseSeconds: max number of seconds a request can be paused. If exceeded, TokenBudgetExceededError is raised. None to wait indefinitely
+        @param resyncInterval: how often (in seconds) to sync the token usage by calling EventRegistry.getUsageInfo(). None to never sync
+        @param forecastWindow: number of seconds of the recent spending that are used to forecast when the tokens will run out
+        @param resetHourUtc: hour (in UTC) when the daily quota is reset
+        @param degradeReturnInfo: if True, the requests of non-interactive jobs ask for shorter article bodies when the budget is tight
+        @param degradedBodyLen: the max length of the article body to request when the budget is tight
+        """
+        self._reserveFractions = reserveFractions or { "interactive": 0, "feed": 0.05, "backfill": 0.2 }
+        self._throttleMargin = throttleMargin
+        self._throttleDelay = throttleDelay
+        self._pauseCheckInterval = pauseCheckInterval
+        self._maxPauseSeconds = maxPauseSeconds
+        self._resyncInterval = resyncInterval
+        self._forecastWindow = forecastWindow
+        self._resetHourUtc = resetHourUtc
+        self._degradeReturnInfo = degradeReturnInfo
+        self._degradedBodyLen = degradedBodyLen
+
+        self._dailyTokens = -1
+        self._remainingTokens = -1
+        self._lastResyncTime = None
+        self._jobSpend = collections.defaultdict(int)
+        self._recentSpend = collections.deque()   # (time, tokens)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    def getDailyTokens(self):
+        """return the total number of tokens available per day (-1 if not known yet)"""
+        return self._dailyTokens
+
+
+    def getRemainingTokens(self):
+        """return the number of tokens that are still available today (-1 if not known yet)"""
+        return self._remainingTokens
+
+
+    def getJobSpend(self, jobId = None):
+        """
+        return the number of tokens spent by the job
+        @param jobId: id of the job (as set in the RequestContext). If None, return dict with spending of all jobs
+        """
+        with self._lock:
+            if jobId is None:
+                return dict(self._jobSpend)
+            return self._jobSpend.get(jobId, 0)
+
+
+    def getSpendRate(self):
+        """return the average number of tokens spent per second in the recent forecastWindow seconds"""
+        now = time.time()
+        with self._lock:
+            self._trimRecentSpend(now)
+            if len(self._recentSpend) == 0:
+                return 0.0
+            spent = sum(tokens for (t, tokens) in self._recentSpend)
+            elapsed = max(now - self._recentSpend[0][0], 60.0)
+        return spent / elapsed
+
+
+    def getSecondsUntilExhausted(self):
+        """return the forecasted number of seconds until the remaining tokens are used up. None if not known or not spending"""
+        rate = self.getSpendRate()
+        if self._remainingTokens < 0 or rate <= 0:
+            return None
+        return self._remainingTokens / rate
+
+
+    def getSecondsUntilReset(self):
+        """return the number of seconds until the daily quota is reset"""
+        now = datetime.datetime.utcnow()
+        reset = now.replace(hour = self._resetHourUtc, minute = 0, second = 0, microsecond = 0)
+        if reset <= now:
+            reset += datetime.timedelta(days = 1)
+        return (reset - now).total_seconds()
+
+
+    def isTight(self):
+        """is the budget tight - are the tokens expected to run out before the quota is reset"""
+        untilExhausted = self.getSecondsUntilExhausted()
+        return untilExhausted is not None and untilExhausted < self.getSecondsUntilReset()
+
+
+    def update(self, dailyTokens, remainingTokens):
+        """
+        update the number of available tokens (as reported in the x-ratelimit-limit and x-ratelimit-remaining headers)
+        """
+        with self._lock:
+            if dailyTokens >= 0:
+                self._dailyTokens = dailyTokens
+            if remainingTokens >= 0:
+                self._remainingTokens = remainingTokens
+
+
+    def resync(self, eventRegistry):
+        """
+        sync the number of available tokens with the values returned by EventRegistry.getUsageInfo()
+        """
+        self._lastResyncTime = time.time()
+        # the request made by getUsageInfo() should not be a subject of the budget checks
+        self._local.inResync = True
+        try:
+            usage = eventRegistry.getUsageInfo()
+        except Exception as ex:
+            logging.getLogger(__name__).warning("TokenBudgetManager: failed to obtain the usage info: %s", ex)
+            return
+        finally:
+            self._local.inResync = False
+        if isinstance(usage, dict) and "availableTokens" in usage:
+            available = usage.get("availableTokens", 0)
+            used = usage.get("usedTokens", 0)
+            self.update(available, max(available - used, 0))
+
+
+    def beforeRequest(self, eventRegistry, methodUrl, paramDict, context = None, deadline = None):
+        """
+        called before making each request. Blocks if the request should be throttled or paused
+        and potentially modifies the paramDict to request less data
+        @param eventRegistry: instance of EventRegistry that will make the request
+        @param methodUrl: url on er (e.g. "/api/v1/article")
+        @param paramDict: parameters of the request
+        @param context: RequestContext of the request (the current one if None). The waiting is interrupted when it is cancelled
+        @param deadline: time (as returned by time.time()) after which RequestTimeoutError is raised if the request is still waiting
+        """
+        if getattr(self._local, "inResync", False):
+            return
+        if self._resyncInterval is not None and (self._lastResyncTime is None or time.time() - self._lastResyncTime > self._resyncInterval):
+            self.resync(eventRegistry)
+        context = context or RequestContext.getCurrent()
+        reserve = self._reserveFractions.get(context.priority, 0)
+        if reserve <= 0:
+            return
+        expectedTokens = eventRegistry.getCostModel().estimateTokensPerRequest(methodUrl)
+        pauseStart = time.time()
+        while self._remainingTokens >= 0 and self._dailyTokens > 0 and \
+                self._remainingTokens - expectedTokens < reserve * self._dailyTokens:
+            if self._maxPauseSeconds is not None and time.time() - pauseStart >= self._maxPauseSeconds:
+                raise TokenBudgetExceededError("Not enough tokens left for requests of priority '%s' (remaining %d of %d)" % (context.priority, self._remainingTokens, self._dailyTokens))
+            logging.getLogger(__name__).info("TokenBudgetManager: pausing request of job '%s' since only %d tokens are left", context.jobId, self._remainingTokens)
+            self._sleep(self._pauseCheckInterval, context, deadline)
+            self.resync(eventRegistry)
+        if self.isTight() or (self._dailyTokens > 0 and self._remainingTokens < (reserve + self._throttleMargin) * self._dailyTokens):
+            self._sleep(self._throttleDelay, context, deadline)
+            if self._degradeReturnInfo and paramDict is not None and "resultType" in paramDict:
+                self._degradeParams(paramDict)
+
+
+    def afterRequest(self, methodUrl, tokens):
+        """
+        called after a request was successfully made
+        @param methodUrl: url on er (e.g. "/api/v1/article")
+        @param tokens: number of tokens used by the request
+        """
+        if tokens is None or tokens <= 0:
+            return
+        jobId = RequestContext.getCurrent().jobId
+        with self._lock:
+            self._jobSpend[jobId] += tokens
+            self._recentSpend.append((time.time(), tokens))
+            if self._remainingTokens > 0:
+                self._remainingTokens = max(self._remainingTokens - tokens, 0)
+
+
+    def degradeReturnInfo(self, returnInfo):
+        """
+        if the budget is tight, return a copy of returnInfo that asks for shorter article bodies, otherwise return returnInfo
+        @param returnInfo: instance of ReturnInfo
+        """
+        if not (self._degradeReturnInfo and self.isTight()):
+            return returnInfo
+        import copy
+        ret = copy.deepcopy(returnInfo)
+        bodyLen = ret.articleInfo._getVals().get("articleBodyLen", -1)
+        if bodyLen < 0 or bodyLen > self._degradedBodyLen:
+            ret.articleInfo._setVal("articleBodyLen", self._degradedBodyLen)
+        return ret
+
+
+    #
+    # internal methods
+
+    def _sleep(self, seconds, context, deadline):
+        """sleep for the given number of seconds. Raise RequestCancelledError or RequestTimeoutError if the request is cancelled or its deadline passes"""
+        if deadline is not None:
+            seconds = min(seconds, max(deadline - time.time(), 0))
+        context.sleep(seconds)
+        context.checkActive()
+        if deadline is not None and time.time() >= deadline:
+            raise RequestTimeoutError("The request could not be made before the deadline since the token budget is used up")
+
+
+    def _degradeParams(self, paramDict):
+        bodyLen = paramDict.get("articleBodyLen", -1)
+        if bodyLen < 0 or bodyLen > self._degradedBodyLen:
+            paramDict["articleBodyLen"] = self._degradedBodyLen
+
+
+    def _trimRecentSpend(self, now):
+        while len(self._recentSpend) > 0 and now - self._recentSpend[0][0] > self._forecastWindow:
+            self._recentSpend.popleft()
@@ -0,0 +1,181 @@
+"""
+the Tracer records spans - timed and named sections of the work done by the client.
+
+When a tracer is provided to EventRegistry, spans are recorded for each page downloaded by the iterators, each executed
+query (execQuery) and within it the time spent waiting (for the token budget, scheduler, rate limit and the lock), each
+request attempt and the decoding of the returned json. The spans carry attributes such as the query
+fingerprint, the page number, the endpoint, the host and the status code. Time between the spans of an iterator is the
+time spent in the code that consumes the results.
+
+The finished spans are passed to the exporter. ChromeTraceExporter writes them to a json file that can be opened in
+Chrome's trace viewer (chrome://tracing) or in Perfetto (https://ui.perfetto.dev):
+
+    exporter = ChromeTraceExporter("trace.json")
+    er = EventRegistry(apiKey = YOUR_API_KEY, tracer = Tracer(exporter))
+    for art in QueryArticlesIter(keywords = "Obama").execQuery(er, maxItems = 500):
+        pass
+    exporter.flush()
+"""
+import os, json, time, threading, itertools
+
+
+class Span(object):
+    def __init__(self, tracer, name, attributes, parent, startTime = None):
+        """
+        a timed section of work. Use Tracer.span() or Tracer.startSpan() to create the spans
+        """
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.spanId = next(tracer._spanIds)
+        self.traceId = parent.traceId if parent != None else self.spanId
+        self.threadId = threading.current_thread().ident
+        self.startTime = startTime or time.time()
+        self.endTime = None
+
+
+    def setAttribute(self, key, value):
+        self.attributes[key] = value
+
+
+    def end(self):
+        """finish the span and pass it to the exporter"""
+        if self.endTime is None:
+            self.endTime = time.time()
+            self.tracer._export(self)
+
+
+    def getDuration(self):
+        return (self.endTime or time.time()) - self.startTime
+
+
+    def __enter__(self):
+        self.tracer._getStack().append(self)
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        stack = self.tracer._getStack()
+        if len(stack) > 0 and stack[-1] is self:
+            stack.pop()
+        if excValue != None:
+            self.attributes["error"] = str(excValue)
+        self.end()
+
+
+
+class NoopSpan(object):
+    """span that does nothing. Used when tracing is disabled"""
+    def setAttribute(self, key, value):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        pass
+
+
+noopSpan = NoopSpan()
+
+
+
+class Tracer(object):
+    def __init__(self, exporter = None):
+        """
+        @param exporter: object with the export(span) method that is called for each finished span (e.g. ChromeTraceExporter)
+        """
+        self._exporter = exporter
+        self._local = threading.local()
+        self._spanIds = itertools.count(1)
+
+
+    def span(self, name, **attributes):
+        """
+        return a span to be used in a with statement. Spans started within it (in the same thread) are its children:
+            with tracer.span("export", jobId = 12):
+                ...
+        """
+        return Span(self, name, attributes, self.getCurrentSpan())
+
+
+    def startSpan(self, name, startTime = None, **attributes):
+        """
+        start a span that is a child of the current span. It does not become the current span and should be finished by calling end()
+        @param startTime: time when the span started (as returned by time.time()). If None, the span starts now
+        """
+        return Span(self, name, attributes, self.getCurrentSpan(), startTime)
+
+
+    def getCurrentSpan(self):
+        """return the innermost span entered in the current thread (None if there is none)"""
+        stack = self._getStack()
+        return stack[-1] if len(stack) > 0 else None
+
+
+    def getExporter(self):
+        return self._exporter
+
+
+    #
+    # internal methods
+
+    def _getStack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+    def _export(self, span):
+        if self._exporter != None:
+            self._exporter.export(span)
+
+
+
+class ChromeTraceExporter(object):
+    def __init__(self, fileName = "trace.json", maxEvents = 1000000):
+        """
+        collect the finished spans and write them to a file in the Chrome trace event format
+        @param fileName: path of the file to which the trace is written when flush() is called
+        @param maxEvents: max number of spans that are kept. Later spans are dropped
+        """
+        self._fileName = fileName
+        self._maxEvents = maxEvents
+        self._events = []
+        self._droppedCount = 0
+        self._lock = threading.Lock()
+
+
+    def export(self, span):
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": int(span.startTime * 1000000),
+            "dur": int((span.endTime - span.startTime) * 1000000),
+            "pid": os.getpid(),
+            "tid": span.threadId,
+            "args": dict(span.attributes, spanId = span.spanId, traceId = span.traceId, parentId = span.parent.spanId if span.parent != None else None)
+        }
+        with self._lock:
+            if len(self._events) >= self._maxEvents:
+                self._droppedCount += 1
+                return
+            self._events.append(event)
+
+
+    def getEvents(self):
+        """return the list of the trace events collected so far"""
+        with self._lock:
+            return list(self._events)
+
+
+    def flush(self):
+        """write all collected spans to the file"""
+        events = self.getEvents()
+        with open(self._fileName, "w") as f:
+            json.dump({ "traceEvents": events, "displayTimeUnit": "ms", "otherData": { "droppedSpans": self._droppedCount } }, f)
@@ -0,0 +1,91 @@
+"""
+transports create the sessions that are used by EventRegistry to send the http requests.
+
+A session has to provide the post(url, json = None, timeout = None) and get(url, timeout = None) methods
+returning a response with the status_code, headers and text attributes and the json() method (same as requests.Session).
+
+RequestsTransport (the default) uses requests.Session. Since a requests.Session can't be used by multiple threads
+at the same time, parallel requests (see AdaptiveConcurrencyLimiter and hedging) each use their own session and
+open their own connections.
+
+Http2Transport uses an HTTP/2 client (httpx) that multiplexes all concurrent requests over a few connections.
+It requires the httpx module with the http2 support (pip install httpx[http2]):
+
+    er = EventRegistry(apiKey = YOUR_API_KEY, transport = Http2Transport(), concurrency = True)
+"""
+import threading, requests
+
+
+class Transport(object):
+    """base class of the transports"""
+    # name of the argument of the session's post() method used to send an already encoded (e.g. compressed) request body
+    bodyArgument = "data"
+
+    def newSession(self):
+        """return a new session that will be used by a single thread at a time"""
+        raise NotImplementedError
+
+
+    def close(self):
+        """close the connections opened by the sessions of this transport"""
+        pass
+
+
+
+class RequestsTransport(Transport):
+    """transport that uses requests.Session. Each session has its own pool of HTTP/1.1 connections"""
+    def __init__(self):
+        self._sessions = []
+
+
+    def newSession(self):
+        session = requests.Session()
+        self._sessions.append(session)
+        return session
+
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+        self._sessions = []
+
+
+
+class Http2Transport(Transport):
+    bodyArgument = "content"
+
+    def __init__(self, maxConnections = 10, priorKnowledge = False, verify = True):
+        """
+        transport that multiplexes the requests of parallel threads over a few HTTP/2 connections.
+        The streams of a connection are read by one thread at a time, so with many parallel threads and fewer connections
+        than threads the throughput is lower than with RequestsTransport (where each thread has its own connection).
+        The transport is meant to reduce the number of open connections, not to increase the throughput
+        @param maxConnections: number of HTTP/2 connections opened to each host. The sessions are assigned to the connections
+            in turn so that the parallel requests are spread over them. The default matches the size of the connection pool
+            of a requests.Session
+        @param priorKnowledge: if True, HTTP/2 is used also for http:// hosts (without the upgrade). Otherwise the protocol
+            is negotiated when connecting to the https:// hosts and HTTP/1.1 is used for the http:// hosts
+        @param verify: verify the TLS certificates of the hosts
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("Http2Transport requires the httpx module. Install it using 'pip install httpx[http2]'")
+        assert maxConnections >= 1, "maxConnections should be at least 1"
+        # each httpx client keeps a single HTTP/2 connection per host
+        self._clients = [httpx.Client(http2 = True, http1 = not priorKnowledge, verify = verify) for i in range(maxConnections)]
+        self._nextClient = 0
+        self._lock = threading.Lock()
+
+
+    def newSession(self):
+        # the clients are thread safe - sessions of different threads can share them (and their connections)
+        with self._lock:
+            client = self._clients[self._nextClient]
+            self._nextClient = (self._nextClient + 1) % len(self._clients)
+        return client
+
+
+    def close(self):
+        for client in self._clients:
+            client.close()
@@ -1,19 +1,116 @@
 ﻿from eventregistry._version import __version__
+import sys, importlib as _importlib
 
-from eventregistry.Base import *
-from eventregistry.EventForText import *
-from eventregistry.ReturnInfo import *
-from eventregistry.Query import *
-from eventregistry.QueryEvents import *
-from eventregistry.QueryEvent import *
-from eventregistry.QueryArticles import *
-from eventregistry.QueryArticle import *
-from eventregistry.QueryStory import *
-from eventregistry.Counts import *
-from eventregistry.DailyShares import *
-from eventregistry.Info import *
-from eventregistry.Recent import *
-from eventregistry.Trends import *
-from eventregistry.Analytics import *
-from eventregistry.TopicPage import *
-from eventregistry.EventRegistry import *
\ No newline at end of file
+# the submodules are imported only when one of their names is used for the first time. This keeps the import
+# of the package fast and cheap when only a few classes are needed (e.g. GetRecentArticles does not need the requests module)
+
+# submodules and the public classes and functions that they export, in the order in which the names are exported by the
+# package (names from later modules take precedence). Only these names (and the names of the submodules) are imported
+# by 'from eventregistry import *', so that the loggers and internal constants of the submodules don't replace the
+# names of the caller
+_exports = [
+    ("Base", ["Query", "QueryItems", "QueryParamsBase", "Struct", "StructList", "createStructFromDict", "deprecated", "removeInvalidChars", "tryParseInt",
+        "allLangs", "mainLangs", "conceptTypes"]),
+    ("EventForText", ["GetEventForText"]),
+    ("ReturnInfo", ["ArticleInfoFlags", "CategoryInfoFlags", "ConceptClassInfoFlags", "ConceptFolderInfoFlags", "ConceptInfoFlags", "EventInfoFlags",
+        "LocationInfoFlags", "ReturnInfo", "ReturnInfoFlagsBase", "SourceInfoFlags", "StoryInfoFlags"]),
+    ("Query", ["BaseQuery", "CombinedQuery", "ComplexArticleQuery", "ComplexEventQuery"]),
+    ("QueryEvents", ["QueryEvents", "QueryEventsIter", "RequestEvents", "RequestEventsCategoryAggr", "RequestEventsConceptAggr", "RequestEventsConceptGraph",
+        "RequestEventsConceptMatrix", "RequestEventsConceptTrends", "RequestEventsDateMentionAggr", "RequestEventsEventClusters", "RequestEventsInfo",
+        "RequestEventsKeywordAggr", "RequestEventsLocAggr", "RequestEventsLocTimeAggr", "RequestEventsRecentActivity", "RequestEventsSourceAggr",
+        "RequestEventsTimeAggr", "RequestEventsUriWgtList"]),
+    ("QueryEvent", ["QueryEvent", "QueryEventArticlesIter", "RequestEvent", "RequestEventArticleTrend", "RequestEventArticleUriWgts", "RequestEventArticles",
+        "RequestEventDateMentionAggr", "RequestEventInfo", "RequestEventKeywordAggr", "RequestEventSimilarEvents", "RequestEventSourceAggr"]),
+    ("QueryArticles", ["QueryArticles", "QueryArticlesIter", "RequestArticles", "RequestArticlesCategoryAggr", "RequestArticlesConceptAggr",
+        "RequestArticlesConceptGraph", "RequestArticlesConceptMatrix", "RequestArticlesConceptTrends", "RequestArticlesDateMentionAggr", "RequestArticlesInfo",
+        "RequestArticlesKeywordAggr", "RequestArticlesRecentActivity", "RequestArticlesSourceAggr", "RequestArticlesTimeAggr", "RequestArticlesUriWgtList"]),
+    ("QueryArticle", ["QueryArticle", "RequestArticle", "RequestArticleDuplicatedArticles", "RequestArticleInfo", "RequestArticleOriginalArticle",
+        "RequestArticleSimilarArticles"]),
+    ("QueryStory", ["QueryStory", "RequestStory", "RequestStoryArticleTrend", "RequestStoryArticleUris", "RequestStoryArticles", "RequestStoryInfo",
+        "RequestStorySimilarStories"]),
+    ("Counts", ["CountsBase", "GetCounts", "GetCountsEx"]),
+    ("DailyShares", ["GetTopSharedArticles", "GetTopSharedEvents"]),
+    ("Info", ["GetCategoryInfo", "GetConceptInfo", "GetSourceInfo", "GetSourceStats"]),
+    ("Recent", ["GetRecentArticles", "GetRecentEvents"]),
+    ("Trends", ["GetTrendingCategories", "GetTrendingConceptGroups", "GetTrendingConcepts", "GetTrendingCustomItems", "TrendsBase"]),
+    ("Analytics", ["Analytics"]),
+    ("TopicPage", ["TopicPage"]),
+    ("QueryFingerprint", ["canonicalizeParams", "canonicalizeQuery", "getQueryFingerprint", "getRequestFingerprint"]),
+    ("QueryOptimizer", ["ComplexQueryOptimizer"]),
+    ("CostModel", ["RequestCostModel"]),
+    ("RequestContext", ["RequestCancelledError", "RequestContext", "RequestTimeoutError"]),
+    ("TokenBudget", ["TokenBudgetExceededError", "TokenBudgetManager"]),
+    ("ApiKeyPool", ["ApiKeysExhaustedError", "ApiKeyPool"]),
+    ("HostPool", ["HostPool"]),
+    ("Hedging", ["HedgePolicy"]),
+    ("ConcurrencyLimiter", ["AdaptiveConcurrencyLimiter"]),
+    ("RequestScheduler", ["RequestScheduler"]),
+    ("Transport", ["Http2Transport", "RequestsTransport", "Transport"]),
+    ("Cassette", ["CassetteResponse", "CassetteTransport"]),
+    ("Compression", ["RequestCompression", "getAcceptEncoding"]),
+    ("RequestLog", ["RequestLog"]),
+    ("Metrics", ["Histogram", "MetricsRegistry"]),
+    ("Tracing", ["ChromeTraceExporter", "NoopSpan", "Span", "Tracer"]),
+    ("Profiling", ["Profiler"]),
+    ("Records", ["Article", "Concept", "Event", "Location", "Record", "RecordDecoder", "Source", "Story"]),
+    ("EventRegistry", ["ArticleMapper", "EventRegistry"])
+]
+
+_submodules = [_moduleName for _moduleName, _names in _exports]
+# exported name -> submodule that defines it
+_lazyNames = dict((_name, _moduleName) for _moduleName, _names in _exports for _name in _names)
+
+
+if sys.version_info < (3, 5):
+    # the class of a module can't be changed in older versions of python - import everything
+    for _moduleName in _submodules:
+        _module = _importlib.import_module(__name__ + "." + _moduleName)
+        globals().update((_name, _value) for _name, _value in vars(_module).items() if not _name.startswith("_"))
+    __all__ = sorted(set(_lazyNames) | set(_submodules))
+    del _moduleName, _module
+else:
+    import types as _types
+
+    class _LazyPackage(_types.ModuleType):
+        """the eventregistry package that imports the submodules when their names are accessed"""
+        def __getattr__(self, name):
+            if name == "__all__":
+                return self._loadAll()
+            moduleName = _lazyNames.get(name)
+            if moduleName is None:
+                # other names of the submodules (constants, imported standard modules, ...) are available as attributes of the package
+                if not name.startswith("_") and "__all__" not in self.__dict__:
+                    self._loadAll()
+                    if name in self.__dict__:
+                        return self.__dict__[name]
+                raise AttributeError("module %r has no attribute %r" % (self.__name__, name))
+            value = getattr(_importlib.import_module(self.__name__ + "." + moduleName), name)
+            self.__dict__[name] = value
+            return value
+
+
+        def __setattr__(self, name, value):
+            # importing a submodule binds it to the package. Don't let it hide the class with the same name (e.g. EventRegistry)
+            if isinstance(value, _types.ModuleType) and name in _lazyNames:
+                return
+            _types.ModuleType.__setattr__(self, name, value)
+
+
+        def __dir__(self):
+            return sorted(set(self.__dict__) | set(_lazyNames))
+
+
+        def _loadAll(self):
+            """import all submodules and set their names as attributes of the package the same way as 'from submodule import *' would.
+            Returns the list of names imported by 'from eventregistry import *'"""
+            for moduleName in _submodules:
+                module = _importlib.import_module(self.__name__ + "." + moduleName)
+                for name, value in vars(module).items():
+                    if not name.startswith("_"):
+                        self.__dict__[name] = value
+            # the exported classes and functions and the submodules that don't have a class with the same name
+            self.__dict__["__all__"] = sorted(set(_lazyNames) | set(_submodules))
+            return self.__dict__["__all__"]
+
+
+    sys.modules[__name__].__class__ = _LazyPackage
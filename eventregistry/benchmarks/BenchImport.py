@@ -0,0 +1,82 @@
+"""
+measure the time and memory needed to import the package (or parts of it) and check them against the budget
+in importBudget.json. Each import is measured in a fresh python interpreter and the median of several runs is used.
+
+usage: python -m eventregistry.benchmarks.BenchImport [--runs N]
+
+exits with status 1 if any of the imports exceeds its budget
+"""
+import sys, os, json, subprocess, argparse
+
+# code executed in a fresh interpreter. Prints the import time, the increase of the resident memory and the imported modules
+childCode = r'''
+import time, sys, json
+def getRss():
+    try:
+        import resource
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+rss = getRss()
+startTime = time.time()
+exec(sys.argv[1])
+print(json.dumps({ "seconds": time.time() - startTime, "rssMB": (getRss() - rss) / 1e6, "modules": sorted(sys.modules) }))
+'''
+
+budgetFName = os.path.join(os.path.dirname(os.path.abspath(__file__)), "importBudget.json")
+
+
+def measureImport(statement, runs = 5):
+    """
+    return the median import time and memory increase of the statement, and the list of modules imported by it
+    @param statement: import statement to measure (e.g. "from eventregistry import GetRecentArticles")
+    @param runs: number of fresh interpreters in which the statement is measured
+    """
+    results = []
+    for i in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", childCode, statement])
+        results.append(json.loads(out.decode("utf-8")))
+    median = lambda key: sorted(res[key] for res in results)[len(results) // 2]
+    return { "seconds": median("seconds"), "rssMB": median("rssMB"), "modules": results[0]["modules"] }
+
+
+def checkBudget(statement, measured, budget):
+    """return the list of violations of the budget"""
+    errors = []
+    for key in ["seconds", "rssMB"]:
+        if key in budget and measured[key] > budget[key]:
+            errors.append("%s: %s is %.3f, budget is %.3f" % (statement, key, measured[key], budget[key]))
+    for module in budget.get("forbiddenModules", []):
+        if module in measured["modules"]:
+            errors.append("%s: module %s should not be imported" % (statement, module))
+    for module in budget.get("modules", []):
+        if module not in measured["modules"]:
+            errors.append("%s: module %s was expected to be imported" % (statement, module))
+    # when the list of modules is given, no other modules of the package should be imported
+    if "modules" in budget:
+        extra = [m for m in measured["modules"] if m.startswith("eventregistry") and m not in budget["modules"]]
+        if len(extra) > 0:
+            errors.append("%s: unexpected modules imported: %s" % (statement, ", ".join(extra)))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "measure the import time and memory of the eventregistry package")
+    parser.add_argument("--runs", type = int, default = 5, help = "number of measurements of each import")
+    args = parser.parse_args()
+    with open(budgetFName) as f:
+        budgets = json.load(f)
+    errors = []
+    for statement, budget in budgets.items():
+        measured = measureImport(statement, args.runs)
+        print("%-50s %8.4f s %8.2f MB" % (statement, measured["seconds"], measured["rssMB"]))
+        errors.extend(checkBudget(statement, measured, budget))
+    for error in errors:
+        print("BUDGET EXCEEDED: " + error)
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+measure the peak memory allocated while streaming large result sets through the iterators and check it against the
+budget in memoryBudget.json.
+
+The results are synthetic pages of the stub server, returned by an in-process session (no network is used), so
+millions of results can be streamed quickly. Each scenario iterates over all results of QueryArticlesIter, QueryEventsIter
+or QueryEventArticlesIter and consumes them in one of the common ways - only reading them, converting them to Struct
+objects or writing them to a json lines file. The peak of the memory allocated in python (measured using tracemalloc) must
+stay within the budget and must not grow with the number of results - each scenario is also run with a tenth of the
+results and the peak may only be slightly larger for the full run.
+
+usage: python -m eventregistry.benchmarks.BenchMemory [--items N] [--history FILE]
+
+exits with status 1 if any of the scenarios exceeds its budget or if its memory grows with the number of results
+"""
+import sys, os, json, time, tempfile, tracemalloc, subprocess, argparse
+
+budgetFName = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memoryBudget.json")
+
+# the peak with all results may exceed the peak with a tenth of the results by this share (and by growthSlackMB)
+allowedGrowth = 0.25
+growthSlackMB = 1.0
+
+
+class SyntheticResponse(object):
+    """response with the interface of requests.Response used by the client"""
+    def __init__(self, status, headers, body):
+        self.status_code = status
+        self.headers = headers
+        self.content = body
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+
+
+class SyntheticSession(object):
+    def __init__(self, server):
+        """
+        session that passes the requests directly to the stub server, without sending them over the network
+        @param server: the StubServer that responds to the requests. It does not have to be started
+        """
+        self._server = server
+
+    def post(self, url, json = None, **kwargs):
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        return SyntheticResponse(*self._server.handle(path, json or {}))
+
+    def close(self):
+        pass
+
+
+
+def createClient(server):
+    """return the EventRegistry instance that gets the responses from the stub server through the SyntheticSession"""
+    from eventregistry import EventRegistry
+    er = EventRegistry(apiKey = "key", host = "http://stub", minDelayBetweenRequests = 0, versionCheck = False)
+    session = SyntheticSession(server)
+    er._reqSession = session
+    er._newSession = lambda: session
+    return er
+
+
+def getScenarios():
+    """return the list of (iterator, consumer) of the measured scenarios"""
+    return [("QueryArticlesIter", "read"), ("QueryArticlesIter", "struct"), ("QueryArticlesIter", "jsonl"),
+            ("QueryEventsIter", "read"), ("QueryEventsIter", "struct"), ("QueryEventsIter", "jsonl"),
+            ("QueryEventArticlesIter", "read")]
+
+
+def getScenarioName(iterator, consumer):
+    return "%s %s" % (iterator, consumer)
+
+
+def runScenario(iterator, consumer, items, server = None):
+    """
+    stream items results of the iterator through the consumer and return the peak of the allocated memory in MB
+    @param iterator: "QueryArticlesIter", "QueryEventsIter" or "QueryEventArticlesIter"
+    @param consumer: "read" (only read the title), "struct" (convert to Struct and read the title) or "jsonl" (write to a json lines file)
+    @param items: number of results to stream
+    @param server: StubServer that generates the results (if None, one with the default synthetic data is created)
+    @returns: dict with the number of streamed items, the peak memory in MB and the number of seconds
+    """
+    from eventregistry import QueryArticlesIter, QueryEventsIter, QueryEventArticlesIter, createStructFromDict
+    from eventregistry.benchmarks.StubServer import StubServer
+    ownServer = server is None
+    if ownServer:
+        server = StubServer()
+    server.articleCount = server.eventCount = server.eventArticleCount = items
+    er = createClient(server)
+    if iterator == "QueryArticlesIter":
+        it = QueryArticlesIter(keywords = "test")
+    elif iterator == "QueryEventsIter":
+        it = QueryEventsIter(keywords = "test")
+    else:
+        it = QueryEventArticlesIter(server.data.getEventUri(0))
+    # create the templates of the results before the measurement
+    server.data.encodeArticles(0, 1)
+    server.data.encodeEvents(0, 1)
+    out = tempfile.TemporaryFile("w") if consumer == "jsonl" else None
+    startedTracing = not tracemalloc.is_tracing()
+    if startedTracing:
+        tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        startTime = time.time()
+        count = 0
+        for item in it.execQuery(er):
+            if consumer == "struct":
+                title = createStructFromDict(item).title
+            elif consumer == "jsonl":
+                out.write(json.dumps(item) + "\n")
+            else:
+                title = item["title"]
+            count += 1
+        seconds = time.time() - startTime
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if startedTracing:
+            tracemalloc.stop()
+        if out != None:
+            out.close()
+        if ownServer:
+            server.stop()
+    return { "items": count, "peakMB": peak / 1e6, "seconds": seconds }
+
+
+def checkBudget(name, small, large, budget):
+    """
+    return the list of violations of the budget
+    @param small: result of the run with a tenth of the results
+    @param large: result of the run with all results
+    """
+    errors = []
+    if "peakMB" in budget and large["peakMB"] > budget["peakMB"]:
+        errors.append("%s: peak memory is %.2f MB, budget is %.2f MB" % (name, large["peakMB"], budget["peakMB"]))
+    if large["peakMB"] > small["peakMB"] * (1 + allowedGrowth) + growthSlackMB:
+        errors.append("%s: peak memory grows with the number of results (%.2f MB for %d results, %.2f MB for %d results)" % (
+            name, small["peakMB"], small["items"], large["peakMB"], large["items"]))
+    return errors
+
+
+def getCommit():
+    """return the id of the current git commit (None if not known)"""
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd = os.path.dirname(os.path.abspath(__file__)), stderr = subprocess.STDOUT)
+        return out.decode("utf-8").strip()
+    except Exception:
+        return None
+
+
+def main():
+    from eventregistry.benchmarks.StubServer import StubServer
+    parser = argparse.ArgumentParser(description = "measure the peak memory of streaming large result sets through the iterators")
+    parser.add_argument("--items", type = int, default = 1000000, help = "number of results streamed in each scenario")
+    parser.add_argument("--history", default = None, help = "json lines file to which the results are appended together with the git commit")
+    args = parser.parse_args()
+    with open(budgetFName) as f:
+        budgets = json.load(f)
+    server = StubServer()
+    errors = []
+    results = {}
+    try:
+        for iterator, consumer in getScenarios():
+            name = getScenarioName(iterator, consumer)
+            small = runScenario(iterator, consumer, max(args.items // 10, 1), server)
+            large = runScenario(iterator, consumer, args.items, server)
+            results[name] = { "items": large["items"], "peakMB": round(large["peakMB"], 2), "smallPeakMB": round(small["peakMB"], 2) }
+            print("%-35s %8d items %8.2f MB (%8.2f MB for %d items) %8.1f s" % (name, large["items"], large["peakMB"], small["peakMB"], small["items"], large["seconds"]))
+            errors.extend(checkBudget(name, small, large, budgets.get(name, {})))
+    finally:
+        server.stop()
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps({ "time": time.time(), "commit": getCommit(), "results": results, "errors": errors }) + "\n")
+    for error in errors:
+        print("BUDGET EXCEEDED: " + error)
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+microbenchmarks of building the queries and their parameters - the work done for each query before it is sent.
+
+Each case is repeated until it runs for at least --seconds seconds and the number of operations per second is
+reported. The "build and encode QueryArticles" case (constructing a typical QueryArticles with a ReturnInfo and
+computing its request parameters) is checked against the target of queries per minute on one core.
+
+usage: python -m eventregistry.benchmarks.BenchQuery [--seconds S] [--target N]
+
+exits with status 1 if the queries per minute are below the target
+"""
+import sys, time, datetime, argparse
+
+
+def getCases():
+    """return the list of (name, function) of the measured cases"""
+    from eventregistry import (QueryArticles, QueryEvents, QueryItems, RequestArticlesInfo, ReturnInfo, ArticleInfoFlags, SourceInfoFlags,
+        BaseQuery, CombinedQuery, ComplexArticleQuery, QueryParamsBase)
+    from eventregistry.Base import removeInvalidChars
+
+    cleanText = "Barack Obama visited the European Commission in Brussels on Tuesday " * 2
+    dirtyText = cleanText + "\x01\x0b"
+    date = datetime.date(2026, 3, 4)
+    dateTime = datetime.datetime(2026, 3, 4, 12, 30, 15)
+    returnInfo = ReturnInfo(articleInfo = ArticleInfoFlags(concepts = True, categories = True, bodyLen = 300), sourceInfo = SourceInfoFlags(ranking = True))
+    query = QueryArticles(keywords = QueryItems.OR(["Obama", "Trump"]), conceptUri = "http://en.wikipedia.org/wiki/Barack_Obama",
+        sourceUri = "bbc.co.uk", lang = ["eng", "deu"], dateStart = "2026-01-01", dateEnd = date, requestedResult = RequestArticlesInfo(returnInfo = returnInfo))
+
+    def buildQuery():
+        return QueryArticles(keywords = QueryItems.OR(["Obama", "Trump"]), conceptUri = "http://en.wikipedia.org/wiki/Barack_Obama",
+            sourceUri = "bbc.co.uk", lang = QueryItems.OR(["eng", "deu"]), dateStart = "2026-01-01", dateEnd = date,
+            requestedResult = RequestArticlesInfo(page = 2, sortBy = "rel", returnInfo = returnInfo))
+
+    def buildComplexQuery():
+        qStr = CombinedQuery.AND([
+            BaseQuery(keyword = "Obama", dateStart = "2026-01-01", dateEnd = date),
+            CombinedQuery.OR([BaseQuery(sourceUri = "bbc.co.uk"), BaseQuery(sourceUri = QueryItems.OR(["cnn.com", "nytimes.com"]))])],
+            exclude = BaseQuery(lang = "deu"))
+        return QueryArticles.initWithComplexQuery(ComplexArticleQuery(qStr, isDuplicateFilter = "skipDuplicates"))
+
+    return [
+        ("removeInvalidChars (clean text)", lambda: removeInvalidChars(cleanText)),
+        ("removeInvalidChars (invalid chars)", lambda: removeInvalidChars(dirtyText)),
+        ("encodeDate (date)", lambda: QueryParamsBase.encodeDate(date)),
+        ("encodeDate (string)", lambda: QueryParamsBase.encodeDate("2026-03-04")),
+        ("encodeDateTime (datetime)", lambda: QueryParamsBase.encodeDateTime(dateTime)),
+        ("encodeDateTime (string)", lambda: QueryParamsBase.encodeDateTime("2026-03-04T12:30:15")),
+        ("ReturnInfo()", lambda: ReturnInfo()),
+        ("ReturnInfo.getParams", lambda: returnInfo.getParams("articles")),
+        ("QueryArticles._getQueryParams", lambda: query._getQueryParams()),
+        ("build QueryArticles", buildQuery),
+        ("build and encode QueryArticles", lambda: buildQuery()._getQueryParams()),
+        ("build QueryEvents", lambda: QueryEvents(keywords = "Obama", conceptUri = QueryItems.AND(["a", "b"]), dateStart = date)),
+        ("build CombinedQuery and ComplexArticleQuery", buildComplexQuery)
+    ]
+
+
+def measure(func, seconds = 0.5):
+    """return the number of calls of func per second, measured for at least the given number of seconds"""
+    count = 0
+    batch = 1
+    startTime = time.perf_counter()
+    while True:
+        for i in range(batch):
+            func()
+        count += batch
+        elapsed = time.perf_counter() - startTime
+        if elapsed >= seconds:
+            return count / elapsed
+        batch *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "measure the speed of building the queries and their parameters")
+    parser.add_argument("--seconds", type = float, default = 0.5, help = "min number of seconds to measure each case")
+    parser.add_argument("--target", type = float, default = 1000000, help = "target number of queries built and encoded per minute")
+    args = parser.parse_args()
+    perMinute = None
+    for name, func in getCases():
+        perSecond = measure(func, args.seconds)
+        print("%-45s %12.0f ops/s %10.2f us/op" % (name, perSecond, 1e6 / perSecond))
+        if name == "build and encode QueryArticles":
+            perMinute = perSecond * 60
+    print("\n%.0f queries per minute (target %.0f)" % (perMinute, args.target))
+    return 1 if perMinute < args.target else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+measure how many results per second the iterators download from the local stub server and how much memory they need,
+and compare the results with the baselines in throughputBaseline.json.
+
+Each scenario runs QueryArticlesIter, QueryEventsIter or QueryEventArticlesIter with a given page size, number of
+iterators running in parallel (concurrency) and payload (the parts of the results that are requested). Scenarios are
+run in fresh interpreters, so that the peak resident memory of each one can be measured. The stub server runs in
+this process and responds after the given latency.
+
+The speed of decoding the pages with the json codecs that are installed (json, simplejson, orjson, ujson) is measured
+separately. The requests module decodes the responses with simplejson when it is installed and with json otherwise.
+
+The baselines depend on the machine - create them using --update before checking for regressions on a new machine.
+
+usage: python -m eventregistry.benchmarks.BenchThroughput [--items N] [--latency S] [--tolerance T] [--update]
+
+exits with status 1 if any of the scenarios is slower (or uses more memory) than its baseline by more than the tolerance
+"""
+import sys, os, json, time, threading, subprocess, argparse
+
+baselineFName = os.path.join(os.path.dirname(os.path.abspath(__file__)), "throughputBaseline.json")
+
+# max number of results per page of each iterator
+maxPageSizes = { "QueryArticlesIter": 100, "QueryEventsIter": 50, "QueryEventArticlesIter": 100 }
+
+
+def getScenarios():
+    """return the list of the measured scenarios"""
+    scenarios = []
+    for iterator, maxPageSize in sorted(maxPageSizes.items()):
+        for pageSize in [maxPageSize // 4, maxPageSize]:
+            for concurrency in [1, 4]:
+                scenarios.append({ "iterator": iterator, "pageSize": pageSize, "concurrency": concurrency, "payload": "default" })
+        for payload in ["minimal", "full"]:
+            scenarios.append({ "iterator": iterator, "pageSize": maxPageSize, "concurrency": 1, "payload": payload })
+    return scenarios
+
+
+def getScenarioName(scenario):
+    return "%s pageSize=%d concurrency=%d payload=%s" % (scenario["iterator"], scenario["pageSize"], scenario["concurrency"], scenario["payload"])
+
+
+def getReturnInfo(payload):
+    """return the ReturnInfo requesting the minimal, default or full results"""
+    from eventregistry import ReturnInfo, ArticleInfoFlags, EventInfoFlags
+    if payload == "minimal":
+        return ReturnInfo(articleInfo = ArticleInfoFlags(bodyLen = 0, authors = False, image = False, sentiment = False),
+            eventInfo = EventInfoFlags(summary = False, concepts = False, categories = False, location = False))
+    if payload == "full":
+        return ReturnInfo(articleInfo = ArticleInfoFlags(concepts = True, categories = True, location = True, links = True, socialScore = True, storyUri = True),
+            eventInfo = EventInfoFlags(socialScore = True, imageCount = 3))
+    return ReturnInfo()
+
+
+def runScenario(scenario, host):
+    """
+    download all results of the scenario from the stub server at host. Called in the fresh interpreter
+    @returns: dict with the number of downloaded items, the number of seconds and the items per second
+    """
+    from eventregistry import EventRegistry, AdaptiveConcurrencyLimiter, QueryArticlesIter, QueryEventsIter, QueryEventArticlesIter
+    concurrency = scenario["concurrency"]
+    er = EventRegistry(apiKey = "key", host = host, minDelayBetweenRequests = 0, versionCheck = False, retryDelay = 0.1,
+        concurrency = AdaptiveConcurrencyLimiter(initialLimit = concurrency, minLimit = concurrency, maxLimit = concurrency) if concurrency > 1 else None)
+    returnInfo = getReturnInfo(scenario["payload"])
+    counts = []
+
+    def iterate(i):
+        if scenario["iterator"] == "QueryArticlesIter":
+            it = QueryArticlesIter(keywords = "test %d" % (i)).execQuery(er, returnInfo = returnInfo)
+            it._articleBatchSize = scenario["pageSize"]
+        elif scenario["iterator"] == "QueryEventsIter":
+            it = QueryEventsIter(keywords = "test %d" % (i)).execQuery(er, returnInfo = returnInfo)
+            it._eventBatchSize = scenario["pageSize"]
+        else:
+            it = QueryEventArticlesIter("eng-%d" % (1000000 + i)).execQuery(er, returnInfo = returnInfo)
+            it._articleBatchSize = scenario["pageSize"]
+        count = 0
+        for item in it:
+            count += 1
+        counts.append(count)
+
+    startTime = time.time()
+    threads = [threading.Thread(target = iterate, args = (i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.time() - startTime
+    return { "items": sum(counts), "seconds": seconds, "itemsPerSecond": sum(counts) / seconds }
+
+
+def getPeakRssMB():
+    """return the peak resident memory of this process in MB"""
+    # on linux ru_maxrss includes the memory of the parent process at the time of the fork - use the high water mark of the process
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    import resource
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # the value is in bytes on macOS and in kilobytes elsewhere
+    return maxRss / 1e6 if sys.platform == "darwin" else maxRss / 1e3
+
+
+def measureScenario(scenario, server, items):
+    """
+    run the scenario in a fresh interpreter against the stub server, so that each iterator downloads items / concurrency results
+    @returns: dict with the items per second and the peak resident memory of the interpreter (peakRssMB)
+    """
+    perIterator = max(items // scenario["concurrency"], 1)
+    server.articleCount = server.eventCount = server.eventArticleCount = perIterator
+    out = subprocess.check_output([sys.executable, "-m", "eventregistry.benchmarks.BenchThroughput",
+        "--child", json.dumps(scenario), "--host", server.host])
+    result = json.loads(out.decode("utf-8").strip().split("\n")[-1])
+    expected = perIterator * scenario["concurrency"]
+    if result["items"] != expected:
+        raise Exception("%s: downloaded %d items instead of %d" % (getScenarioName(scenario), result["items"], expected))
+    return result
+
+
+def getCodecs():
+    """return the list of (name, loads function) of the installed json codecs"""
+    codecs = [("json", json.loads)]
+    for name in ["simplejson", "orjson", "ujson"]:
+        try:
+            module = __import__(name)
+            codecs.append((name, module.loads))
+        except ImportError:
+            pass
+    return codecs
+
+
+def measureDecoding(loads, payload, seconds = 1.0):
+    """return the number of articles per second decoded from the (default) pages of 100 articles using the loads function"""
+    from eventregistry.benchmarks.StubServer import SyntheticData
+    params = getReturnInfo(payload).getParams("articles")
+    page = b'{"articles": {"page": 1, "pages": 1, "totalResults": 100, "results": [' + b", ".join(SyntheticData().encodeArticles(0, 100, params)) + b"]}}"
+    text = page.decode("utf-8")
+    count = 0
+    startTime = time.time()
+    while time.time() - startTime < seconds:
+        loads(text)
+        count += 100
+    return count / (time.time() - startTime)
+
+
+def checkRegression(name, measured, baseline, tolerance):
+    """return the list of the measurements that are worse than the baseline by more than the tolerance (share of the baseline value)"""
+    errors = []
+    if "itemsPerSecond" in baseline and measured["itemsPerSecond"] < baseline["itemsPerSecond"] * (1 - tolerance):
+        errors.append("%s: %.1f items/s, baseline is %.1f" % (name, measured["itemsPerSecond"], baseline["itemsPerSecond"]))
+    if "peakRssMB" in baseline and measured.get("peakRssMB", 0) > baseline["peakRssMB"] * (1 + tolerance):
+        errors.append("%s: peak memory is %.1f MB, baseline is %.1f MB" % (name, measured["peakRssMB"], baseline["peakRssMB"]))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "measure the throughput of the iterators against the local stub server")
+    parser.add_argument("--items", type = int, default = None, help = "number of results downloaded in each scenario. By default the same as for the baselines (or 5000)")
+    parser.add_argument("--latency", type = float, default = None, help = "number of seconds before the server responds to a request. By default the same as for the baselines (or 0.01)")
+    parser.add_argument("--tolerance", type = float, default = None, help = "allowed share by which a result can be worse than the baseline")
+    parser.add_argument("--baseline", default = baselineFName, help = "file with the baselines")
+    parser.add_argument("--update", action = "store_true", help = "store the results as the new baselines")
+    parser.add_argument("--child", help = argparse.SUPPRESS)
+    parser.add_argument("--host", help = argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        result = runScenario(json.loads(args.child), args.host)
+        result["peakRssMB"] = getPeakRssMB()
+        print(json.dumps(result))
+        return 0
+
+    from eventregistry.benchmarks.StubServer import StubServer
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    tolerance = args.tolerance if args.tolerance != None else baselines.get("tolerance", 0.3)
+    # the results are only comparable with the baselines measured with the same settings
+    items = args.items if args.items != None else baselines.get("items", 5000)
+    latency = args.latency if args.latency != None else baselines.get("latency", 0.01)
+    if not args.update and (items != baselines.get("items") or latency != baselines.get("latency")):
+        print("The number of items or the latency differ from the baselines - the results are not compared")
+        baselines = {}
+    server = StubServer(latency = latency).start()
+    results = {}
+    try:
+        for scenario in getScenarios():
+            name = getScenarioName(scenario)
+            results[name] = measureScenario(scenario, server, items)
+            print("%-70s %10.1f items/s %8.1f MB" % (name, results[name]["itemsPerSecond"], results[name]["peakRssMB"]))
+    finally:
+        server.stop()
+    for codecName, loads in getCodecs():
+        for payload in ["default", "full"]:
+            name = "decode codec=%s payload=%s" % (codecName, payload)
+            results[name] = { "itemsPerSecond": measureDecoding(loads, payload) }
+            print("%-70s %10.1f items/s" % (name, results[name]["itemsPerSecond"]))
+
+    if args.update:
+        stored = { "tolerance": tolerance, "items": items, "latency": latency,
+            "results": dict((name, dict((key, round(value, 1)) for key, value in res.items() if key in ["itemsPerSecond", "peakRssMB"])) for name, res in results.items()) }
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent = 4, sort_keys = True)
+        print("Baselines stored to %s" % (args.baseline))
+        return 0
+    errors = []
+    for name, measured in results.items():
+        if name in baselines.get("results", {}):
+            errors.extend(checkRegression(name, measured, baselines["results"][name], tolerance))
+    for error in errors:
+        print("REGRESSION: " + error)
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+compare the transports by sending many concurrent search requests to a local server.
+
+The server supports HTTP/1.1 and HTTP/2 (with prior knowledge, requires the h2 module). Each new connection is
+delayed by connectDelay seconds to simulate the TCP and TLS handshakes to a remote host and each request by latency seconds.
+For each transport the number of opened connections, the total time and the number of requests per second are reported.
+
+usage: python -m eventregistry.benchmarks.BenchTransport [--requests N] [--threads N] [--latency S] [--connectDelay S]
+"""
+import sys, json, time, socket, threading, argparse
+
+
+class LocalServer(object):
+    def __init__(self, latency = 0.02, connectDelay = 0.05, totalResults = 100):
+        """
+        local server that responds to all POST requests with a page of (empty) articles
+        @param latency: number of seconds before each response is sent
+        @param connectDelay: number of seconds before the first request on a new connection is processed
+        @param totalResults: number of results reported in the responses
+        """
+        self.latency = latency
+        self.connectDelay = connectDelay
+        self.totalResults = totalResults
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(128)
+        self.host = "http://127.0.0.1:%d" % self._sock.getsockname()[1]
+        self._stopped = False
+
+
+    def start(self):
+        thread = threading.Thread(target = self._accept)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+    def stop(self):
+        self._stopped = True
+        self._sock.close()
+
+
+    def getResponse(self):
+        with self._lock:
+            self.requests += 1
+        results = { "totalResults": self.totalResults, "page": 1, "pages": 1, "results": [] }
+        return json.dumps({ "articles": results, "events": results }).encode("utf-8")
+
+
+    def _accept(self):
+        while not self._stopped:
+            try:
+                conn, addr = self._sock.accept()
+            except Exception:
+                return
+            with self._lock:
+                self.connections += 1
+            thread = threading.Thread(target = self._serve, args = (conn,))
+            thread.daemon = True
+            thread.start()
+
+
+    def _serve(self, conn):
+        time.sleep(self.connectDelay)
+        try:
+            data = conn.recv(65536)
+            if data.startswith(b"PRI * HTTP/2.0"):
+                self._serveHttp2(conn, data)
+            else:
+                self._serveHttp1(conn, data)
+        except Exception:
+            pass
+        finally:
+            conn.close()
+
+
+    def _serveHttp1(self, conn, data):
+        while data:
+            while b"\r\n\r\n" not in data:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    return
+                data += chunk
+            head, data = data.split(b"\r\n\r\n", 1)
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, value = line.split(b":", 1)
+                if name.strip().lower() == b"content-length":
+                    length = int(value.strip())
+            while len(data) < length:
+                data += conn.recv(65536)
+            data = data[length:]
+            time.sleep(self.latency)
+            body = self.getResponse()
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+            if not data:
+                data = conn.recv(65536)
+
+
+    def _serveHttp2(self, conn, data):
+        import h2.connection, h2.config, h2.events
+        h2conn = h2.connection.H2Connection(config = h2.config.H2Configuration(client_side = False))
+        h2conn.initiate_connection()
+        sendLock = threading.Lock()
+
+        def respond(streamId):
+            time.sleep(self.latency)
+            body = self.getResponse()
+            with sendLock:
+                h2conn.send_headers(streamId, [(":status", "200"), ("content-type", "application/json"), ("content-length", str(len(body)))])
+                h2conn.send_data(streamId, body, end_stream = True)
+                conn.sendall(h2conn.data_to_send())
+
+        while data:
+            with sendLock:
+                events = h2conn.receive_data(data)
+                for event in events:
+                    if isinstance(event, h2.events.DataReceived):
+                        h2conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        thread = threading.Thread(target = respond, args = (event.stream_id,))
+                        thread.daemon = True
+                        thread.start()
+                conn.sendall(h2conn.data_to_send())
+            data = conn.recv(65536)
+
+
+
+def runBenchmark(transport, server, requestCount, threadCount):
+    """send requestCount search requests from threadCount threads using the transport. Returns the stats of the run"""
+    from eventregistry import EventRegistry, AdaptiveConcurrencyLimiter, QueryArticles
+    er = EventRegistry(apiKey = "key", host = server.host, minDelayBetweenRequests = 0, versionCheck = False,
+        concurrency = AdaptiveConcurrencyLimiter(initialLimit = threadCount, minLimit = threadCount, maxLimit = threadCount), transport = transport)
+    connections = server.connections
+    counter = { "remaining": requestCount }
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if counter["remaining"] <= 0:
+                    return
+                counter["remaining"] -= 1
+            er.execQuery(QueryArticles(keywords = "test"))
+
+    startTime = time.time()
+    threads = [threading.Thread(target = worker) for i in range(threadCount)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.time() - startTime
+    transport.close()
+    return { "connections": server.connections - connections, "seconds": seconds, "requestsPerSecond": requestCount / seconds }
+
+
+def main():
+    from eventregistry import RequestsTransport, Http2Transport
+    parser = argparse.ArgumentParser(description = "compare the HTTP/1.1 and HTTP/2 transports")
+    parser.add_argument("--requests", type = int, default = 400, help = "number of requests to send")
+    parser.add_argument("--threads", type = int, default = 16, help = "number of threads sending the requests")
+    parser.add_argument("--latency", type = float, default = 0.02, help = "number of seconds before the server responds to a request")
+    parser.add_argument("--connectDelay", type = float, default = 0.05, help = "number of seconds needed to set up a new connection")
+    args = parser.parse_args()
+    server = LocalServer(latency = args.latency, connectDelay = args.connectDelay).start()
+    transports = [("requests (HTTP/1.1)", RequestsTransport)]
+    try:
+        import httpx, h2
+        transports.append(("httpx (HTTP/2)", lambda: Http2Transport(priorKnowledge = True)))
+    except ImportError:
+        print("httpx or h2 is not installed - the HTTP/2 transport is not measured")
+    for name, createTransport in transports:
+        stats = runBenchmark(createTransport(), server, args.requests, args.threads)
+        print("%-20s %4d connections %8.3f s %8.1f requests/s" % (name, stats["connections"], stats["seconds"], stats["requestsPerSecond"]))
+    server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,729 @@
+"""
+a local stand-in for the Event Registry API that serves synthetic data, so that the client can be tested and benchmarked offline.
+
+The server implements the endpoints used by the client - searching for articles and events (/api/v1/article, /api/v1/event),
+the suggestions (/api/v1/suggest*Fast), the minute streams (/api/v1/minuteStream*), the counts (/api/v1/counters) and the
+analytics endpoints. The search endpoints follow the paging of the API - the number of results per page is limited
+(100 articles, 50 events), and the pages after the last one are empty.
+
+The returned articles and events have the shape of the real results and include the parts requested with the
+ArticleInfoFlags and EventInfoFlags. To serve large result sets quickly, the results are built from a fixed number of
+pre-encoded templates that only differ in the uri.
+
+Faults can be injected to test the retries, the concurrency and the throughput of the client:
+latency (constant or drawn from a distribution), errors (e.g. 503), dropped connections, responses with malformed json
+and throttling (429) when the rate or the number of concurrent requests is over the limit.
+
+    server = StubServer(articleCount = 50000, latency = lognormalLatency(0.1), errorRate = 0.01).start()
+    er = EventRegistry(apiKey = "key", host = server.host, hostAnalytics = server.host)
+    ...
+    server.stop()
+
+usage: python -m eventregistry.benchmarks.StubServer [--port N] [--articles N] [--latency S] [--errorRate R] ...
+"""
+import sys, json, time, gzip, zlib, math, random, datetime, threading, argparse, collections
+from six.moves import BaseHTTPServer, socketserver
+
+# max number of results per page, as limited by the API
+maxPageSize = { "articles": 100, "events": 50, "uriWgtList": 50000 }
+
+
+def uniformLatency(low, high):
+    """return the latency function with the latency uniformly distributed between low and high seconds"""
+    return lambda rnd: rnd.uniform(low, high)
+
+
+def lognormalLatency(median, sigma = 0.5, maxLatency = None):
+    """
+    return the latency function with log-normally distributed latency (most requests are fast, some are much slower)
+    @param median: median latency in seconds
+    @param sigma: standard deviation of the log of the latency. Larger values give longer tails
+    @param maxLatency: max latency in seconds. None for no limit
+    """
+    def latency(rnd):
+        value = rnd.lognormvariate(math.log(median), sigma)
+        return min(value, maxLatency) if maxLatency != None else value
+    return latency
+
+
+def exponentialLatency(mean):
+    """return the latency function with exponentially distributed latency with the given mean (in seconds)"""
+    return lambda rnd: rnd.expovariate(1.0 / mean)
+
+
+
+class SyntheticData(object):
+    def __init__(self, seed = 1, templateCount = 500, bodyLength = 2500, conceptsPerArticle = 10):
+        """
+        generator of synthetic articles, events, concepts and sources with the shape of the data returned by the API.
+        The same seed always generates the same data
+        @param seed: seed of the random generator
+        @param templateCount: number of distinct articles and events. Results with larger indices repeat the templates with different uris
+        @param bodyLength: average number of characters in the article bodies
+        @param conceptsPerArticle: number of concepts annotated in each article (and event)
+        """
+        self._seed = seed
+        self._templateCount = templateCount
+        self._bodyLength = bodyLength
+        self._conceptsPerArticle = conceptsPerArticle
+        rnd = random.Random(seed)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self._words = ["".join(rnd.choice(letters) for j in range(rnd.randint(2, 10))) for i in range(5000)]
+        self._concepts = [self._createConcept(rnd, i) for i in range(2000)]
+        self._sources = [{ "uri": "%s%d.com" % (self._words[i], i), "dataType": "news", "title": "%s News" % (self._words[i].title()) } for i in range(500)]
+        self._baseDate = datetime.datetime(2026, 1, 1)
+        # (type, requested parts) -> list of the encoded templates without the uri
+        self._templates = {}
+        self._lock = threading.Lock()
+
+
+    def getArticle(self, index, params = None):
+        """
+        return the article with the given index as a dict
+        @param params: request parameters with the includeArticle* flags and articleBodyLen that determine which parts are returned
+        """
+        return json.loads(self.encodeArticles(index, 1, params)[0].decode("utf-8"))
+
+
+    def encodeArticles(self, start, count, params = None):
+        """return the list of the json encoded articles with indices start ... start + count - 1"""
+        return self._encode("article", start, count, params or {})
+
+
+    def getEvent(self, index, params = None):
+        """return the event with the given index as a dict"""
+        return json.loads(self.encodeEvents(index, 1, params)[0].decode("utf-8"))
+
+
+    def encodeEvents(self, start, count, params = None):
+        """return the list of the json encoded events with indices start ... start + count - 1"""
+        return self._encode("event", start, count, params or {})
+
+
+    def getArticleUri(self, index):
+        return "%d" % (8000000000 + index)
+
+
+    def getEventUri(self, index):
+        return "eng-%d" % (1000000 + index)
+
+
+    def getConcepts(self, prefix, start, count):
+        """return the list of concepts with labels starting with the prefix"""
+        return [dict(self._concepts[(start + i) % len(self._concepts)], label = { "eng": ("%s %s" % (prefix.title(), self._words[(start + i) % len(self._words)])).strip() })
+            for i in range(count)]
+
+
+    def getSources(self, start, count):
+        return [self._sources[(start + i) % len(self._sources)] for i in range(count)]
+
+
+    def getText(self, rnd, length):
+        """return the random text with about length characters"""
+        words = []
+        size = 0
+        while size < length:
+            word = rnd.choice(self._words)
+            words.append(word)
+            size += len(word) + 1
+        return " ".join(words).capitalize() + "."
+
+
+    def getDate(self, index):
+        """return the datetime of the article/event with the given index (results with larger indices are older)"""
+        return self._baseDate - datetime.timedelta(seconds = 37 * index)
+
+
+    #
+    # internal methods
+
+    def _encode(self, kind, start, count, params):
+        templates = self._getTemplates(kind, params)
+        getUri = self.getArticleUri if kind == "article" else self.getEventUri
+        return [b'{"uri": "' + getUri(index).encode("ascii") + b'", ' + templates[index % self._templateCount] for index in range(start, start + count)]
+
+
+    def _getTemplates(self, kind, params):
+        prefix = "includeArticle" if kind == "article" else "includeEvent"
+        key = (kind, params.get("articleBodyLen", -1), params.get("eventImageCount", 0)) + tuple(sorted((name, value) for name, value in params.items() if name.startswith(prefix)))
+        templates = self._templates.get(key)
+        if templates is None:
+            with self._lock:
+                templates = self._templates.get(key)
+                if templates is None:
+                    createItem = self._createArticle if kind == "article" else self._createEvent
+                    templates = []
+                    for i in range(self._templateCount):
+                        item = createItem(random.Random(self._seed * 1000003 + i), i, params)
+                        # the uri is added when the results are encoded
+                        templates.append(json.dumps(item)[1:].encode("utf-8"))
+                    self._templates[key] = templates
+        return templates
+
+
+    def _createConcept(self, rnd, index):
+        conceptType = rnd.choice(["person", "org", "loc", "wiki", "wiki", "wiki"])
+        label = " ".join(word.title() for word in rnd.sample(self._words, 2 if conceptType == "person" else 1))
+        concept = { "uri": "http://en.wikipedia.org/wiki/%s" % (label.replace(" ", "_")), "type": conceptType, "label": { "eng": label } }
+        if conceptType == "loc":
+            concept["location"] = { "type": "place", "label": { "eng": label }, "lat": rnd.uniform(-60, 70), "long": rnd.uniform(-180, 180) }
+        return concept
+
+
+    def _getLocation(self, rnd):
+        return {
+            "type": "place",
+            "label": { "eng": rnd.choice(self._words).title() },
+            "country": { "type": "country", "label": { "eng": rnd.choice(self._words).title() } }
+        }
+
+
+    def _getArticleConcepts(self, rnd):
+        return [dict(concept, score = rnd.randint(1, 5)) for concept in rnd.sample(self._concepts, self._conceptsPerArticle)]
+
+
+    def _getCategories(self, rnd):
+        return [{ "uri": "dmoz/%s/%s" % (rnd.choice(self._words).title(), rnd.choice(self._words).title()), "wgt": rnd.randint(10, 100) } for i in range(3)]
+
+
+    def _createArticle(self, rnd, index, params):
+        def include(name, default):
+            return params.get("includeArticle" + name, default)
+
+        date = self.getDate(index)
+        source = rnd.choice(self._sources)
+        title = self.getText(rnd, rnd.randint(40, 100))[:-1]
+        art = {}
+        if include("BasicInfo", True):
+            art.update({ "lang": "eng", "isDuplicate": rnd.random() < 0.1, "date": date.strftime("%Y-%m-%d"), "time": date.strftime("%H:%M:%S"),
+                "dateTime": date.strftime("%Y-%m-%dT%H:%M:%SZ"), "dateTimePub": date.strftime("%Y-%m-%dT%H:%M:%SZ"), "dataType": "news",
+                "sim": round(rnd.random(), 4), "source": source, "wgt": int(time.mktime(date.timetuple())), "relevance": rnd.randint(1, 100) })
+        if include("Url", True):
+            art["url"] = "https://www.%s/news/%s/%s" % (source["uri"], date.strftime("%Y/%m/%d"), title.lower().replace(" ", "-"))
+        if include("Title", True):
+            art["title"] = title
+        if include("Body", True):
+            body = self.getText(rnd, int(rnd.uniform(0.3, 1.7) * self._bodyLength))
+            bodyLen = params.get("articleBodyLen", -1)
+            art["body"] = body if bodyLen < 0 else body[:bodyLen]
+        if include("EventUri", True):
+            art["eventUri"] = self.getEventUri(index % 1000) if rnd.random() < 0.7 else None
+        if include("Authors", True):
+            name = "%s %s" % (rnd.choice(self._words).title(), rnd.choice(self._words).title())
+            art["authors"] = [{ "uri": "%s@%s" % (name.lower().replace(" ", "_"), source["uri"]), "name": name, "type": "author", "isAgency": False }]
+        if include("Image", True):
+            art["image"] = "https://www.%s/images/%d.jpg" % (source["uri"], index)
+        if include("Sentiment", True):
+            art["sentiment"] = round(rnd.uniform(-1, 1), 4)
+        if include("Concepts", False):
+            art["concepts"] = self._getArticleConcepts(rnd)
+        if include("Categories", False):
+            art["categories"] = self._getCategories(rnd)
+        if include("Links", False):
+            art["links"] = ["https://www.%s/%s" % (rnd.choice(self._sources)["uri"], rnd.choice(self._words)) for i in range(5)]
+        if include("Videos", False):
+            art["videos"] = []
+        if include("SocialScore", False):
+            art["shares"] = { "facebook": rnd.randint(0, 5000) }
+        if include("Location", False):
+            art["location"] = self._getLocation(rnd)
+        if include("Dates", False) or include("ExtractedDates", False):
+            art["extractedDates"] = [{ "amb": False, "date": date.strftime("%Y-%m-%d"), "detectedDate": date.strftime("%B %d"), "posInText": rnd.randint(0, 1000) }]
+        if include("OriginalArticle", False):
+            art["originalArticle"] = None
+        if include("StoryUri", False):
+            art["storyUri"] = "%s-%d" % (self.getEventUri(index % 1000), rnd.randint(1, 20))
+        return art
+
+
+    def _createEvent(self, rnd, index, params):
+        def include(name, default):
+            return params.get("includeEvent" + name, default)
+
+        date = self.getDate(index * 50)
+        articleCount = int(rnd.paretovariate(1.2) * 5)
+        event = { "eventDate": date.strftime("%Y-%m-%d"), "totalArticleCount": articleCount, "wgt": articleCount, "relevance": rnd.randint(1, 100) }
+        if include("Title", True):
+            event["title"] = { "eng": self.getText(rnd, rnd.randint(40, 100))[:-1] }
+        if include("Summary", True):
+            event["summary"] = { "eng": self.getText(rnd, 600) }
+        if include("ArticleCounts", True):
+            event["articleCounts"] = { "eng": articleCount, "total": articleCount }
+        if include("Concepts", True):
+            event["concepts"] = self._getArticleConcepts(rnd)
+        if include("Categories", True):
+            event["categories"] = self._getCategories(rnd)
+        if include("Location", True):
+            event["location"] = self._getLocation(rnd)
+        if include("SocialScore", False):
+            event["socialScore"] = rnd.randint(0, 10000)
+        event["images"] = ["https://www.%s/images/%d.jpg" % (rnd.choice(self._sources)["uri"], i) for i in range(params.get("eventImageCount", 0))]
+        event["sentiment"] = round(rnd.uniform(-1, 1), 4)
+        return event
+
+
+
+class StubServer(object):
+    def __init__(self,
+                 port = 0,
+                 addr = "127.0.0.1",
+                 articleCount = 10000,
+                 eventCount = 1000,
+                 eventArticleCount = 500,
+                 latency = 0,
+                 errorRate = 0,
+                 errorStatus = 503,
+                 dropRate = 0,
+                 malformedRate = 0,
+                 maxRequestsPerSecond = None,
+                 maxConcurrentRequests = None,
+                 dailyTokens = 100000,
+                 compressResponses = False,
+                 data = None,
+                 seed = 1):
+        """
+        local http server that responds to the requests of the client with synthetic data.
+        The parameters are stored as attributes and can be changed while the server is running (e.g. server.errorRate = 0.5)
+        @param port: port to listen on. Use 0 to pick a free port
+        @param addr: address to listen on
+        @param articleCount: number of articles matching each article search
+        @param eventCount: number of events matching each event search
+        @param eventArticleCount: number of articles in each event
+        @param latency: number of seconds before each response is sent, or a function that gets a random.Random instance and returns
+            the latency (e.g. lognormalLatency(0.1))
+        @param errorRate: share of the requests to which the server responds with the errorStatus code
+        @param errorStatus: status code returned for the failed requests
+        @param dropRate: share of the requests for which the connection is closed without sending a response
+        @param malformedRate: share of the requests to which the server responds with truncated (invalid) json
+        @param maxRequestsPerSecond: max number of requests per second. Requests over the limit get a 429 response. None for no limit
+        @param maxConcurrentRequests: max number of requests processed at the same time. Requests over the limit get a 429 response. None for no limit
+        @param dailyTokens: number of tokens reported in the x-ratelimit-limit header. Each request uses one token
+        @param compressResponses: compress the responses with gzip when the client accepts it
+        @param data: instance of SyntheticData used to generate the results. If None, one is created using the seed
+        @param seed: seed of the random generator used for the data and for the injected faults
+        """
+        self.articleCount = articleCount
+        self.eventCount = eventCount
+        self.eventArticleCount = eventArticleCount
+        self.latency = latency
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        self.dropRate = dropRate
+        self.malformedRate = malformedRate
+        self.maxRequestsPerSecond = maxRequestsPerSecond
+        self.maxConcurrentRequests = maxConcurrentRequests
+        self.dailyTokens = dailyTokens
+        self.compressResponses = compressResponses
+        self.data = data or SyntheticData(seed = seed)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._activeRequests = 0
+        self._rateTokens = None
+        self._rateTime = None
+        self._streamPosition = 0
+        self._thread = None
+        self.resetStats()
+        self._endpoints = {
+            "/api/v1/article": self._article,
+            "/api/v1/event": self._event,
+            "/api/v1/suggestConceptsFast": self._suggestConcepts,
+            "/api/v1/suggestCategoriesFast": self._suggestCategories,
+            "/api/v1/suggestSourcesFast": self._suggestSources,
+            "/api/v1/suggestLocationsFast": self._suggestLocations,
+            "/api/v1/suggestAuthorsFast": self._suggestAuthors,
+            "/api/v1/minuteStreamArticles": self._minuteStreamArticles,
+            "/api/v1/minuteStreamEvents": self._minuteStreamEvents,
+            "/api/v1/counters": self._counters,
+            "/api/v1/annotate": self._annotate,
+            "/api/v1/categorize": self._categorize,
+            "/api/v1/sentiment": self._sentiment,
+            "/api/v1/sentimentRNN": self._sentiment,
+            "/api/v1/semanticSimilarity": lambda params: { "similarity": 0.5 },
+            "/api/v1/detectLanguage": lambda params: { "languages": [{ "code": "eng", "name": "English", "percentage": 1.0 }] },
+            "/api/v1/extractArticleInfo": self._extractArticleInfo,
+            "/api/v1/ner": lambda params: { "entities": [] }
+        }
+        self._server = _ThreadingServer((addr, port), _StubHandler)
+        self._server.stub = self
+        self.host = "http://%s:%d" % (addr, self._server.server_address[1])
+
+
+    def start(self):
+        """start serving the requests in a background thread"""
+        self._thread = threading.Thread(target = self._server.serve_forever, name = "EventRegistryStubServer")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        # shutdown() waits for serve_forever() to exit, so it is only called when the server was started
+        if self._thread != None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+
+    def serveForever(self):
+        """serve the requests in the current thread"""
+        self._server.serve_forever()
+
+
+    def getStats(self):
+        """
+        return the number of requests per endpoint and per status code, the number of dropped connections, the number of opened
+        connections, the max number of requests processed at the same time and the number of used tokens
+        """
+        with self._lock:
+            return {
+                "requests": sum(self._endpointCounts.values()),
+                "endpoints": dict(self._endpointCounts),
+                "statuses": dict(self._statusCounts),
+                "dropped": self._droppedCount,
+                "connections": self._connectionCount,
+                "peakConcurrency": self._peakConcurrency,
+                "tokensUsed": self._tokensUsed
+            }
+
+
+    def resetStats(self):
+        with self._lock:
+            self._endpointCounts = collections.Counter()
+            self._statusCounts = collections.Counter()
+            self._droppedCount = 0
+            self._connectionCount = 0
+            self._peakConcurrency = 0
+            self._tokensUsed = 0
+
+
+    def handle(self, path, params, acceptEncoding = ""):
+        """
+        process a request to the path with the given parameters
+        @returns: tuple (status code, headers dict, body bytes). Body is None if the connection should be dropped
+        """
+        with self._lock:
+            self._endpointCounts[path] += 1
+            self._activeRequests += 1
+            self._peakConcurrency = max(self._peakConcurrency, self._activeRequests)
+        try:
+            status, headers, body = self._process(path, params)
+        except Exception as ex:
+            status, headers, body = 500, { "Content-Type": "application/json" }, self._dumps({ "error": "Stub server error: %s" % (ex) })
+        finally:
+            with self._lock:
+                self._activeRequests -= 1
+                self._statusCounts["dropped" if body is None else status] += 1
+                if body is None:
+                    self._droppedCount += 1
+        if body != None and self.compressResponses and "gzip" in acceptEncoding and len(body) > 1024:
+            body = gzip.compress(body, 1)
+            headers["Content-Encoding"] = "gzip"
+        return status, headers, body
+
+
+    #
+    # internal methods
+
+    def _process(self, path, params):
+        headers = { "Content-Type": "application/json" }
+        throttled = self._isThrottled()
+        if throttled:
+            headers["Retry-After"] = "1"
+            return 429, headers, self._dumps({ "error": "Too many requests. %s" % (throttled) })
+        with self._lock:
+            draw = self._random.random()
+            malformed = self._random.random() < self.malformedRate
+            latency = self.latency(self._random) if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+        if draw < self.dropRate:
+            return None, headers, None
+        if draw < self.dropRate + self.errorRate:
+            return self.errorStatus, headers, self._dumps({ "error": "Service temporarily unavailable" })
+        endpoint = self._endpoints.get(path)
+        if endpoint is None:
+            # 530 is used by the API for invalid requests that should not be repeated
+            return 530, headers, self._dumps({ "error": "Endpoint %s is not supported by the stub server" % (path) })
+        body = endpoint(params)
+        if not isinstance(body, bytes):
+            body = self._dumps(body)
+        with self._lock:
+            self._tokensUsed += 1
+            remaining = max(self.dailyTokens - self._tokensUsed, 0)
+        headers.update({ "req-tokens": "1", "req-archive": "0", "x-ratelimit-limit": str(self.dailyTokens), "x-ratelimit-remaining": str(remaining) })
+        if malformed:
+            body = body[:len(body) // 2]
+        return 200, headers, body
+
+
+    def _isThrottled(self):
+        """return the reason if the request is over the rate or concurrency limit, None otherwise"""
+        with self._lock:
+            if self.maxConcurrentRequests != None and self._activeRequests > self.maxConcurrentRequests:
+                return "Max %d concurrent requests are allowed" % (self.maxConcurrentRequests)
+            if self.maxRequestsPerSecond != None:
+                # token bucket refilled at the allowed rate, holding at most one second worth of requests
+                now = time.time()
+                capacity = max(self.maxRequestsPerSecond, 1)
+                if self._rateTokens is None:
+                    self._rateTokens = capacity
+                else:
+                    self._rateTokens = min(capacity, self._rateTokens + (now - self._rateTime) * self.maxRequestsPerSecond)
+                self._rateTime = now
+                if self._rateTokens < 1:
+                    return "Max %s requests per second are allowed" % (self.maxRequestsPerSecond)
+                self._rateTokens -= 1
+        return None
+
+
+    def _dumps(self, obj):
+        return json.dumps(obj).encode("utf-8")
+
+
+    def _joinObject(self, parts):
+        """return the json object with the given (name, encoded value) parts"""
+        return b"{" + b", ".join(json.dumps(name).encode("utf-8") + b": " + value for name, value in parts) + b"}"
+
+
+    def _getResultTypes(self, params):
+        resultType = params.get("resultType", [])
+        return resultType if isinstance(resultType, list) else [resultType]
+
+
+    def _getPage(self, resultType, params, totalResults, encode, uriFunc):
+        """return the encoded page of the results of the given type, as requested by the <resultType>Page and <resultType>Count parameters"""
+        page = max(int(params.get(resultType + "Page", 1)), 1)
+        count = max(min(int(params.get(resultType + "Count", maxPageSize.get(resultType, 100))), maxPageSize.get(resultType, 100)), 1)
+        pages = (totalResults + count - 1) // count
+        start = (page - 1) * count
+        count = max(min(count, totalResults - start), 0)
+        if resultType == "uriWgtList":
+            results = [json.dumps("%s:%d" % (uriFunc(index), totalResults - index)).encode("utf-8") for index in range(start, start + count)]
+        else:
+            results = encode(start, count, params)
+        return b'{"page": %d, "pages": %d, "totalResults": %d, "results": [' % (page, pages, totalResults) + b", ".join(results) + b"]}"
+
+
+    def _getResults(self, params, resultTypes, totalResults, encode, uriFunc, itemResultType):
+        """return the list of (result type, encoded results) for the requested result types"""
+        parts = []
+        for resultType in resultTypes:
+            if resultType in (itemResultType, "uriWgtList"):
+                parts.append((resultType, self._getPage(resultType, params, totalResults, encode, uriFunc)))
+            else:
+                # aggregates are not generated
+                parts.append((resultType, b"{}"))
+        return parts
+
+
+    def _article(self, params):
+        if params.get("action") == "getArticle":
+            uris = params.get("articleUri", [])
+            uris = uris if isinstance(uris, list) else [uris]
+            parts = []
+            for uri in uris:
+                index = int(uri) - 8000000000 if uri.isdigit() else 0
+                info = self.data.encodeArticles(index, 1, params)[0]
+                parts.append((uri, self._joinObject([(resultType, info) for resultType in self._getResultTypes(params) or ["info"]])))
+            return self._joinObject(parts)
+        return self._joinObject(self._getResults(params, self._getResultTypes(params), self.articleCount, self.data.encodeArticles, self.data.getArticleUri, "articles"))
+
+
+    def _event(self, params):
+        if params.get("action") == "getEvent":
+            uris = params.get("eventUri", [])
+            uris = uris if isinstance(uris, list) else [uris]
+            parts = []
+            for uri in uris:
+                resultTypes = self._getResultTypes(params) or ["info"]
+                # the articles of the event
+                eventParts = self._getResults(params, [resultType for resultType in resultTypes if resultType != "info"], self.eventArticleCount,
+                    self.data.encodeArticles, self.data.getArticleUri, "articles")
+                if "info" in resultTypes:
+                    index = int(uri.split("-")[-1]) - 1000000 if uri.split("-")[-1].isdigit() else 0
+                    eventParts.append(("info", self.data.encodeEvents(index, 1, params)[0]))
+                parts.append((uri, self._joinObject(eventParts)))
+            return self._joinObject(parts)
+        return self._joinObject(self._getResults(params, self._getResultTypes(params), self.eventCount, self.data.encodeEvents, self.data.getEventUri, "events"))
+
+
+    def _getSuggestionRange(self, params):
+        count = int(params.get("count", 20))
+        return (int(params.get("page", 1)) - 1) * count, count
+
+
+    def _suggestConcepts(self, params):
+        start, count = self._getSuggestionRange(params)
+        return self.data.getConcepts(params.get("prefix", ""), start, count)
+
+
+    def _suggestCategories(self, params):
+        start, count = self._getSuggestionRange(params)
+        prefix = params.get("prefix", "").title()
+        return [{ "uri": "dmoz/%s/%d" % (prefix, start + i), "label": "dmoz/%s/%d" % (prefix, start + i), "parentUri": "dmoz/%s" % (prefix) } for i in range(count)]
+
+
+    def _suggestSources(self, params):
+        start, count = self._getSuggestionRange(params)
+        return self.data.getSources(start, count)
+
+
+    def _suggestLocations(self, params):
+        count = int(params.get("count", 20))
+        prefix = params.get("prefix", "").title()
+        return [{ "wikiUri": "http://en.wikipedia.org/wiki/%s_%d" % (prefix, i), "type": "place", "label": { "eng": "%s %d" % (prefix, i) } } for i in range(count)]
+
+
+    def _suggestAuthors(self, params):
+        start, count = self._getSuggestionRange(params)
+        prefix = params.get("prefix", "").title()
+        return [{ "uri": "%s_%d@%s" % (prefix.lower(), i, source["uri"]), "name": "%s %d" % (prefix, i), "isAgency": False }
+            for i, source in enumerate(self.data.getSources(start, count))]
+
+
+    def _getStreamRange(self, count):
+        """each call of the minute stream returns the items added after the previous call"""
+        with self._lock:
+            start = self._streamPosition
+            self._streamPosition += count
+        return start
+
+
+    def _minuteStreamArticles(self, params):
+        count = int(params.get("recentActivityArticlesMaxArticleCount", 100))
+        articles = self.data.encodeArticles(self._getStreamRange(count), count, params)
+        return b'{"recentActivityArticles": {"activity": [' + b", ".join(articles) + b"]}}"
+
+
+    def _minuteStreamEvents(self, params):
+        count = int(params.get("recentActivityEventsMaxEventCount", 50))
+        start = self._getStreamRange(count)
+        events = self.data.encodeEvents(start, count, params)
+        uris = [self.data.getEventUri(index) for index in range(start, start + count)]
+        return (b'{"recentActivityEvents": {"activity": ' + self._dumps(uris) + b', "events": ' +
+            self._joinObject(list(zip(uris, events))) + b"}}")
+
+
+    def _counters(self, params):
+        uris = params.get("uri", [])
+        uris = uris if isinstance(uris, list) else [uris]
+        dateEnd = datetime.datetime.strptime(params["dateEnd"], "%Y-%m-%d") if "dateEnd" in params else self.data.getDate(0)
+        dateStart = datetime.datetime.strptime(params["dateStart"], "%Y-%m-%d") if "dateStart" in params else dateEnd - datetime.timedelta(days = 30)
+        days = max((dateEnd - dateStart).days + 1, 0)
+        ret = {}
+        for uri in uris:
+            rnd = random.Random(zlib.crc32(uri.encode("utf-8")))
+            ret[uri] = [{ "date": (dateStart + datetime.timedelta(days = i)).strftime("%Y-%m-%d"), "count": rnd.randint(0, 500) } for i in range(days)]
+        return ret
+
+
+    def _annotate(self, params):
+        text = params.get("text", "")
+        concepts = self.data.getConcepts("", len(text) % 100, 5)
+        return {
+            "annotations": [{ "url": concept["uri"], "title": concept["label"]["eng"], "lang": "eng", "wgt": 1.0 / (i + 1), "adjacency": [] } for i, concept in enumerate(concepts)],
+            "categories": [],
+            "language": params.get("lang") or "eng"
+        }
+
+
+    def _categorize(self, params):
+        return { "categories": [{ "label": "%s/Business" % (params.get("taxonomy", "dmoz")), "score": 0.8 }] }
+
+
+    def _sentiment(self, params):
+        return { "avgSent": 0.1, "sentimentSentences": [] if not params.get("returnSentences") else [{ "sentence": params.get("text", ""), "sentiment": 0.1 }] }
+
+
+    def _extractArticleInfo(self, params):
+        art = self.data.getArticle(0)
+        return { "title": art["title"], "body": art["body"], "date": art["date"], "authors": art["authors"], "image": art["image"], "url": params.get("url") }
+
+
+
+class _StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # keep the connections alive between the requests
+    protocol_version = "HTTP/1.1"
+    # send the headers and the body of a response together, without waiting for the acknowledgement of the headers
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        stub = self.server.stub
+        with stub._lock:
+            stub._connectionCount += 1
+
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        encoding = self.headers.get("Content-Encoding")
+        try:
+            if encoding == "gzip":
+                data = zlib.decompress(data, 31)
+            elif encoding == "deflate":
+                data = zlib.decompress(data)
+            params = json.loads(data.decode("utf-8")) if data else {}
+        except Exception as ex:
+            self._send(400, { "Content-Type": "application/json" }, json.dumps({ "error": "Invalid request body: %s" % (ex) }).encode("utf-8"))
+            return
+        status, headers, body = self.server.stub.handle(self.path.split("?")[0], params, self.headers.get("Accept-Encoding", ""))
+        if body is None:
+            # drop the connection without responding
+            self.close_connection = True
+            return
+        self._send(status, headers, body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "local stand-in for the Event Registry API serving synthetic data")
+    parser.add_argument("--port", type = int, default = 8080, help = "port to listen on")
+    parser.add_argument("--addr", default = "127.0.0.1", help = "address to listen on")
+    parser.add_argument("--articles", type = int, default = 10000, help = "number of articles matching each article search")
+    parser.add_argument("--events", type = int, default = 1000, help = "number of events matching each event search")
+    parser.add_argument("--latency", type = float, default = 0, help = "median number of seconds before the server responds")
+    parser.add_argument("--latencySigma", type = float, default = 0, help = "if over 0, the latency is log-normally distributed with this sigma")
+    parser.add_argument("--errorRate", type = float, default = 0, help = "share of the requests that fail with the 503 status code")
+    parser.add_argument("--dropRate", type = float, default = 0, help = "share of the requests for which the connection is dropped")
+    parser.add_argument("--malformedRate", type = float, default = 0, help = "share of the responses with malformed json")
+    parser.add_argument("--maxRequestsPerSecond", type = float, default = None, help = "max number of requests per second")
+    parser.add_argument("--maxConcurrentRequests", type = int, default = None, help = "max number of concurrent requests")
+    parser.add_argument("--compress", action = "store_true", help = "compress the responses using gzip")
+    parser.add_argument("--seed", type = int, default = 1, help = "seed of the random generator")
+    args = parser.parse_args()
+    latency = lognormalLatency(args.latency, args.latencySigma) if args.latency > 0 and args.latencySigma > 0 else args.latency
+    server = StubServer(port = args.port, addr = args.addr, articleCount = args.articles, eventCount = args.events, latency = latency,
+        errorRate = args.errorRate, dropRate = args.dropRate, malformedRate = args.malformedRate, maxRequestsPerSecond = args.maxRequestsPerSecond,
+        maxConcurrentRequests = args.maxConcurrentRequests, compressResponses = args.compress, seed = args.seed)
+    print("Serving on %s" % (server.host))
+    sys.stdout.flush()
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,27 @@
-import unittest, jmespath, unicodedata
+import unittest, jmespath, unicodedata, os, atexit
 from eventregistry import *
+from eventregistry.Cassette import CassetteTransport
+
+
+_cassetteTransport = None
+
+def getTestTransport():
+    """
+    return the transport used by the tests. If the ER_TEST_CASSETTE environment variable is set, all tests share a CassetteTransport
+    that records the requests to the cassette (saved at exit) or replays them when the cassette exists. Otherwise None (the default transport).
+    The tests that compute the dates from the current date (e.g. the last 7 days) are replayed also on later days since
+    the recent dates are matched relative to the day of the recording (see CassetteTransport)
+    """
+    global _cassetteTransport
+    fileName = os.environ.get("ER_TEST_CASSETTE")
+    if not fileName:
+        return None
+    if _cassetteTransport is None:
+        _cassetteTransport = CassetteTransport(fileName)
+        if _cassetteTransport.getMode() == "record":
+            atexit.register(_cassetteTransport.save)
+    return _cassetteTransport
+
 
 class DataValidator(unittest.TestCase):
     def removeAccents(self, inputStr):
@@ -13,7 +35,7 @@ class DataValidator(unittest.TestCase):
         # load settings from the current folder. use different instance than for regular ER requests
         currPath = os.path.split(os.path.realpath(__file__))[0]
         settPath = os.path.join(currPath, "settings.json")
-        self.er = EventRegistry(verboseOutput = True, settingsFName = settPath, allowUseOfArchive = False, minDelayBetweenRequests=0)
+        self.er = EventRegistry(verboseOutput = True, settingsFName = settPath, allowUseOfArchive = False, minDelayBetweenRequests=0, transport = getTestTransport())
 
         self.articleInfo = ArticleInfoFlags(bodyLen = -1, concepts = True, storyUri = True, originalArticle = True, categories = True,
                 links = True, videos = True, image = True, location = True, extractedDates = True, socialScore = True, sentiment = True, includeArticleDuplicateList = True)
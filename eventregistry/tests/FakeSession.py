@@ -0,0 +1,104 @@
+"""
+fake replacement for the requests.Session that can be used to test the client without making any network requests
+"""
+import json, zlib, time
+from eventregistry.EventRegistry import EventRegistry
+from eventregistry.Transport import Transport
+
+
+def decodeBody(data, contentEncoding):
+    """return the json object sent as the request body in the given content encoding"""
+    if contentEncoding == "gzip":
+        data = zlib.decompress(data, 31)
+    elif contentEncoding == "deflate":
+        data = zlib.decompress(data)
+    return json.loads(data.decode("utf-8"))
+
+
+class FakeResponse(object):
+    def __init__(self, data, headers):
+        self.status_code = 200
+        self.headers = headers
+        self.text = json.dumps(data)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession(object):
+    """
+    session returning the same totalResults for every search request and recording the sent parameters
+    responses for other endpoints can be provided in the pathResponses dict (path -> returned data)
+    """
+    def __init__(self, totalResults, tokens = "1", archive = "0", remaining = "900", limit = "1000", pathResponses = None,
+                 pages = 1, results = None, delay = 0, failCount = 0, failStatus = None):
+        """
+        @param pages: number of pages of results reported in the search responses
+        @param results: list of returned results (by default a single empty result)
+        @param delay: number of seconds to wait before responding
+        @param failCount: number of the first requests that fail. If failStatus is None, they fail without a response,
+            otherwise they get a response with the failStatus status code
+        """
+        self.totalResults = totalResults
+        self.headers = { "req-tokens": tokens, "req-archive": archive, "x-ratelimit-remaining": remaining, "x-ratelimit-limit": limit }
+        self.pathResponses = pathResponses or {}
+        self.pages = pages
+        self.results = results if results is not None else [{}]
+        self.responseDelay = delay
+        self.failCount = failCount
+        self.failStatus = failStatus
+        self.sentParams = []
+        self.sentHeaders = []
+        self.urls = []
+
+    def post(self, url, json = None, data = None, headers = None, **kwargs):
+        if self.responseDelay > 0:
+            time.sleep(self.responseDelay)
+        failed = self.failCount > 0
+        if failed:
+            self.failCount -= 1
+            if self.failStatus is None:
+                raise Exception("Connection refused")
+        resp = self._respond(url, json, data, headers)
+        if failed:
+            resp.status_code = self.failStatus
+        return resp
+
+    def _respond(self, url, json, data, headers):
+        if data is not None:
+            # compressed request body
+            json = decodeBody(data, (headers or {}).get("Content-Encoding"))
+        self.sentParams.append(dict(json))
+        self.sentHeaders.append(headers)
+        self.urls.append(url)
+        for path, data in self.pathResponses.items():
+            if url.endswith(path):
+                return FakeResponse(data, self.headers)
+        results = { "totalResults": self.totalResults, "page": 1, "pages": self.pages, "results": self.results }
+        data = { "articles": results, "events": results }
+        if "eventUri" in json:
+            data[json["eventUri"]] = { "articles": results }
+        return FakeResponse(data, self.headers)
+
+
+class FakeTransport(Transport):
+    """transport whose sessions are all the same fake session"""
+    def __init__(self, session):
+        self.session = session
+        self.sessionCount = 0
+
+    def newSession(self):
+        self.sessionCount += 1
+        return self.session
+
+
+def createEventRegistry(session, **kwargs):
+    """
+    return EventRegistry that sends all requests (also the parallel, analytics and health check requests) using the session
+    @param kwargs: arguments of the EventRegistry constructor. By default the api key "key" is used, without the delay
+        between the requests and without checking the version
+    """
+    kwargs.setdefault("apiKey", "key")
+    kwargs.setdefault("minDelayBetweenRequests", 0)
+    kwargs.setdefault("versionCheck", False)
+    return EventRegistry(transport = FakeTransport(session), **kwargs)
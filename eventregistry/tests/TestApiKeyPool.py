@@ -0,0 +1,133 @@
+"""
+test spreading of the requests over multiple API keys
+"""
+import unittest, time
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class KeySession(FakeSession):
+    """
+    session that reports for each key a different number of remaining tokens. The keys named "exhausted..." have no tokens left
+    and the requests with a key in rateLimited are rejected as too frequent the given number of times
+    """
+    def __init__(self, remainingPerKey, rateLimited = None, retryAfter = None):
+        FakeSession.__init__(self, 10, pathResponses = { "/api/v1/usage": { "availableTokens": 1000, "usedTokens": 100 } })
+        self.remainingPerKey = remainingPerKey
+        self.rateLimited = rateLimited or {}
+        self.retryAfter = retryAfter
+
+    def post(self, url, json = None, **kwargs):
+        resp = FakeSession.post(self, url, json = json, **kwargs)
+        key = json["apiKey"]
+        if key.startswith("exhausted"):
+            self.remainingPerKey[key] = 0
+        self.remainingPerKey[key] = max(self.remainingPerKey[key] - 1, 0)
+        resp.headers = dict(self.headers, **{ "x-ratelimit-remaining": str(self.remainingPerKey[key]) })
+        if key.startswith("exhausted"):
+            resp.status_code = 429
+        elif self.rateLimited.get(key, 0) > 0:
+            self.rateLimited[key] -= 1
+            resp.status_code = 429
+            if self.retryAfter != None:
+                resp.headers["Retry-After"] = str(self.retryAfter)
+        return resp
+
+
+class TestApiKeyPool(unittest.TestCase):
+
+    def testSpreadByRemainingTokens(self):
+        session = KeySession({ "key1": 100, "key2": 50 })
+        er = createEventRegistry(session, apiKey = ["key1", "key2"])
+        for i in range(60):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        usedKeys = [params["apiKey"] for params in session.sentParams]
+        self.assertTrue(usedKeys.count("key1") > usedKeys.count("key2"))
+        stats = er.getApiKeyPool().getKeyStats()
+        self.assertEqual(stats["key1"]["requests"] + stats["key2"]["requests"], 60)
+        self.assertEqual(er.getRemainingAvailableRequests(), session.remainingPerKey["key1"] + session.remainingPerKey["key2"])
+
+
+    def testExhaustedKeyRotatedOut(self):
+        session = KeySession({ "key1": 100, "exhausted": 1000 })
+        er = createEventRegistry(session, apiKey = ["exhausted", "key1"])
+        er._repeatFailedRequestCount = 3
+        for i in range(5):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        usedKeys = [params["apiKey"] for params in session.sentParams]
+        self.assertEqual(usedKeys.count("exhausted"), 1)
+        self.assertEqual(usedKeys.count("key1"), 5)
+
+
+    def testAllKeysExhausted(self):
+        session = KeySession({ "exhausted": 1000, "exhausted2": 1000 })
+        er = createEventRegistry(session, apiKey = ["exhausted", "exhausted2"])
+        er._repeatFailedRequestCount = -1
+        er._retryDelay = 0
+        startTime = time.time()
+        with self.assertRaises(ApiKeysExhaustedError) as cm:
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 5)
+        # each key was tried once, then the request failed without retrying
+        self.assertEqual(sorted(params["apiKey"] for params in session.sentParams), ["exhausted", "exhausted2"])
+        self.assertTrue(cm.exception.retryTime > time.time() + 3000)
+
+
+    def testRateLimitedKeyBackedOff(self):
+        session = KeySession({ "key1": 100, "limited": 1000 }, rateLimited = { "limited": 1 }, retryAfter = 30)
+        er = createEventRegistry(session, apiKey = ["limited", "key1"])
+        er._repeatFailedRequestCount = 3
+        er._retryDelay = 0
+        for i in range(5):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        usedKeys = [params["apiKey"] for params in session.sentParams]
+        # the key is not used until the time from the Retry-After header has passed
+        self.assertEqual(usedKeys.count("limited"), 1)
+        self.assertEqual(usedKeys.count("key1"), 5)
+        # but it is not treated as a key without tokens
+        stats = er.getApiKeyPool().getKeyStats("limited")
+        self.assertEqual(stats["exhaustedTime"], None)
+        self.assertTrue(stats["backoffUntil"] > time.time() + 25)
+
+
+    def testRateLimitedKeyUsedAgain(self):
+        session = KeySession({ "limited": 1000 }, rateLimited = { "limited": 1 }, retryAfter = 1)
+        er = createEventRegistry(session, apiKey = ["limited"])
+        er._repeatFailedRequestCount = 3
+        er._retryDelay = 0
+        startTime = time.time()
+        # the request is repeated with the same key after the Retry-After time instead of failing with ApiKeysExhaustedError
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime >= 1)
+        self.assertEqual([params["apiKey"] for params in session.sentParams], ["limited", "limited"])
+
+
+    def testRateLimitWithoutRetryAfter(self):
+        pool = ApiKeyPool(["key1", "key2"], minDelayBetweenRequests = 10)
+        self.assertEqual(pool.acquireKey(), "key1")
+        pool.reportResponse("key1", 429, remainingTokens = 100)
+        # the key is backed off for the minimum delay between the requests
+        stats = pool.getKeyStats("key1")
+        self.assertEqual(stats["exhaustedTime"], None)
+        self.assertTrue(9 < stats["backoffUntil"] - time.time() <= 10)
+        self.assertEqual(pool.acquireKey(), "key2")
+
+
+    def testPerKeyRateLimit(self):
+        pool = ApiKeyPool(["key1", "key2"], minDelayBetweenRequests = 10)
+        # two keys can be used immediately, one after another
+        self.assertEqual(set([pool.acquireKey(), pool.acquireKey()]), set(["key1", "key2"]))
+
+
+    def testUsageInfo(self):
+        session = KeySession({ "key1": 100, "key2": 50 })
+        er = createEventRegistry(session, apiKey = ApiKeyPool(["key1", "key2"], minDelayBetweenRequests = 0))
+        usage = er.getUsageInfo()
+        self.assertEqual(usage, { "availableTokens": 2000, "usedTokens": 200 })
+        self.assertEqual(sorted(params["apiKey"] for params in session.sentParams), ["key1", "key2"])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestApiKeyPool)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,46 @@
+"""
+test the memory footprint suite and the check of the memory budget
+"""
+import unittest, json
+from eventregistry.benchmarks.StubServer import StubServer
+from eventregistry.benchmarks.BenchMemory import getScenarios, getScenarioName, runScenario, checkBudget, budgetFName
+
+
+class TestBenchMemory(unittest.TestCase):
+
+    def testRunScenario(self):
+        server = StubServer()
+        try:
+            with open(budgetFName) as f:
+                budgets = json.load(f)
+            for iterator, consumer in [("QueryArticlesIter", "struct"), ("QueryEventsIter", "jsonl"), ("QueryEventArticlesIter", "read")]:
+                name = getScenarioName(iterator, consumer)
+                small = runScenario(iterator, consumer, 200, server)
+                large = runScenario(iterator, consumer, 2000, server)
+                self.assertEqual(small["items"], 200)
+                self.assertEqual(large["items"], 2000)
+                self.assertTrue(large["peakMB"] > 0)
+                self.assertEqual(checkBudget(name, small, large, budgets[name]), [])
+        finally:
+            server.stop()
+
+
+    def testCheckBudget(self):
+        small = { "items": 100, "peakMB": 1.0 }
+        self.assertEqual(checkBudget("a", small, { "items": 1000, "peakMB": 1.5 }, { "peakMB": 2.0 }), [])
+        # the peak grows with the number of results
+        self.assertEqual(len(checkBudget("a", small, { "items": 1000, "peakMB": 2.5 }, { "peakMB": 3.0 })), 1)
+        self.assertEqual(len(checkBudget("a", small, { "items": 1000, "peakMB": 2.5 }, { "peakMB": 2.0 })), 2)
+
+
+    def testBudgetsCoverScenarios(self):
+        with open(budgetFName) as f:
+            budgets = json.load(f)
+        for iterator, consumer in getScenarios():
+            self.assertTrue("peakMB" in budgets[getScenarioName(iterator, consumer)])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBenchMemory)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,48 @@
+"""
+test the throughput benchmark and the regression check against the baselines
+"""
+import unittest, json
+from eventregistry.benchmarks.StubServer import StubServer
+from eventregistry.benchmarks.BenchThroughput import getScenarios, getScenarioName, measureScenario, checkRegression, baselineFName, getCodecs, measureDecoding
+
+
+class TestBenchThroughput(unittest.TestCase):
+
+    def testMeasureScenario(self):
+        server = StubServer().start()
+        try:
+            for scenario in [{ "iterator": "QueryArticlesIter", "pageSize": 25, "concurrency": 2, "payload": "full" },
+                             { "iterator": "QueryEventsIter", "pageSize": 50, "concurrency": 1, "payload": "minimal" }]:
+                result = measureScenario(scenario, server, 100)
+                self.assertEqual(result["items"], 100)
+                self.assertTrue(result["itemsPerSecond"] > 0)
+                self.assertTrue(result["peakRssMB"] > 0)
+            # 2 iterators with 2 pages of 25 articles each and 2 pages of 50 events
+            self.assertEqual(server.getStats()["endpoints"], { "/api/v1/article": 4, "/api/v1/event": 2 })
+        finally:
+            server.stop()
+
+
+    def testCheckRegression(self):
+        baseline = { "itemsPerSecond": 1000, "peakRssMB": 50 }
+        self.assertEqual(checkRegression("a", { "itemsPerSecond": 800, "peakRssMB": 60 }, baseline, 0.3), [])
+        self.assertEqual(len(checkRegression("a", { "itemsPerSecond": 600, "peakRssMB": 60 }, baseline, 0.3)), 1)
+        self.assertEqual(len(checkRegression("a", { "itemsPerSecond": 600, "peakRssMB": 70 }, baseline, 0.3)), 2)
+
+
+    def testBaselinesCoverScenarios(self):
+        with open(baselineFName) as f:
+            baselines = json.load(f)
+        for scenario in getScenarios():
+            self.assertTrue(getScenarioName(scenario) in baselines["results"])
+
+
+    def testDecoding(self):
+        self.assertEqual(getCodecs()[0][0], "json")
+        self.assertTrue(measureDecoding(json.loads, "default", seconds = 0.1) > 0)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBenchThroughput)
+    unittest.TextTestRunner(verbosity=3).run(suite)
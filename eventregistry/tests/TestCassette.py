@@ -0,0 +1,140 @@
+"""
+test recording the requests to a cassette and replaying them
+"""
+import unittest, os, time, datetime, shutil, tempfile, threading
+from eventregistry import *
+from eventregistry.benchmarks.StubServer import StubServer
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.tempDir, "test.cassette")
+        self.server = StubServer(articleCount = 250, eventCount = 60, latency = 0.02).start()
+
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tempDir)
+
+
+    def createER(self, transport, apiKey = "key", **kwargs):
+        return EventRegistry(apiKey = apiKey, host = self.server.host, minDelayBetweenRequests = 0, versionCheck = False, retryDelay = 0,
+            transport = transport, **kwargs)
+
+
+    def record(self, **kwargs):
+        """record the articles and events of the stub server. return the uris of the downloaded articles and events"""
+        transport = CassetteTransport(self.fileName, mode = "record")
+        er = self.createER(transport, **kwargs)
+        articleUris = [art["uri"] for art in QueryArticlesIter(keywords = "obama").execQuery(er)]
+        eventUris = [event["uri"] for event in QueryEventsIter(keywords = "obama").execQuery(er)]
+        transport.save()
+        transport.close()
+        return articleUris, eventUris
+
+
+    def testRecordAndReplay(self):
+        articleUris, eventUris = self.record()
+        self.assertEqual(len(articleUris), 250)
+        self.assertEqual(len(eventUris), 60)
+        requestCount = self.server.getStats()["requests"]
+        # 3 pages of articles and 2 pages of events
+        self.assertEqual(requestCount, 5)
+
+        transport = CassetteTransport(self.fileName)
+        self.assertEqual(transport.getMode(), "replay")
+        self.assertEqual(transport.getStats()["interactions"], 5)
+        # the api key and the host are not part of the fingerprint of the requests
+        er = self.createER(transport, apiKey = "otherKey")
+        er._host = "http://127.0.0.1:1"
+        self.assertEqual([art["uri"] for art in QueryArticlesIter(keywords = "obama").execQuery(er)], articleUris)
+        self.assertEqual([event["uri"] for event in QueryEventsIter(keywords = "obama").execQuery(er)], eventUris)
+        self.assertEqual(self.server.getStats()["requests"], requestCount)
+        self.assertEqual(er.getDailyAvailableRequests(), self.server.dailyTokens)
+        self.assertEqual(transport.getStats(), { "interactions": 5, "replayed": 5, "missed": 0 })
+
+
+    def testMissingRequest(self):
+        self.record()
+        transport = CassetteTransport(self.fileName, mode = "replay")
+        er = self.createER(transport)
+        # the request that was not recorded is not retried
+        self.assertRaises(Exception, er.execQuery, QueryArticles(keywords = "trump"))
+        self.assertEqual(transport.getStats()["missed"], 1)
+
+
+    def testRelativeDates(self):
+        recordDay = datetime.date(2026, 10, 19)
+        def lastWeekQuery(today):
+            return QueryArticles(keywords = "obama", dateStart = today - datetime.timedelta(days = 7), dateEnd = today)
+
+        transport = CassetteTransport(self.fileName, mode = "record")
+        transport._today = lambda: recordDay
+        er = self.createER(transport)
+        recorded = er.execQuery(lastWeekQuery(recordDay))
+        er.execQuery(QueryArticles(keywords = "obama", dateStart = "2014-04-16", dateEnd = "2014-04-17"))
+        transport.save()
+
+        # a week later the query for the last 7 days is still replayed
+        transport = CassetteTransport(self.fileName, mode = "replay")
+        transport._today = lambda: recordDay + datetime.timedelta(days = 7)
+        er = self.createER(transport)
+        self.assertEqual(er.execQuery(lastWeekQuery(recordDay + datetime.timedelta(days = 7))), recorded)
+        # the old (fixed) dates have to match exactly
+        er.execQuery(QueryArticles(keywords = "obama", dateStart = "2014-04-16", dateEnd = "2014-04-17"))
+        self.assertRaises(Exception, er.execQuery, QueryArticles(keywords = "obama", dateStart = "2014-04-23", dateEnd = "2014-04-24"))
+        self.assertEqual(transport.getStats(), { "interactions": 2, "replayed": 2, "missed": 1 })
+
+        # without the relative dates only the exact requests are replayed
+        transport = CassetteTransport(self.fileName, mode = "replay", relativeDates = False)
+        transport._today = lambda: recordDay + datetime.timedelta(days = 7)
+        er = self.createER(transport)
+        self.assertRaises(Exception, er.execQuery, lastWeekQuery(recordDay + datetime.timedelta(days = 7)))
+
+
+    def testCompressedRequests(self):
+        # the requests recorded with compressed bodies are replayed also when the bodies are not compressed
+        articleUris, eventUris = self.record(compression = RequestCompression(minSize = 0))
+        er = self.createER(CassetteTransport(self.fileName, mode = "replay"))
+        self.assertEqual([art["uri"] for art in QueryArticlesIter(keywords = "obama").execQuery(er)], articleUris)
+
+
+    def testReplayTiming(self):
+        self.server.latency = 0.2
+        self.record()
+        er = self.createER(CassetteTransport(self.fileName, mode = "replay", speed = 1))
+        # 3 pages of articles, each delayed by the recorded duration
+        startTime = time.time()
+        self.assertEqual(len(list(QueryArticlesIter(keywords = "obama").execQuery(er))), 250)
+        self.assertTrue(time.time() - startTime >= 0.6)
+
+        er = self.createER(CassetteTransport(self.fileName, mode = "replay"))
+        startTime = time.time()
+        self.assertEqual(len(list(QueryArticlesIter(keywords = "obama").execQuery(er))), 250)
+        self.assertTrue(time.time() - startTime < 0.3)
+
+
+    def testConcurrentReplay(self):
+        articleUris, eventUris = self.record()
+        transport = CassetteTransport(self.fileName, mode = "replay", speed = 10)
+        er = self.createER(transport, concurrency = AdaptiveConcurrencyLimiter(initialLimit = 4, minLimit = 4, maxLimit = 4))
+        results = []
+
+        def iterate():
+            results.append([art["uri"] for art in QueryArticlesIter(keywords = "obama").execQuery(er)])
+
+        threads = [threading.Thread(target = iterate) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [articleUris] * 4)
+        self.assertEqual(transport.getStats()["missed"], 0)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCassette)
+    unittest.TextTestRunner(verbosity=3).run(suite)
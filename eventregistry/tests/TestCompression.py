@@ -0,0 +1,90 @@
+"""
+test the compression of large request bodies
+"""
+import unittest
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, FakeResponse, createEventRegistry
+
+
+class UnsupportedSession(FakeSession):
+    """session that responds with 415 to all compressed requests"""
+    def __init__(self):
+        FakeSession.__init__(self, 10)
+        self.statusCodes = []
+
+    def post(self, url, json = None, data = None, headers = None, **kwargs):
+        resp = FakeSession.post(self, url, json = json, data = data, headers = headers, **kwargs)
+        if data is not None:
+            resp.status_code = 415
+        self.statusCodes.append(resp.status_code)
+        return resp
+
+
+class TestCompression(unittest.TestCase):
+
+    def getUris(self, count):
+        return ["%d" % (1000000000 + i) for i in range(count)]
+
+
+    def testSmallRequestNotCompressed(self):
+        session = FakeSession(10)
+        er = createEventRegistry(session, host = "http://host1", hostAnalytics = "http://host1", compression = True)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertFalse("Content-Encoding" in session.sentHeaders[0])
+        self.assertTrue("gzip" in session.sentHeaders[0]["Accept-Encoding"])
+        self.assertEqual(er.getCompression().getStats()["uncompressed"], 1)
+
+
+    def testLargeRequestCompressed(self):
+        session = FakeSession(10)
+        er = createEventRegistry(session, host = "http://host1", hostAnalytics = "http://host1", compression = True)
+        uris = self.getUris(2000)
+        er.execQuery(QueryArticles.initWithArticleUriList(uris))
+        self.assertEqual(session.sentHeaders[0]["Content-Encoding"], "gzip")
+        # the server receives the same parameters
+        self.assertEqual(session.sentParams[0]["articleUri"], uris)
+        stats = er.getCompression().getStats()
+        self.assertEqual(stats["compressed"], 1)
+        self.assertTrue(stats["compressedBytes"] < stats["originalBytes"] / 3)
+
+
+    def testDeflate(self):
+        session = FakeSession(10)
+        er = createEventRegistry(session, host = "http://host1", hostAnalytics = "http://host1", compression = RequestCompression(minSize = 100, method = "deflate"))
+        er.jsonRequestAnalytics("/api/v1/annotate", { "text": "Barack Obama visited Berlin. " * 20 })
+        self.assertEqual(session.sentHeaders[0]["Content-Encoding"], "deflate")
+        self.assertEqual(session.sentParams[0]["text"], "Barack Obama visited Berlin. " * 20)
+
+
+    def testUnsupportedHost(self):
+        session = UnsupportedSession()
+        er = createEventRegistry(session, host = "http://host1", hostAnalytics = "http://host1", compression = True)
+        q = QueryArticles.initWithArticleUriList(self.getUris(2000))
+        er.execQuery(q)
+        # the rejected compressed request is immediately repeated without compression
+        self.assertEqual(session.statusCodes, [415, 200])
+        self.assertFalse(er.getCompression().isSupported("http://host1"))
+        er.execQuery(q)
+        self.assertEqual(session.statusCodes, [415, 200, 200])
+        self.assertFalse("Content-Encoding" in session.sentHeaders[-1])
+
+
+    def testAcceptEncodingResponseHeader(self):
+        compression = RequestCompression()
+        compression.checkResponse("http://host1", FakeResponse({}, { "Accept-Encoding": "gzip, br" }), False)
+        compression.checkResponse("http://host2", FakeResponse({}, { "Accept-Encoding": "identity" }), False)
+        self.assertTrue(compression.isSupported("http://host1"))
+        self.assertFalse(compression.isSupported("http://host2"))
+        headers, data = compression.encodeBody("http://host2", { "articleUri": self.getUris(2000) })
+        self.assertEqual(data, None)
+
+
+    def testAcceptEncoding(self):
+        encodings = [enc.strip() for enc in getAcceptEncoding().split(",")]
+        self.assertEqual(encodings[:2], ["gzip", "deflate"])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCompression)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,154 @@
+"""
+test the adaptive limit of the number of parallel requests
+"""
+import unittest, time, threading
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class ParallelSession(FakeSession):
+    """session that records the max number of requests executed at the same time"""
+    def __init__(self, delay, statusCode = 200):
+        FakeSession.__init__(self, 10)
+        self.delay = delay
+        self.statusCode = statusCode
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, json = None, **kwargs):
+        with self.lock:
+            self.inFlight += 1
+            self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.inFlight -= 1
+            resp = FakeSession.post(self, url, json = json)
+        resp.status_code = self.statusCode
+        return resp
+
+
+class KeywordSession(FakeSession):
+    """session whose responses depend on the keyword of the query. The requests wait for each other so that they are executed in parallel"""
+    def __init__(self, parallel):
+        FakeSession.__init__(self, 10)
+        self.barrier = threading.Barrier(parallel, timeout = 5)
+
+    def post(self, url, json = None, **kwargs):
+        self.barrier.wait()
+        keyword = json["keyword"]
+        resp = FakeSession.post(self, url, json = json)
+        resp.headers = dict(self.headers, keyword = keyword)
+        if keyword.startswith("fail"):
+            resp.status_code = 530
+            resp.text = "invalid query %s" % (keyword)
+        return resp
+
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+
+    def runParallel(self, er, threadCount, requestsPerThread):
+        def run():
+            for i in range(requestsPerThread):
+                er.execQuery(QueryArticles(keywords = "obama"))
+        threads = [threading.Thread(target = run) for i in range(threadCount)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+    def testParallelRequests(self):
+        session = ParallelSession(0.05)
+        limiter = AdaptiveConcurrencyLimiter(initialLimit = 2, maxLimit = 4)
+        er = createEventRegistry(session, concurrency = limiter)
+        self.runParallel(er, 8, 5)
+        self.assertEqual(len(session.urls), 40)
+        self.assertTrue(session.maxInFlight > 1)
+        self.assertTrue(session.maxInFlight <= 4)
+        self.assertEqual(limiter.getLimit(), 4)
+        self.assertEqual(limiter.getInFlight(), 0)
+
+
+    def testParallelRequestsKeepOwnState(self):
+        session = KeywordSession(4)
+        er = createEventRegistry(session, concurrency = AdaptiveConcurrencyLimiter(initialLimit = 4, minLimit = 4, maxLimit = 4))
+        errors = {}
+
+        def run(keyword):
+            try:
+                er.execQuery(QueryArticles(keywords = keyword))
+            except Exception as ex:
+                errors[keyword] = str(ex)
+
+        threads = [threading.Thread(target = run, args = (keyword,)) for keyword in ["fail1", "fail2", "fail3", "ok"]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # each call raises the error of its own request
+        self.assertEqual(errors, { "fail1": "invalid query fail1", "fail2": "invalid query fail2", "fail3": "invalid query fail3" })
+        self.assertTrue(er.getLastHeader("keyword") in ["fail1", "fail2", "fail3", "ok"])
+        self.assertEqual(er.getRemainingAvailableRequests(), 900)
+
+
+    def testSingleRequestWithoutLimiter(self):
+        session = ParallelSession(0.02)
+        er = createEventRegistry(session)
+        self.runParallel(er, 4, 3)
+        self.assertEqual(session.maxInFlight, 1)
+
+
+    def testAdditiveIncrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initialLimit = 2, maxLimit = 10)
+        # the limit grows by about one after limit successful requests
+        for i in range(2):
+            limiter.reportResult(0.1, 200)
+        self.assertEqual(limiter.getLimit(), 2)
+        limiter.reportResult(0.1, 200)
+        self.assertEqual(limiter.getLimit(), 3)
+        for i in range(1000):
+            limiter.reportResult(0.1, 200)
+        self.assertEqual(limiter.getLimit(), 10)
+
+
+    def testMultiplicativeDecrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initialLimit = 8, maxLimit = 8)
+        limiter.reportResult(0.001, 429)
+        self.assertEqual(limiter.getLimit(), 4)
+        time.sleep(0.01)
+        limiter.reportResult(0.001, 503)
+        self.assertEqual(limiter.getLimit(), 2)
+        time.sleep(0.01)
+        limiter.reportResult(None, None)
+        self.assertEqual(limiter.getLimit(), 1)
+        # never below the minimum
+        time.sleep(0.01)
+        limiter.reportResult(0.001, 503)
+        self.assertEqual(limiter.getLimit(), 1)
+
+
+    def testLatencySpike(self):
+        limiter = AdaptiveConcurrencyLimiter(initialLimit = 8, maxLimit = 8, latencyTolerance = 2)
+        for i in range(10):
+            limiter.reportResult(0.01, 200)
+        time.sleep(0.02)
+        limiter.reportResult(0.5, 200)
+        self.assertEqual(limiter.getLimit(), 4)
+        self.assertEqual(limiter.getStats()["decreases"], 1)
+
+
+    def testOneDecreasePerRoundTrip(self):
+        limiter = AdaptiveConcurrencyLimiter(initialLimit = 8, maxLimit = 8)
+        limiter.reportResult(1, 200)
+        # many requests that were in flight report the overload at the same time
+        for i in range(5):
+            limiter.reportResult(1, 429)
+        self.assertEqual(limiter.getLimit(), 4)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestConcurrencyLimiter)
+    unittest.TextTestRunner(verbosity=3).run(suite)
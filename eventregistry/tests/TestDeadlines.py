@@ -0,0 +1,136 @@
+"""
+test timeouts, deadlines and cancellation of the requests
+"""
+import unittest, time, threading
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, FakeResponse, createEventRegistry
+
+
+class HangingSession(FakeSession):
+    """session where the requests fail after waiting for the timeout (or hang for hangTime seconds if there is no timeout)"""
+    def __init__(self, totalResults = 10, hangTime = 5):
+        FakeSession.__init__(self, totalResults)
+        self.hangTime = hangTime
+        self.timeouts = []
+
+    def post(self, url, json = None, timeout = None, **kwargs):
+        self.timeouts.append(timeout)
+        self.urls.append(url)
+        time.sleep(min(timeout or self.hangTime, self.hangTime))
+        raise Exception("Read timed out")
+
+
+class TestDeadlines(unittest.TestCase):
+
+    def testRequestTimeoutPassed(self):
+        session = FakeSession(10)
+        session.timeouts = []
+        origPost = session.post
+        def post(url, json = None, timeout = None, **kwargs):
+            session.timeouts.append(timeout)
+            return origPost(url, json = json)
+        session.post = post
+        er = createEventRegistry(session, requestTimeout = 20)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(session.timeouts, [20])
+
+
+    def testCallTimeout(self):
+        session = HangingSession(hangTime = 0.1)
+        er = createEventRegistry(session, callTimeout = 0.5, retryDelay = 10)
+        startTime = time.time()
+        self.assertRaises(RequestTimeoutError, er.execQuery, QueryArticles(keywords = "obama"))
+        # the retry delay is shortened so that the deadline is respected
+        self.assertTrue(time.time() - startTime < 1)
+
+
+    def testContextDeadlineLimitsAttemptTimeout(self):
+        session = HangingSession()
+        er = createEventRegistry(session, requestTimeout = 60, retryDelay = 0)
+        startTime = time.time()
+        with RequestContext(timeout = 0.3):
+            self.assertRaises(RequestTimeoutError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 1)
+        self.assertTrue(session.timeouts[0] <= 0.3)
+
+
+    def testDefaultRequestTimeout(self):
+        # a hung connection doesn't block the client indefinitely
+        er = createEventRegistry(FakeSession(10))
+        self.assertEqual(er._getAttemptTimeout(None), 60)
+
+
+    def testDeadlineWhileWaitingForLock(self):
+        self._checkDeadlineWhileWaiting()
+
+
+    def testDeadlineWhileWaitingForConcurrencyLimiter(self):
+        self._checkDeadlineWhileWaiting(concurrency = AdaptiveConcurrencyLimiter(initialLimit = 1, minLimit = 1, maxLimit = 1))
+
+
+    def _checkDeadlineWhileWaiting(self, **kwargs):
+        # the first request hangs without a timeout and holds the lock (or the only slot of the concurrency limiter)
+        session = HangingSession(hangTime = 1)
+        er = createEventRegistry(session, requestTimeout = None, repeatFailedRequestCount = 1, retryDelay = 0, **kwargs)
+        def hangingRequest():
+            try:
+                er.execQuery(QueryArticles(keywords = "obama"))
+            except Exception:
+                pass
+        thread = threading.Thread(target = hangingRequest)
+        thread.start()
+        time.sleep(0.1)
+        startTime = time.time()
+        with RequestContext(timeout = 0.2):
+            self.assertRaises(RequestTimeoutError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 0.6)
+        # the second request was never sent
+        self.assertEqual(len(session.urls), 1)
+        thread.join()
+
+
+    def testCancel(self):
+        session = HangingSession(hangTime = 0.05)
+        er = createEventRegistry(session, retryDelay = 30)
+        ctx = RequestContext()
+        threading.Timer(0.3, ctx.cancel).start()
+        startTime = time.time()
+        with ctx:
+            self.assertRaises(RequestCancelledError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 1)
+        # no further requests are made in the cancelled context
+        with ctx:
+            self.assertRaises(RequestCancelledError, er.execQuery, QueryArticles(keywords = "obama"))
+
+
+    def testNestedContext(self):
+        with RequestContext(timeout = 10) as outer:
+            with RequestContext(timeout = 100) as inner:
+                self.assertTrue(inner.getRemainingTime() <= 10)
+                outer.cancel()
+                self.assertTrue(inner.isCancelled())
+                self.assertRaises(RequestCancelledError, inner.checkActive)
+
+
+    def testIteratorUsesContext(self):
+        session = FakeSession(250)
+        origPost = session.post
+        def post(url, json = None, **kwargs):
+            resp = origPost(url, json = json)
+            data = resp.json()
+            data["articles"]["pages"] = 3
+            return FakeResponse(data, resp.headers)
+        session.post = post
+        er = createEventRegistry(session)
+        with RequestContext() as ctx:
+            it = QueryArticlesIter(keywords = "obama").execQuery(er)
+        next(it)
+        ctx.cancel()
+        self.assertRaises(RequestCancelledError, lambda: [art for art in it])
+        self.assertEqual(len(session.urls), 1)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestDeadlines)
+    unittest.TextTestRunner(verbosity=3).run(suite)
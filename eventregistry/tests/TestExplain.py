@@ -0,0 +1,58 @@
+"""
+test the estimates of the query costs made by EventRegistry.explain()
+"""
+import unittest
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestExplain(unittest.TestCase):
+
+    def testArticlesEstimate(self):
+        session = FakeSession(1050, tokens = "5", archive = "1")
+        er = createEventRegistry(session)
+        q = QueryArticlesIter(keywords = "obama")
+        est = er.explain(q)
+        self.assertEqual(est["totalResults"], 1050)
+        self.assertEqual(est["pages"], 11)
+        self.assertEqual(est["requests"], 11)
+        self.assertTrue(est["usesArchive"])
+        # cost learned from the probe request
+        self.assertEqual(est["tokensPerRequest"], 5)
+        self.assertEqual(est["tokens"], 55)
+        self.assertEqual(est["remainingAvailableRequests"], 900)
+        # the probe asks only for a single result and doesn't modify the query
+        self.assertEqual(session.sentParams[0]["articlesCount"], 1)
+        self.assertEqual(q.resultTypeList[0].articlesCount, 100)
+
+
+    def testLimitsAndSharding(self):
+        er = createEventRegistry(FakeSession(1050))
+        est = er.explain(QueryArticles(keywords = "obama"), maxItems = 500)
+        self.assertEqual(est["pages"], 5)
+        est = er.explain(QueryArticles(keywords = "obama"), shards = 4, pageSize = 100)
+        # each shard downloads 263 items in 3 pages
+        self.assertEqual(est["pages"], 12)
+
+
+    def testEventsEstimate(self):
+        er = createEventRegistry(FakeSession(120))
+        self.assertEqual(er.explain(QueryEventsIter(keywords = "obama"))["pages"], 3)
+        self.assertEqual(er.explain(QueryEventArticlesIter("eng-123"))["pages"], 2)
+
+
+    def testCostModel(self):
+        model = RequestCostModel(defaultTokensPerRequest = 1, defaultArchiveTokensPerRequest = 5)
+        self.assertEqual(model.estimateTokensPerRequest("/api/v1/article"), 1)
+        self.assertEqual(model.estimateTokensPerRequest("/api/v1/article", usedArchive = True), 5)
+        model.addObservation("/api/v1/article", "2")
+        model.addObservation("/api/v1/article", "4")
+        model.addObservation("/api/v1/article", None)
+        self.assertEqual(model.estimateTokensPerRequest("/api/v1/article"), 3)
+        self.assertEqual(model.estimateTokens("/api/v1/article", 10), 30)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestExplain)
+    unittest.TextTestRunner(verbosity=3).run(suite)
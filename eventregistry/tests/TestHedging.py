@@ -0,0 +1,101 @@
+"""
+test hedging of the slow requests
+"""
+import unittest, time, threading
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class SlowSession(FakeSession):
+    """session where the requests to the hosts in slowHosts take delay seconds"""
+    def __init__(self, slowHosts, delay):
+        FakeSession.__init__(self, 10)
+        self.slowHosts = slowHosts
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def post(self, url, json = None, **kwargs):
+        if any(url.startswith(host) for host in self.slowHosts):
+            time.sleep(self.delay)
+        with self.lock:
+            return FakeSession.post(self, url, json = json, **kwargs)
+
+
+class TestHedging(unittest.TestCase):
+
+    def createPolicy(self, **kwargs):
+        """return the hedge policy that already has enough latency samples to hedge the requests"""
+        policy = HedgePolicy(**kwargs)
+        for i in range(policy._minSamples):
+            policy.addLatency("/api/v1/article", 0.01)
+        return policy
+
+
+    def testHedgeWins(self):
+        session = SlowSession(["http://slow"], 0.5)
+        policy = self.createPolicy(maxHedgeFraction = 1, minSamples = 5)
+        er = createEventRegistry(session, host = ["http://slow", "http://fast"], hedging = policy)
+        # make sure the slow host is selected first
+        er.getHostPool().reportSuccess("http://fast", 1)
+        startTime = time.time()
+        res = er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 0.4)
+        self.assertEqual(res["articles"]["totalResults"], 10)
+        self.assertEqual(policy.getStats()["hedges"], 1)
+        self.assertEqual(policy.getStats()["hedgeWins"], 1)
+        self.assertEqual(session.urls, ["http://fast/api/v1/article"])
+
+
+    def testNoHedgeForFastRequests(self):
+        session = SlowSession([], 0)
+        policy = self.createPolicy(maxHedgeFraction = 1, minSamples = 5, minDelay = 0.2)
+        er = createEventRegistry(session, host = ["http://host1", "http://host2"], hedging = policy)
+        for i in range(5):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(policy.getStats()["hedges"], 0)
+        self.assertEqual(len(session.urls), 5)
+
+
+    def testHedgeCap(self):
+        session = SlowSession(["http://slow"], 0.1)
+        policy = self.createPolicy(percentile = 50, maxHedgeFraction = 0.5, minSamples = 20)
+        er = createEventRegistry(session, host = ["http://slow"], hedging = policy)
+        for i in range(6):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(policy.getStats()["requests"], 6)
+        self.assertEqual(policy.getStats()["hedges"], 3)
+
+
+    def testOnlyReadEndpointsHedged(self):
+        policy = HedgePolicy()
+        self.assertTrue(policy.isHedgeable("/api/v1/article"))
+        self.assertTrue(policy.isHedgeable("/api/v1/suggestConceptsFast"))
+        self.assertFalse(policy.isHedgeable("/api/v1/usage"))
+        self.assertFalse(policy.isHedgeable("/api/v1/trainTopic"))
+
+
+    def testNoHedgeWhenBudgetTight(self):
+        session = SlowSession(["http://slow"], 0.1)
+        policy = self.createPolicy(maxHedgeFraction = 1, minSamples = 5)
+        budget = TokenBudgetManager(resyncInterval = None, throttleDelay = 0)
+        budget.isTight = lambda: True
+        er = createEventRegistry(session, host = ["http://slow", "http://other"], hedging = policy, tokenBudget = budget)
+        er.getHostPool().reportSuccess("http://other", 1)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(policy.getStats()["hedges"], 0)
+
+
+    def testLatencyPercentile(self):
+        policy = HedgePolicy(percentile = 90, minSamples = 10, minDelay = 0)
+        for i in range(1, 11):
+            policy.addLatency("/api/v1/event", i / 10.0)
+        self.assertEqual(policy.getLatencyPercentile("/api/v1/event"), 1.0)
+        self.assertEqual(policy.getLatencyPercentile("/api/v1/event", 50), 0.6)
+        self.assertEqual(policy.getHedgeDelay("/api/v1/event"), 1.0)
+        self.assertEqual(policy.getHedgeDelay("/api/v1/article"), None)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestHedging)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,128 @@
+"""
+test balancing of the requests over multiple hosts and failover
+"""
+import unittest, time
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class HostSession(FakeSession):
+    """session where requests to the hosts in downHosts fail without a response and requests to errorHosts return a server error"""
+    def __init__(self, downHosts = None, errorHosts = None):
+        FakeSession.__init__(self, 10, pathResponses = { "/api/v1/getServiceStatus": { "status": "ok" } })
+        self.downHosts = downHosts or []
+        self.errorHosts = errorHosts or []
+
+    def post(self, url, json = None, **kwargs):
+        host = url[:url.index("/", len("http://"))] if url.count("/") > 2 else url
+        if host in self.downHosts:
+            self.urls.append(url)
+            raise Exception("Connection refused")
+        resp = FakeSession.post(self, url, json = json, **kwargs)
+        if host in self.errorHosts:
+            resp.status_code = 503
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.post(url, json = {})
+
+
+class TestHostPool(unittest.TestCase):
+
+    def testFailover(self):
+        session = HostSession(downHosts = ["http://host1"])
+        er = createEventRegistry(session, host = ["http://host1", "http://host2"], hostAnalytics = ["http://host1", "http://host2"], retryDelay = 0)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(session.urls, ["http://host1/api/v1/article", "http://host2/api/v1/article"])
+        stats = er.getHostPool().getHostStats()
+        self.assertEqual(stats["http://host1"]["failures"], 1)
+        self.assertEqual(stats["http://host2"]["failures"], 0)
+
+
+    def testServerErrorFailover(self):
+        session = HostSession(errorHosts = ["http://host1"])
+        er = createEventRegistry(session, host = ["http://host1", "http://host2"], hostAnalytics = ["http://host1", "http://host2"], retryDelay = 0)
+        er._repeatFailedRequestCount = 2
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(session.urls[-1], "http://host2/api/v1/article")
+        self.assertEqual(er.getHostPool().getHostStats("http://host1")["failures"], 1)
+
+
+    def testUnhealthyHostSkipped(self):
+        session = HostSession(downHosts = ["http://host1"])
+        er = createEventRegistry(session, host = ["http://host1", "http://host2"], hostAnalytics = ["http://host1", "http://host2"], retryDelay = 0)
+        # after failureThreshold consecutive failures the host is not used anymore
+        for i in range(3):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertFalse(er.getHostPool().isHealthy("http://host1"))
+        session.urls = []
+        for i in range(5):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(session.urls, ["http://host2/api/v1/article"] * 5)
+
+
+    def testLatencyBalancing(self):
+        pool = HostPool(["http://host1", "http://host2"])
+        # hosts with unknown latency are tried first
+        pool.reportSuccess("http://host1", 0.5)
+        self.assertEqual(pool.selectHost(), "http://host2")
+        pool.reportSuccess("http://host2", 0.1)
+        self.assertEqual(pool.selectHost(), "http://host2")
+        for i in range(10):
+            pool.reportSuccess("http://host2", 2)
+        self.assertEqual(pool.selectHost(), "http://host1")
+        self.assertEqual(pool.selectHost(exclude = ["http://host1"]), "http://host2")
+
+
+    def testProbeUnusedHost(self):
+        pool = HostPool(["http://host1", "http://host2"], probeInterval = 0.05)
+        pool.reportSuccess("http://host1", 2)
+        pool.reportSuccess("http://host2", 0.1)
+        self.assertEqual([pool.selectHost() for i in range(3)], ["http://host2"] * 3)
+        time.sleep(0.1)
+        # the slower host was not used for probeInterval seconds - it gets a single request to measure its latency
+        self.assertEqual([pool.selectHost() for i in range(3)], ["http://host1", "http://host2", "http://host2"])
+        # after the probes it becomes the preferred host if it got faster
+        for i in range(10):
+            pool.reportSuccess("http://host1", 0.01)
+        self.assertEqual(pool.selectHost(), "http://host1")
+        # without probing, the host with the lowest latency is always selected
+        pool = HostPool(["http://host1", "http://host2"], probeInterval = None)
+        pool.reportSuccess("http://host1", 2)
+        pool.reportSuccess("http://host2", 0.1)
+        time.sleep(0.1)
+        self.assertEqual(pool.selectHost(), "http://host2")
+
+
+    def testAllHostsDown(self):
+        pool = HostPool(["http://host1", "http://host2"], downInterval = 100)
+        pool.reportFailure("http://host1", markDown = True)
+        pool.reportFailure("http://host2", markDown = True)
+        self.assertFalse(pool.hasAlternative([]))
+        # the host that recovers first is still returned
+        self.assertEqual(pool.selectHost(), "http://host1")
+
+
+    def testActiveHealthCheck(self):
+        session = HostSession(downHosts = ["http://host2"])
+        er = createEventRegistry(session, host = ["http://host1", "http://host2"], hostAnalytics = ["http://host1", "http://host2"], retryDelay = 0)
+        er.checkHostHealth()
+        self.assertTrue(er.getHostPool().isHealthy("http://host1"))
+        self.assertFalse(er.getHostPool().isHealthy("http://host2"))
+        self.assertFalse(er.getHostAnalyticsPool().isHealthy("http://host2"))
+        self.assertTrue("http://host1/api/v1/getServiceStatus" in session.urls)
+
+
+    def testAnalyticsUsesOwnLock(self):
+        session = HostSession()
+        er = createEventRegistry(session, host = "http://host1", hostAnalytics = "http://host1", retryDelay = 0)
+        with er._lock:
+            # a search request in progress does not block the analytics requests
+            er.jsonRequestAnalytics("/api/v1/annotate", { "text": "test" })
+        self.assertEqual(session.urls, ["http://host1/api/v1/annotate"])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestHostPool)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,85 @@
+"""
+test the lazy importing of the package submodules
+"""
+import unittest, sys, subprocess, importlib, types, json
+import eventregistry
+from eventregistry.benchmarks.BenchImport import measureImport, checkBudget
+
+
+def runInFreshInterpreter(code):
+    """run the code in a new python interpreter and return the json value that it printed"""
+    out = subprocess.check_output([sys.executable, "-c", code])
+    return json.loads(out.decode("utf-8").strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def testImportDoesNotLoadSubmodules(self):
+        modules = runInFreshInterpreter("import sys, json, eventregistry; print(json.dumps(sorted(sys.modules)))")
+        self.assertFalse("requests" in modules)
+        self.assertFalse("six" in modules)
+        self.assertFalse("eventregistry.EventRegistry" in modules)
+        self.assertFalse("eventregistry.Base" in modules)
+
+
+    def testOnlyNeededSubmodulesLoaded(self):
+        modules = runInFreshInterpreter("import sys, json; from eventregistry import GetRecentArticles; print(json.dumps(sorted(sys.modules)))")
+        self.assertTrue("eventregistry.Recent" in modules)
+        self.assertFalse("eventregistry.EventRegistry" in modules)
+        self.assertFalse("requests" in modules)
+
+
+    def testStarImport(self):
+        names = runInFreshInterpreter("import json\nfrom eventregistry import *\nprint(json.dumps(sorted(n for n in dir() if not n.startswith('_'))))")
+        for name in ["EventRegistry", "QueryArticles", "QueryEventsIter", "ReturnInfo", "Analytics", "RequestContext", "allLangs"]:
+            self.assertTrue(name in names, name)
+        # the loggers and internal constants of the submodules are not exported
+        for name in ["logger", "invalidCharRe", "skippedHeaders", "defaultLatencyBuckets", "six", "re"]:
+            self.assertFalse(name in names, name)
+
+
+    def testStarImportKeepsCallerNames(self):
+        name = runInFreshInterpreter("import json, logging\nlogger = logging.getLogger('caller')\nfrom eventregistry import *\nprint(json.dumps(logger.name))")
+        self.assertEqual(name, "caller")
+
+
+    def testSubmoduleConstantsAvailable(self):
+        self.assertTrue(eventregistry.invalidCharRe is importlib.import_module("eventregistry.Base").invalidCharRe)
+        self.assertFalse("invalidCharRe" in eventregistry.__all__)
+
+
+    def testLazyNamesDefinedInModule(self):
+        for name, moduleName in eventregistry._lazyNames.items():
+            module = importlib.import_module("eventregistry." + moduleName)
+            self.assertTrue(name in vars(module), "%s is not defined in %s" % (name, moduleName))
+        for moduleName in eventregistry._submodules:
+            self.assertTrue(moduleName in eventregistry._lazyNames.values() or moduleName == "Query")
+
+
+    def testAllExportedNamesAreKnown(self):
+        # the classes and functions defined in the submodules have to be listed in _lazyNames, otherwise they are only available after __all__ is loaded
+        for moduleName in eventregistry._submodules:
+            module = importlib.import_module("eventregistry." + moduleName)
+            for name, value in vars(module).items():
+                if not name.startswith("_") and (isinstance(value, type) or isinstance(value, types.FunctionType)) and getattr(value, "__module__", None) == module.__name__:
+                    self.assertTrue(name in eventregistry._lazyNames, "%s from %s is missing in _lazyNames" % (name, moduleName))
+
+
+    def testClassesNotShadowedBySubmodules(self):
+        import eventregistry.EventRegistry
+        import eventregistry.QueryArticles
+        self.assertTrue(isinstance(eventregistry.EventRegistry, type))
+        self.assertTrue(isinstance(eventregistry.QueryArticles, type))
+        self.assertTrue("EventRegistry" in eventregistry.__all__)
+        self.assertTrue("Base" in eventregistry.__all__)
+
+
+    def testImportBudget(self):
+        measured = measureImport("import eventregistry", runs = 3)
+        self.assertEqual(checkBudget("import eventregistry", measured, { "modules": ["eventregistry", "eventregistry._version"], "forbiddenModules": ["requests"] }), [])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLazyImports)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,117 @@
+"""
+test that creating EventRegistry is fast - settings are loaded and the version is checked only when needed
+"""
+import unittest, os, json, time, tempfile, shutil
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, FakeResponse, createEventRegistry
+
+
+class VersionSession(FakeSession):
+    """session that returns the latest version of the module"""
+    def __init__(self, version):
+        FakeSession.__init__(self, 10)
+        self.version = version
+        self.getUrls = []
+
+    def get(self, url, **kwargs):
+        self.getUrls.append(url)
+        resp = FakeResponse({}, {})
+        resp.text = self.version
+        return resp
+
+
+class TestLazyStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+
+    def testSettingsLoadedLazily(self):
+        settFName = os.path.join(self.tmpDir, "settings.json")
+        er = EventRegistry(settingsFName = settFName, versionCheck = False)
+        # the file is created after the constructor - its values are still used
+        with open(settFName, "w") as f:
+            json.dump({ "apiKey": "keyFromFile", "host": "http://fromfile" }, f)
+        self.assertEqual(er._apiKey, "keyFromFile")
+        self.assertEqual(er.getHost(), "http://fromfile")
+        self.assertEqual(er.getHostPool().getHosts(), ["http://fromfile"])
+
+
+    def testUserProvidedValuesOverrideSettings(self):
+        settFName = os.path.join(self.tmpDir, "settings.json")
+        with open(settFName, "w") as f:
+            json.dump({ "apiKey": "keyFromFile", "host": "http://fromfile" }, f)
+        er = EventRegistry(apiKey = "myKey", host = "http://myhost", settingsFName = settFName, versionCheck = False)
+        self.assertEqual(er._apiKey, "myKey")
+        self.assertEqual(er.getHost(), "http://myhost")
+
+
+    def testInvalidSettingsDoNotBlock(self):
+        settFName = os.path.join(self.tmpDir, "settings.json")
+        with open(settFName, "w") as f:
+            f.write("{ invalid")
+        er = createEventRegistry(FakeSession(10), apiKey = None, settingsFName = settFName, scheduler = RequestScheduler(maxConcurrent = 1))
+        # the failed loading of the settings does not leave the lock or the scheduler slot taken
+        self.assertRaises(ValueError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertRaises(ValueError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertFalse(er._lock.locked())
+        self.assertEqual(er.getScheduler().getStats()["inFlight"], 0)
+        with open(settFName, "w") as f:
+            json.dump({ "apiKey": "keyFromFile" }, f)
+        self.assertEqual(er.execQuery(QueryArticles(keywords = "obama"))["articles"]["totalResults"], 10)
+
+
+    def testConstructorIsFast(self):
+        startTime = time.time()
+        for i in range(100):
+            EventRegistry(apiKey = "key")
+        self.assertTrue(time.time() - startTime < 1)
+
+
+    def testVersionCheckCached(self):
+        session = VersionSession("100.0.0")
+        er = createEventRegistry(session, host = "http://host1")
+        er._versionCacheFName = os.path.join(self.tmpDir, "version.json")
+        with self.assertLogs("eventregistry.EventRegistry", level = "WARNING") as logs:
+            er.checkVersion()
+        self.assertTrue("100.0.0" in logs.output[0])
+        self.assertEqual(session.getUrls, ["http://host1/static/pythonSDKVersion.txt"])
+        # the second check uses the cached version
+        self.assertEqual(er._getLatestVersion(), "100.0.0")
+        self.assertEqual(len(session.getUrls), 1)
+        # expired cache is refreshed
+        er._versionCheckTtl = 0
+        er._getLatestVersion()
+        self.assertEqual(len(session.getUrls), 2)
+
+
+    def testVersionCheckOnFirstRequest(self):
+        session = VersionSession("1.0")
+        er = createEventRegistry(session, host = "http://host1", versionCheck = True)
+        er._versionCacheFName = os.path.join(self.tmpDir, "version.json")
+        self.assertEqual(session.getUrls, [])
+        for i in range(3):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        for i in range(100):
+            if len(session.getUrls) > 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(session.getUrls, ["http://host1/static/pythonSDKVersion.txt"])
+
+
+    def testVersionCheckDisabled(self):
+        session = VersionSession("1.0")
+        er = createEventRegistry(session)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        time.sleep(0.05)
+        self.assertEqual(session.getUrls, [])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestLazyStartup)
+    unittest.TextTestRunner(verbosity=3).run(suite)
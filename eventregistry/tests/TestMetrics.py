@@ -0,0 +1,96 @@
+"""
+test the metrics of the requests
+"""
+import unittest
+from six.moves.urllib.request import urlopen
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestMetrics(unittest.TestCase):
+
+    def testRequestMetrics(self):
+        # 3 pages of results, where the first request fails with a server error
+        session = FakeSession(30, tokens = "2", archive = "1", pages = 3, failCount = 1, failStatus = 503)
+        er = createEventRegistry(session, retryDelay = 0, metrics = True)
+        metrics = er.getMetrics()
+        articles = list(QueryArticlesIter(keywords = "obama").execQuery(er))
+        self.assertEqual(len(articles), 3)
+        endpoint = "/api/v1/article"
+        self.assertEqual(metrics.getCounter("requests_total", endpoint = endpoint, status = "200"), 3)
+        self.assertEqual(metrics.getCounter("requests_total", endpoint = endpoint, status = "503"), 1)
+        self.assertEqual(metrics.getCounter("retries_total", endpoint = endpoint), 1)
+        self.assertEqual(metrics.getCounter("tokens_total", endpoint = endpoint), 8)
+        self.assertEqual(metrics.getCounter("archive_requests_total", endpoint = endpoint), 4)
+        self.assertTrue(metrics.getCounter("response_bytes_total", endpoint = endpoint) > 0)
+        self.assertEqual(metrics.getHistogram("request_duration_seconds", endpoint = endpoint).count, 4)
+        self.assertEqual(metrics.getHistogram("wait_seconds", reason = "lock").count, 3)
+        self.assertEqual(metrics.getCounter("iterator_pages_total", iterator = "QueryArticlesIter"), 3)
+        self.assertEqual(metrics.getCounter("iterator_items_total", iterator = "QueryArticlesIter"), 3)
+
+
+    def testPrometheusFormat(self):
+        er = createEventRegistry(FakeSession(10), retryDelay = 0, metrics = True, concurrency = True, scheduler = True)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        text = er.getMetrics().toPrometheus()
+        self.assertTrue('eventregistry_requests_total{endpoint="/api/v1/article",status="200"} 1\n' in text)
+        self.assertTrue('eventregistry_request_duration_seconds_bucket{endpoint="/api/v1/article",le="+Inf"} 1\n' in text)
+        self.assertTrue('eventregistry_request_duration_seconds_count{endpoint="/api/v1/article"} 1\n' in text)
+        self.assertTrue("eventregistry_remaining_tokens 900\n" in text)
+        self.assertTrue("eventregistry_concurrency_limit 2\n" in text)
+        self.assertEqual(text.count("# TYPE eventregistry_requests_total counter"), 1)
+
+
+    def testHistogram(self):
+        hist = Histogram([0.1, 1, 10])
+        for value in [0.05, 0.1, 0.5, 2, 20]:
+            hist.observe(value)
+        self.assertEqual(hist.counts, [2, 1, 1, 1])
+        self.assertEqual(hist.getPercentile(50), 1)
+        self.assertEqual(hist.getPercentile(100), float("inf"))
+
+
+    def testHttpServer(self):
+        metrics = MetricsRegistry()
+        metrics.recordRequest("/api/v1/event", 0.2, 200, 100, 1000, 1)
+        server = metrics.startHttpServer()
+        try:
+            text = urlopen("http://127.0.0.1:%d/metrics" % server.server_address[1]).read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertTrue('eventregistry_response_bytes_total{endpoint="/api/v1/event"} 1000' in text)
+        self.assertTrue('eventregistry_request_bytes_total{endpoint="/api/v1/event"} 100' in text)
+
+
+    def testPeriodicExport(self):
+        metrics = MetricsRegistry()
+        metrics.recordRetry("/api/v1/event")
+        exported = []
+        stop = metrics.startPeriodicExport(exported.append, interval = 0.01)
+        for i in range(100):
+            if len(exported) > 0:
+                break
+            stop.wait(0.01)
+        stop.set()
+        self.assertTrue('eventregistry_retries_total{endpoint="/api/v1/event"} 1' in exported[0])
+
+
+    def testPeriodicExportFailureLogged(self):
+        metrics = MetricsRegistry()
+        def fail(text):
+            raise IOError("disk full")
+        with self.assertLogs("eventregistry.Metrics", level = "WARNING") as logs:
+            stop = metrics.startPeriodicExport(fail, interval = 0.01)
+            for i in range(100):
+                if len(logs.output) > 0:
+                    break
+                stop.wait(0.01)
+            stop.set()
+        self.assertTrue("Failed to export the metrics: disk full" in logs.output[0])
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestMetrics)
+    unittest.TextTestRunner(verbosity=3).run(suite)
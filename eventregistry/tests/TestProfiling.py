@@ -0,0 +1,81 @@
+"""
+test the profiling of the phases of the requests
+"""
+import unittest, time, tracemalloc
+from unittest import mock
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestProfiling(unittest.TestCase):
+
+    def testIteratorProfile(self):
+        profiler = Profiler(sampleInterval = 0.002)
+        # 3 pages of results returned after a delay
+        session = FakeSession(30, pages = 3, delay = 0.05, results = [{ "uri": str(i), "body": "text " * 100 } for i in range(10)])
+        er = createEventRegistry(session, profiler = profiler)
+        for art in QueryArticlesIter(keywords = "obama").execQuery(er):
+            # the time spent consuming the results
+            time.sleep(0.005)
+        profiler.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        report = profiler.getReport()
+        phases = report["phases"]
+        for name in ["request", "decode"]:
+            self.assertEqual(phases[name]["calls"], 3)
+        # the requested result of each page is built before the query parameters
+        self.assertEqual(phases["params"]["calls"], 6)
+        self.assertTrue(phases["request"]["wallTime"] >= 0.15)
+        # most of the time the thread waits for the responses or consumes the results
+        self.assertTrue(phases["request"]["samples"] > 10)
+        self.assertTrue(phases["other"]["samples"] > 10)
+        self.assertTrue(phases["decode"]["allocatedBytes"] > 0)
+        self.assertEqual([page["page"] for page in report["pages"]], [1, 2, 3])
+        self.assertFalse("topAllocations" in report["pages"][0])
+        self.assertTrue(len(report["pages"][1]["topAllocations"]) > 0)
+        text = profiler.formatReport()
+        self.assertTrue("most sampled functions in phase 'request'" in text)
+        self.assertTrue("traced memory after 3 pages" in text)
+
+
+    def testWithoutMemoryTracing(self):
+        profiler = Profiler(traceMemory = False)
+        er = createEventRegistry(FakeSession(10), profiler = profiler)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        profiler.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        report = profiler.getReport()
+        self.assertEqual(report["phases"]["params"]["calls"], 1)
+        self.assertEqual(report["phases"]["decode"]["allocatedBytes"], 0)
+        self.assertEqual(report["pages"], [])
+
+
+    def testIteratorReturnInfoInParamsPhase(self):
+        profiler = Profiler(traceMemory = False)
+        er = createEventRegistry(FakeSession(30, pages = 3), profiler = profiler)
+        getParams = ReturnInfo.getParams
+        def slowGetParams(returnInfo, prefix):
+            time.sleep(0.02)
+            return getParams(returnInfo, prefix)
+        with mock.patch.object(ReturnInfo, "getParams", slowGetParams):
+            for art in QueryArticlesIter(keywords = "obama").execQuery(er, returnInfo = ReturnInfo()):
+                pass
+        profiler.stop()
+        # ReturnInfo.getParams() is called once for each of the 3 pages
+        self.assertTrue(profiler.getReport()["phases"]["params"]["wallTime"] >= 0.06)
+
+
+    def testNestedPhases(self):
+        profiler = Profiler(traceMemory = False)
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                time.sleep(0.01)
+        profiler.stop()
+        phases = profiler.getReport()["phases"]
+        self.assertTrue(phases["outer"]["wallTime"] >= phases["inner"]["wallTime"] >= 0.01)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestProfiling)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,77 @@
+"""
+test the fast paths used when building the queries and their parameters
+"""
+import unittest, pickle
+from eventregistry import *
+from eventregistry.Base import removeInvalidChars, invalidCharRe
+from eventregistry.benchmarks.BenchQuery import getCases
+
+
+class TestQueryConstruction(unittest.TestCase):
+
+    def testRemoveInvalidChars(self):
+        for text in ["Obama", "", "line\nbreak\ttab\r", "a\x00b\x0bc\x1fd\x7fe", "črška \x01", "".join(chr(c) for c in range(200))]:
+            self.assertEqual(removeInvalidChars(text), invalidCharRe.sub("", text))
+        q = QueryArticles(keywords = "Obama\x01 Trump\x0c")
+        self.assertEqual(q.queryParams["keyword"], "Obama\x01 Trump\x0c")
+        q._setVal("keyword", "Obama\x01 Trump\x0c")
+        self.assertEqual(q.queryParams["keyword"], "Obama Trump")
+
+
+    def testReturnInfoParamsCache(self):
+        returnInfo = ReturnInfo(articleInfo = ArticleInfoFlags(concepts = True, bodyLen = 100))
+        params = returnInfo.getParams()
+        self.assertEqual(params, { "includeArticleConcepts": True, "articleBodyLen": 100 })
+        # changing the returned dict does not change the cached parameters
+        params["includeArticleConcepts"] = False
+        self.assertEqual(returnInfo.getParams()["includeArticleConcepts"], True)
+        # the parameters are updated when the flags are replaced or changed
+        returnInfo.eventInfo = EventInfoFlags(stories = True)
+        self.assertEqual(returnInfo.getParams(), { "includeArticleConcepts": True, "articleBodyLen": 100, "includeEventStories": True })
+        returnInfo.articleInfo._setFlag("includeArticleLinks", True, False)
+        self.assertTrue(returnInfo.getParams()["includeArticleLinks"])
+        returnInfo.articleInfo._setVal("articleBodyLen", 5)
+        self.assertEqual(returnInfo.getParams()["articleBodyLen"], 5)
+        self.assertEqual(RequestArticlesInfo(returnInfo = returnInfo).__dict__["articleBodyLen"], 5)
+        # changing the dicts of the flags directly also updates the parameters
+        returnInfo.articleInfo.flags["includeArticleLinks"] = False
+        self.assertFalse(returnInfo.getParams()["includeArticleLinks"])
+        del returnInfo.articleInfo.vals["articleBodyLen"]
+        self.assertFalse("articleBodyLen" in returnInfo.getParams())
+        returnInfo.eventInfo.flags = { "includeEventSummary": True }
+        self.assertEqual(returnInfo.getParams()["includeEventSummary"], True)
+        self.assertFalse("includeEventStories" in returnInfo.getParams())
+
+
+    def testReturnInfoParamsCacheSharedFlags(self):
+        articleInfo = ArticleInfoFlags(concepts = True)
+        returnInfo1 = ReturnInfo(articleInfo = articleInfo)
+        returnInfo2 = ReturnInfo(articleInfo = articleInfo)
+        self.assertEqual(returnInfo1.getParams(), returnInfo2.getParams())
+        articleInfo.flags.update(includeArticleLinks = True)
+        # each ReturnInfo notices the change
+        self.assertTrue(returnInfo1.getParams()["includeArticleLinks"])
+        self.assertTrue(returnInfo2.getParams()["includeArticleLinks"])
+        # the flags can still be copied and pickled
+        copied = pickle.loads(pickle.dumps(returnInfo1))
+        copied.articleInfo.flags["includeArticleLinks"] = False
+        self.assertFalse(copied.getParams()["includeArticleLinks"])
+        self.assertTrue(returnInfo1.getParams()["includeArticleLinks"])
+
+
+    def testEncodeDate(self):
+        self.assertEqual(QueryParamsBase.encodeDate("2026-01-02"), "2026-01-02")
+        self.assertRaises(AssertionError, QueryParamsBase.encodeDate, "2026-1-2")
+        self.assertEqual(QueryParamsBase.encodeDateTime("2026-01-02T03:04:05.123"), "2026-01-02T03:04:05.123")
+        self.assertRaises(AssertionError, QueryParamsBase.encodeDateTime, "2026-01-02 03:04:05")
+
+
+    def testBenchmarkCases(self):
+        for name, func in getCases():
+            func()
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryConstruction)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,70 @@
+"""
+test that the equivalent forms of the same query have the same canonical form and fingerprint
+"""
+import unittest, json, datetime
+from eventregistry import *
+
+
+class TestQueryFingerprint(unittest.TestCase):
+
+    def testSameQueryDifferentForms(self):
+        q1 = QueryArticles(conceptUri = ["http://en.wikipedia.org/wiki/Obama", "http://en.wikipedia.org/wiki/Trump"], dateStart = datetime.date(2019, 1, 5))
+        q2 = QueryArticles(conceptUri = QueryItems.AND(["http://en.wikipedia.org/wiki/Trump", "http://en.wikipedia.org/wiki/Obama"]), dateStart = "2019-01-05")
+        self.assertEqual(canonicalizeQuery(q1), canonicalizeQuery(q2))
+        self.assertEqual(getQueryFingerprint(q1), getQueryFingerprint(q2))
+
+
+    def testDifferentQueries(self):
+        q1 = QueryArticles(conceptUri = QueryItems.AND(["a", "b"]))
+        q2 = QueryArticles(conceptUri = QueryItems.OR(["a", "b"]))
+        self.assertNotEqual(getQueryFingerprint(q1), getQueryFingerprint(q2))
+        # the same conditions but different endpoints
+        self.assertNotEqual(getQueryFingerprint(QueryArticles(keywords = "a")), getQueryFingerprint(QueryEvents(keywords = "a")))
+
+
+    def testResultTypeIsIncluded(self):
+        q1 = QueryArticles(keywords = "a", requestedResult = RequestArticlesInfo(page = 1))
+        q2 = QueryArticles(keywords = "a", requestedResult = RequestArticlesInfo(page = 2))
+        self.assertNotEqual(getQueryFingerprint(q1), getQueryFingerprint(q2))
+
+
+    def testSingleValueOperator(self):
+        q1 = QueryArticles(keywords = "trump")
+        q2 = QueryArticles(keywords = QueryItems.AND(["trump"]))
+        self.assertEqual(getQueryFingerprint(q1), getQueryFingerprint(q2))
+
+
+    def testComplexQueryForms(self):
+        cq = ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(keyword = "obama", dateStart = datetime.date(2019, 2, 1)),
+            BaseQuery(conceptUri = QueryItems.OR(["a", "b"]))]))
+        asDict = cq.getQuery()
+        asStr = json.dumps(asDict)
+        reordered = { "$query": { "$and": [
+            { "conceptUri": { "$or": ["b", "a"] } },
+            { "dateStart": "2019-02-01", "keywordLoc": "body", "keyword": "obama" }] } }
+        fingerprints = set([getQueryFingerprint(cq), getQueryFingerprint(asDict), getQueryFingerprint(asStr), getQueryFingerprint(reordered)])
+        self.assertEqual(len(fingerprints), 1)
+
+        q1 = QueryArticles.initWithComplexQuery(cq)
+        q2 = QueryArticlesIter.initWithComplexQuery(json.dumps(reordered))
+        self.assertEqual(canonicalizeQuery(q1), canonicalizeQuery(q2))
+
+
+    def testSingleConditionCombinedQuery(self):
+        cq1 = ComplexEventQuery(CombinedQuery.OR([BaseQuery(keyword = "obama")]))
+        cq2 = ComplexEventQuery(BaseQuery(keyword = "obama"))
+        self.assertEqual(getQueryFingerprint(cq1), getQueryFingerprint(cq2))
+
+
+    def testRequestFingerprint(self):
+        params1 = { "action": "getArticles", "lang": ["eng", "deu"], "apiKey": "123" }
+        params2 = { "lang": ["deu", "eng"], "action": "getArticles" }
+        self.assertEqual(getRequestFingerprint("/api/v1/article", params1), getRequestFingerprint("/api/v1/article", params2))
+        self.assertNotEqual(getRequestFingerprint("/api/v1/article", params1), getRequestFingerprint("/api/v1/event", params2))
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryFingerprint)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,103 @@
+"""
+test the rewriting of complex queries into simpler, equivalent queries
+"""
+import unittest
+from eventregistry import *
+
+
+class TestQueryOptimizer(unittest.TestCase):
+
+    def testFlattenAndMerge(self):
+        cq = ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(keyword = "obama"),
+            CombinedQuery.AND([
+                BaseQuery(keyword = "trump"),
+                BaseQuery(conceptUri = "http://en.wikipedia.org/wiki/Germany")])]))
+        optimizer = ComplexQueryOptimizer()
+        ret = optimizer.optimize(cq)
+        self.assertEqual(ret["$query"], {
+            "keyword": { "$and": ["obama", "trump"] },
+            "conceptUri": "http://en.wikipedia.org/wiki/Germany" })
+        self.assertFalse(optimizer.neverMatches())
+        self.assertTrue(len(optimizer.getChanges()) > 0)
+        # the original query is not modified
+        self.assertTrue("$and" in cq.getQuery()["$query"])
+
+
+    def testRemoveDuplicates(self):
+        cq = ComplexEventQuery(CombinedQuery.OR([
+            BaseQuery(conceptUri = "a", exclude = BaseQuery(lang = "eng")),
+            BaseQuery(conceptUri = "a", exclude = BaseQuery(lang = "eng")),
+            BaseQuery(categoryUri = "c")]))
+        ret = ComplexQueryOptimizer().optimize(cq)
+        self.assertEqual(len(ret["$query"]["$or"]), 2)
+
+
+    def testMergeOr(self):
+        cq = ComplexEventQuery(CombinedQuery.OR([
+            BaseQuery(sourceUri = "bbc.co.uk"),
+            BaseQuery(sourceUri = "apnews.com")],
+            exclude = BaseQuery(conceptUri = "obama")))
+        ret = ComplexQueryOptimizer().optimize(cq)
+        self.assertEqual(ret["$query"], {
+            "sourceUri": { "$or": ["bbc.co.uk", "apnews.com"] },
+            "$not": { "conceptUri": "obama" } })
+
+
+    def testFoldDates(self):
+        cq = ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(dateStart = "2017-02-05", dateEnd = "2017-03-01"),
+            BaseQuery(dateStart = "2017-02-01", dateEnd = "2017-02-06")]))
+        ret = ComplexQueryOptimizer().optimize(cq)
+        self.assertEqual(ret["$query"], { "dateStart": "2017-02-05", "dateEnd": "2017-02-06" })
+
+
+    def testKeywordLocPreventsMerge(self):
+        cq = ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(keyword = "obama", keywordLoc = "title"),
+            BaseQuery(keyword = "trump")]))
+        ret = ComplexQueryOptimizer().optimize(cq)
+        self.assertEqual(len(ret["$query"]["$and"]), 2)
+
+
+    def testNeverMatches(self):
+        optimizer = ComplexQueryOptimizer()
+        optimizer.optimize(ComplexArticleQuery(CombinedQuery.AND([
+            BaseQuery(dateStart = "2017-02-05"),
+            BaseQuery(dateEnd = "2017-02-01")])))
+        self.assertTrue(optimizer.neverMatches())
+
+        optimizer.optimize(ComplexArticleQuery(CombinedQuery.AND([BaseQuery(lang = "eng"), BaseQuery(lang = "deu")])))
+        self.assertTrue(optimizer.neverMatches())
+        # events can be reported in multiple languages
+        optimizer.optimize(ComplexEventQuery(CombinedQuery.AND([BaseQuery(lang = "eng"), BaseQuery(lang = "deu")])))
+        self.assertFalse(optimizer.neverMatches())
+
+        optimizer.optimize(ComplexArticleQuery(BaseQuery(keyword = "a", exclude = BaseQuery(keyword = "a"))))
+        self.assertTrue(optimizer.neverMatches())
+
+        optimizer.optimize(ComplexArticleQuery(BaseQuery(keyword = "a"), minSentiment = 0.5, maxSentiment = 0.2))
+        self.assertTrue(optimizer.neverMatches())
+
+
+    def testNeverMatchingConditionInOr(self):
+        optimizer = ComplexQueryOptimizer()
+        ret = optimizer.optimize(ComplexArticleQuery(CombinedQuery.OR([
+            BaseQuery(dateStart = "2017-02-05", dateEnd = "2017-02-01"),
+            BaseQuery(keyword = "trump")])))
+        self.assertFalse(optimizer.neverMatches())
+        self.assertEqual(ret["$query"], { "keyword": "trump" })
+
+
+    def testInitWithComplexQuery(self):
+        cq = ComplexArticleQuery(CombinedQuery.AND([BaseQuery(keyword = "obama"), BaseQuery(keyword = "obama")]))
+        q = QueryArticlesIter.initWithComplexQuery(cq, optimize = True)
+        self.assertEqual(canonicalizeQuery(q), canonicalizeQuery(QueryArticlesIter.initWithComplexQuery(ComplexArticleQuery(BaseQuery(keyword = "obama")))))
+        self.assertRaises(AssertionError, QueryArticles.initWithComplexQuery,
+            ComplexArticleQuery(BaseQuery(dateStart = "2017-02-05", dateEnd = "2017-02-01")), optimize = True)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestQueryOptimizer)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,84 @@
+"""
+test decoding the returned articles and events to records
+"""
+import unittest, json, copy, pickle
+from eventregistry import *
+from eventregistry.benchmarks.StubServer import SyntheticData
+
+
+class TestRecords(unittest.TestCase):
+
+    def setUp(self):
+        data = SyntheticData()
+        fullInfo = ReturnInfo(articleInfo = ArticleInfoFlags(concepts = True, categories = True, location = True, links = True),
+            eventInfo = EventInfoFlags(stories = True, imageCount = 2))
+        self.articles = [json.loads(art) for art in data.encodeArticles(0, 10, fullInfo.getParams("articles"))]
+        self.minimalArticles = [json.loads(art) for art in data.encodeArticles(0, 10, ReturnInfo(articleInfo = ArticleInfoFlags(bodyLen = 0, concepts = False)).getParams("articles"))]
+        self.events = [json.loads(event) for event in data.encodeEvents(0, 10, fullInfo.getParams("events"))]
+
+
+    def testArticle(self):
+        art = Article(self.articles[0])
+        self.assertEqual(art.uri, self.articles[0]["uri"])
+        self.assertEqual(art.title, self.articles[0]["title"])
+        self.assertTrue(isinstance(art.source, Source))
+        self.assertEqual(art.source.uri, self.articles[0]["source"]["uri"])
+        self.assertTrue(all(isinstance(concept, Concept) for concept in art.concepts))
+        self.assertEqual(art.toDict(), self.articles[0])
+        self.assertFalse(hasattr(art, "__dict__"))
+        # the properties that were not requested are missing
+        minimal = Article(self.minimalArticles[0])
+        self.assertFalse(minimal.has("concepts"))
+        self.assertFalse(hasattr(minimal, "concepts"))
+        self.assertEqual(minimal.get("concepts", []), [])
+        self.assertRaises(AttributeError, getattr, minimal, "concepts")
+
+
+    def testEvent(self):
+        event = Event(self.events[0])
+        self.assertEqual(event.uri, self.events[0]["uri"])
+        self.assertEqual(event.title, self.events[0]["title"])
+        self.assertTrue(all(isinstance(concept, Concept) for concept in event.concepts))
+        self.assertEqual(event.toDict(), self.events[0])
+
+
+    def testOverflow(self):
+        data = { "uri": "123", "newProperty": { "a": 1 }, "source": { "uri": "bbc.co.uk", "rank": 5 }, "location": { "type": "place", "country": { "type": "country", "code": "GB" } } }
+        art = Article(data)
+        self.assertEqual(art.newProperty, { "a": 1 })
+        self.assertEqual(art.getExtra(), { "newProperty": { "a": 1 } })
+        self.assertEqual(art.source.rank, 5)
+        self.assertEqual(art.location.country.code, "GB")
+        self.assertTrue(art.has("newProperty"))
+        self.assertEqual(art.toDict(), data)
+        self.assertEqual(Source({ "uri": "bbc.co.uk" }).getExtra(), {})
+
+
+    def testDecoder(self):
+        response = { "articles": { "page": 1, "pages": 1, "totalResults": 10, "results": self.articles },
+            "eng-123": { "articles": { "results": self.articles[:2] } } }
+        decoder = RecordDecoder()
+        for content in [response, json.dumps(response), json.dumps(response).encode("utf-8")]:
+            res = decoder.decode(content)
+            self.assertEqual(res["articles"]["totalResults"], 10)
+            self.assertEqual([art.uri for art in res["articles"]["results"]], [art["uri"] for art in self.articles])
+            self.assertTrue(isinstance(res["eng-123"]["articles"]["results"][1], Article))
+        # the response is not changed
+        self.assertTrue(isinstance(response["articles"]["results"][0], dict))
+        events = RecordDecoder(loads = json.loads).decodeEvents(json.dumps({ "events": { "results": self.events } }))
+        self.assertEqual([event.uri for event in events], [event["uri"] for event in self.events])
+        self.assertEqual([art.uri for art in decoder.iterate(iter(self.articles))], [art["uri"] for art in self.articles])
+        self.assertTrue(isinstance(list(decoder.iterate(self.events, Event))[0], Event))
+
+
+    def testCopyAndPickle(self):
+        art = Article(self.articles[0])
+        self.assertEqual(pickle.loads(pickle.dumps(art)), art)
+        self.assertEqual(copy.deepcopy(art), art)
+        self.assertNotEqual(Article(self.articles[1]), art)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRecords)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,140 @@
+"""
+test the structured request log
+"""
+import unittest, os, sys, json, gzip, time, shutil, tempfile, subprocess
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestRequestLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+
+    def readEntries(self, fileName):
+        with open(fileName) as f:
+            return [json.loads(line) for line in f]
+
+
+    def testLogRequests(self):
+        fileName = os.path.join(self.dirName, "log", "requests.jsonl")
+        er = createEventRegistry(FakeSession(10, tokens = "5", archive = "1"), host = "http://host1", retryDelay = 0, logging = fileName)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertTrue(er.getRequestLog().flush(5))
+        entries = self.readEntries(fileName)
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry["endpoint"], "/api/v1/article")
+        self.assertEqual(entry["host"], "http://host1")
+        self.assertEqual(entry["status"], 200)
+        self.assertEqual(entry["tokens"], "5")
+        self.assertEqual(entry["archive"], "1")
+        self.assertTrue(entry["responseBytes"] > 0)
+        self.assertTrue(entry["duration"] >= 0)
+        self.assertEqual(entry["params"]["keyword"], "obama")
+        # the api key is not written to the log
+        self.assertFalse("apiKey" in entry["params"])
+
+
+    def testLogFailedAttempts(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        # the first request fails without a response
+        er = createEventRegistry(FakeSession(10, failCount = 1), host = "http://host1", retryDelay = 0, logging = RequestLog(fileName, logParams = False))
+        er.execQuery(QueryArticles(keywords = "obama"))
+        er.getRequestLog().flush(5)
+        entries = self.readEntries(fileName)
+        self.assertEqual([entry["attempt"] for entry in entries], [1, 2])
+        self.assertEqual(entries[0]["error"], "Connection refused")
+        self.assertFalse("status" in entries[0])
+        self.assertEqual(entries[1]["status"], 200)
+        self.assertFalse("params" in entries[1])
+
+
+    def testCustomLogFName(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        customFileName = os.path.join(self.dirName, "custom.jsonl")
+        er = createEventRegistry(FakeSession(10), host = "http://host1", retryDelay = 0, logging = fileName)
+        er.jsonRequest("/api/v1/article", { "keyword": "obama" }, customLogFName = customFileName)
+        er._getRequestLog(customFileName).flush(5)
+        self.assertEqual(len(self.readEntries(customFileName)), 1)
+        self.assertFalse(os.path.exists(fileName))
+
+
+    def testSizeRotation(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        log = RequestLog(fileName, maxBytes = 300, backupCount = 2)
+        for i in range(20):
+            log.log("/api/v1/article", "http://host1", { "keyword": "obama %d" % i })
+            log.flush(5)
+        self.assertTrue(log.getStats()["rotations"] > 2)
+        self.assertEqual(log.getStats()["written"], 20)
+        self.assertEqual(sorted(os.listdir(self.dirName)), ["requests.jsonl", "requests.jsonl.1.gz", "requests.jsonl.2.gz"])
+        with gzip.open(fileName + ".1.gz", "rt") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertTrue(len(entries) > 0)
+        self.assertEqual(entries[0]["endpoint"], "/api/v1/article")
+
+
+    def testTimeRotation(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        log = RequestLog(fileName, maxBytes = None, maxAge = 0.05, compress = False)
+        log.log("/api/v1/article")
+        log.flush(5)
+        time.sleep(0.1)
+        log.log("/api/v1/event")
+        log.flush(5)
+        self.assertEqual(self.readEntries(fileName + ".1")[0]["endpoint"], "/api/v1/article")
+        self.assertEqual(self.readEntries(fileName)[0]["endpoint"], "/api/v1/event")
+
+
+    def testWriteFailureLogged(self):
+        fileName = os.path.join(self.dirName, "file")
+        open(fileName, "w").close()
+        # the directory of the log can't be created since a file with the same name exists
+        log = RequestLog(os.path.join(fileName, "requests.jsonl"))
+        with self.assertLogs("eventregistry.RequestLog", level = "WARNING") as logs:
+            log.log("/api/v1/article")
+            log.flush(5)
+        self.assertTrue("Failed to write the request log" in logs.output[0])
+
+
+    def testEntriesWrittenAtExit(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        code = "from eventregistry import RequestLog\nlog = RequestLog(%r, flushInterval = 60)\nfor i in range(5):\n    log.log('/api/v1/article', attempt = i + 1)\n" % (fileName)
+        subprocess.check_call([sys.executable, "-c", code])
+        self.assertEqual([entry["attempt"] for entry in self.readEntries(fileName)], [1, 2, 3, 4, 5])
+
+
+    def testClose(self):
+        fileName = os.path.join(self.dirName, "requests.jsonl")
+        log = RequestLog(fileName, flushInterval = 60)
+        log.log("/api/v1/article")
+        self.assertTrue(log.close(5))
+        self.assertEqual(len(self.readEntries(fileName)), 1)
+        # logging after closing opens the file again
+        log.log("/api/v1/event")
+        log.close(5)
+        self.assertEqual(len(self.readEntries(fileName)), 2)
+
+
+    def testLoggingIsCheap(self):
+        log = RequestLog(os.path.join(self.dirName, "requests.jsonl"))
+        params = { "keyword": "obama", "articlesPage": 1, "articlesCount": 100 }
+        startTime = time.time()
+        for i in range(10000):
+            log.log("/api/v1/article", "http://host1", params, startTime, 0.1)
+        # logging only adds the entry to the queue - the file is written in the background
+        self.assertTrue((time.time() - startTime) / 10000 < 0.0002)
+        log.flush(10)
+        self.assertEqual(log.getStats()["written"], 10000)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRequestLog)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,113 @@
+"""
+test the prioritized fair scheduling of the requests
+"""
+import unittest, time, threading
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def getServeOrder(self, scheduler, requests):
+        """
+        enqueue the requests (list of (name, priority, tenantId)) while the only slot is taken and return the order in which they were served
+        """
+        order = []
+        orderLock = threading.Lock()
+        def run(name, priority, tenantId):
+            with RequestContext(priority = priority, tenantId = tenantId):
+                scheduler.acquire()
+                with orderLock:
+                    order.append(name)
+                scheduler.release()
+        scheduler.acquire()
+        threads = []
+        for (name, priority, tenantId) in requests:
+            t = threading.Thread(target = run, args = (name, priority, tenantId))
+            t.start()
+            threads.append(t)
+            # make sure the requests are enqueued in the given order
+            while scheduler.getQueueDepth() < len(threads):
+                time.sleep(0.001)
+        scheduler.release()
+        for t in threads:
+            t.join()
+        return order
+
+
+    def testPriority(self):
+        scheduler = RequestScheduler()
+        order = self.getServeOrder(scheduler, [("b1", "backfill", None), ("b2", "backfill", None), ("f1", "feed", None), ("i1", "interactive", None)])
+        self.assertEqual(order, ["i1", "f1", "b1", "b2"])
+
+
+    def testFairQueuingAcrossTenants(self):
+        scheduler = RequestScheduler()
+        requests = [("a%d" % i, "feed", "teamA") for i in range(4)] + [("b%d" % i, "feed", "teamB") for i in range(2)]
+        order = self.getServeOrder(scheduler, requests)
+        # the requests of teamB don't have to wait for all requests of teamA
+        self.assertEqual(order, ["a0", "b0", "a1", "b1", "a2", "a3"])
+
+
+    def testTenantWeights(self):
+        scheduler = RequestScheduler(tenantWeights = { "teamA": 2 })
+        requests = [("a%d" % i, "feed", "teamA") for i in range(4)] + [("b%d" % i, "feed", "teamB") for i in range(2)]
+        order = self.getServeOrder(scheduler, requests)
+        self.assertEqual(order, ["a0", "a1", "b0", "a2", "a3", "b1"])
+
+
+    def testAging(self):
+        scheduler = RequestScheduler(agingInterval = 0.001)
+        scheduler.acquire()
+        order = []
+        def run(name, priority):
+            with RequestContext(priority = priority):
+                scheduler.acquire()
+                order.append(name)
+                scheduler.release()
+        t1 = threading.Thread(target = run, args = ("b1", "backfill"))
+        t1.start()
+        # the backfill request waits long enough to get ahead of the new interactive request
+        time.sleep(0.1)
+        t2 = threading.Thread(target = run, args = ("i1", "interactive"))
+        t2.start()
+        while scheduler.getQueueDepth() < 2:
+            time.sleep(0.001)
+        scheduler.release()
+        t1.join()
+        t2.join()
+        self.assertEqual(order, ["b1", "i1"])
+
+
+    def testStats(self):
+        scheduler = RequestScheduler()
+        self.getServeOrder(scheduler, [("b1", "backfill", "teamA"), ("i1", "interactive", "teamB")])
+        stats = scheduler.getStats()
+        self.assertEqual(stats["inFlight"], 0)
+        self.assertEqual(stats["queueDepth"], {})
+        self.assertEqual(stats["waitTimes"]["backfill"]["served"], 1)
+        self.assertTrue(stats["waitTimes"]["backfill"]["maxWait"] >= stats["waitTimes"]["interactive"]["maxWait"])
+
+
+    def testDeadlineWhileWaiting(self):
+        scheduler = RequestScheduler()
+        scheduler.acquire()
+        self.assertRaises(RequestTimeoutError, scheduler.acquire, time.time() + 0.05)
+        self.assertEqual(scheduler.getQueueDepth(), 0)
+        scheduler.release()
+
+
+    def testEventRegistryUsesScheduler(self):
+        session = FakeSession(10)
+        er = createEventRegistry(session, scheduler = True)
+        with RequestContext(priority = "interactive", tenantId = "teamA"):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        stats = er.getScheduler().getStats()
+        self.assertEqual(stats["waitTimes"]["interactive"]["served"], 1)
+        self.assertEqual(stats["inFlight"], 0)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestRequestScheduler)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,92 @@
+"""
+test the Struct view of the returned dicts
+"""
+import unittest, copy, pickle
+from eventregistry import *
+
+
+class TestStruct(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            "uri": "123",
+            "title": "Title",
+            "authors": ["a", "b"],
+            "source": { "uri": "bbc.co.uk", "location": { "label": { "eng": "London" } } },
+            "concepts": [{ "uri": "c1", "score": 5 }, { "uri": "c2", "score": 3 }],
+            "nested": [[{ "x": 1 }]]
+        }
+
+
+    def testAttributes(self):
+        obj = createStructFromDict(self.data)
+        self.assertEqual(obj.title, "Title")
+        self.assertEqual(obj.source.location.label.eng, "London")
+        self.assertEqual([c.uri for c in obj.concepts], ["c1", "c2"])
+        self.assertEqual(obj.nested[0][0].x, 1)
+        self.assertTrue(obj.has("source"))
+        self.assertTrue(obj.source.has("uri"))
+        self.assertFalse(obj.has("image"))
+        self.assertFalse(hasattr(obj, "image"))
+        self.assertRaises(AttributeError, getattr, obj, "image")
+        self.assertTrue("concepts" in dir(obj))
+
+
+    def testNoCopy(self):
+        obj = createStructFromDict(self.data)
+        # the values are not copied
+        self.assertTrue(obj.authors is self.data["authors"])
+        self.assertTrue(obj.source.toDict() is self.data["source"])
+        self.assertTrue(obj.concepts[1].toDict() is self.data["concepts"][1])
+        self.assertFalse(hasattr(obj, "__dict__"))
+        # changes are made in the dict
+        obj.sentiment = 0.5
+        obj.source.uri = "cnn.com"
+        del obj.nested
+        self.assertEqual(self.data["sentiment"], 0.5)
+        self.assertEqual(self.data["source"]["uri"], "cnn.com")
+        self.assertFalse("nested" in self.data)
+
+
+    def testMutateList(self):
+        obj = createStructFromDict(self.data)
+        concepts = obj.concepts
+        self.assertTrue(isinstance(concepts, StructList))
+        self.assertTrue(concepts.toList() is self.data["concepts"])
+        # changes made through the list attribute are made in the dict
+        obj.concepts.append({ "uri": "c3", "score": 1 })
+        obj.concepts[0].score = 10
+        obj.concepts[1] = createStructFromDict({ "uri": "c4" })
+        obj.concepts.insert(0, { "uri": "c0" })
+        del obj.concepts[-1]
+        obj.nested[0].append({ "x": 2 })
+        self.assertEqual(self.data["concepts"], [{ "uri": "c0" }, { "uri": "c1", "score": 10 }, { "uri": "c4" }])
+        self.assertEqual(self.data["nested"], [[{ "x": 1 }, { "x": 2 }]])
+        self.assertEqual([c.uri for c in obj.concepts[1:]], ["c1", "c4"])
+        self.assertEqual(len(obj.concepts), 3)
+        self.assertTrue({ "uri": "c4" } in obj.concepts)
+        self.assertEqual(obj.concepts.index({ "uri": "c4" }), 2)
+        self.assertEqual(obj.concepts, self.data["concepts"])
+        # the items are wrapped when accessed, the struct set as a value is stored as its dict
+        obj.source = createStructFromDict({ "uri": "cnn.com" })
+        self.assertEqual(self.data["source"], { "uri": "cnn.com" })
+
+
+    def testList(self):
+        objs = createStructFromDict([self.data, { "uri": "456" }])
+        self.assertEqual([obj.uri for obj in objs], ["123", "456"])
+
+
+    def testCopyAndPickle(self):
+        obj = createStructFromDict(self.data)
+        self.assertEqual(copy.deepcopy(obj).source.location.label.eng, "London")
+        self.assertEqual(copy.copy(obj).title, "Title")
+        self.assertEqual(pickle.loads(pickle.dumps(obj)).concepts[0].score, 5)
+        self.assertEqual(pickle.loads(pickle.dumps(obj.concepts))[1].uri, "c2")
+        self.assertEqual(copy.deepcopy(obj.concepts)[0].uri, "c1")
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestStruct)
+    unittest.TextTestRunner(verbosity=3).run(suite)
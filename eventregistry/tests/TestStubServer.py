@@ -0,0 +1,152 @@
+"""
+test the client against the local stub server
+"""
+import unittest, os, time, shutil, tempfile, threading
+from eventregistry import *
+from eventregistry.benchmarks.StubServer import StubServer, SyntheticData, lognormalLatency
+
+
+class TestStubServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(articleCount = 250, eventCount = 120, eventArticleCount = 130).start()
+        self.er = EventRegistry(apiKey = "key", host = self.server.host, hostAnalytics = self.server.host,
+            minDelayBetweenRequests = 0, versionCheck = False, retryDelay = 0)
+
+
+    def tearDown(self):
+        self.server.stop()
+
+
+    def testArticlePaging(self):
+        arts = list(QueryArticlesIter(keywords = "obama").execQuery(self.er))
+        self.assertEqual(len(arts), 250)
+        self.assertEqual(len(set(art["uri"] for art in arts)), 250)
+        self.assertEqual(self.server.getStats()["endpoints"]["/api/v1/article"], 3)
+        # a page after the last one is empty
+        res = self.er.execQuery(QueryArticles(keywords = "obama", requestedResult = RequestArticlesInfo(page = 4)))
+        self.assertEqual(res["articles"]["pages"], 3)
+        self.assertEqual(res["articles"]["results"], [])
+
+
+    def testRequestedParts(self):
+        art = list(QueryArticlesIter(keywords = "obama").execQuery(self.er, maxItems = 1))[0]
+        self.assertTrue("body" in art and "title" in art and "source" in art)
+        self.assertFalse("concepts" in art)
+        art = list(QueryArticlesIter(keywords = "obama").execQuery(self.er, maxItems = 1,
+            returnInfo = ReturnInfo(articleInfo = ArticleInfoFlags(bodyLen = 10, concepts = True))))[0]
+        self.assertEqual(len(art["body"]), 10)
+        self.assertEqual(len(art["concepts"]), 10)
+
+
+    def testEvents(self):
+        events = list(QueryEventsIter(keywords = "obama").execQuery(self.er))
+        self.assertEqual(len(events), 120)
+        self.assertEqual(self.server.getStats()["endpoints"]["/api/v1/event"], 3)
+        arts = list(QueryEventArticlesIter(events[0]["uri"]).execQuery(self.er))
+        self.assertEqual(len(arts), 130)
+        res = self.er.execQuery(QueryEvent(events[0]["uri"]))
+        self.assertEqual(res[events[0]["uri"]]["info"]["title"], events[0]["title"])
+
+
+    def testOtherEndpoints(self):
+        self.assertEqual(len(self.er.suggestConcepts("oba", count = 5)), 5)
+        self.assertTrue(self.er.getConceptUri("obama").startswith("http://en.wikipedia.org/wiki/"))
+        self.assertEqual(len(self.er.execQuery(GetCounts("x", dateStart = "2026-01-01", dateEnd = "2026-01-10"))["x"]), 10)
+        # the minute stream returns new articles on each call
+        first = GetRecentArticles(self.er).getUpdates()
+        second = GetRecentArticles(self.er).getUpdates()
+        self.assertEqual(len(first), 100)
+        self.assertTrue(set(art["uri"] for art in first).isdisjoint(set(art["uri"] for art in second)))
+        self.assertTrue(len(Analytics(self.er).annotate("Barack Obama")["annotations"]) > 0)
+
+
+    def testSyntheticDataIsDeterministic(self):
+        self.assertEqual(SyntheticData(seed = 3).getArticle(7), SyntheticData(seed = 3).getArticle(7))
+        self.assertNotEqual(SyntheticData(seed = 3).getArticle(7)["body"], SyntheticData(seed = 4).getArticle(7)["body"])
+        self.assertEqual(SyntheticData().getArticle(12)["uri"], SyntheticData().getArticleUri(12))
+
+
+
+class TestStubServerFaults(unittest.TestCase):
+
+    def createClient(self, server, **kwargs):
+        return EventRegistry(apiKey = "key", host = server.host, minDelayBetweenRequests = 0, versionCheck = False, retryDelay = 0, **kwargs)
+
+
+    def testErrorsAreRepeated(self):
+        server = StubServer(articleCount = 500, errorRate = 0.4, dropRate = 0.2, seed = 1).start()
+        try:
+            arts = list(QueryArticlesIter(keywords = "obama").execQuery(self.createClient(server)))
+            stats = server.getStats()
+        finally:
+            server.stop()
+        self.assertEqual(len(arts), 500)
+        self.assertEqual(stats["statuses"][200], 5)
+        self.assertTrue(stats["statuses"].get(503, 0) > 0)
+        self.assertTrue(stats["dropped"] > 0)
+
+
+    def testMalformedJson(self):
+        # the client stores the invalid response in the current directory
+        cwd = os.getcwd()
+        tmpDir = tempfile.mkdtemp()
+        os.chdir(tmpDir)
+        server = StubServer(articleCount = 500, malformedRate = 0.5, seed = 2).start()
+        try:
+            arts = list(QueryArticlesIter(keywords = "obama").execQuery(self.createClient(server)))
+            stats = server.getStats()
+        finally:
+            server.stop()
+            os.chdir(cwd)
+            shutil.rmtree(tmpDir)
+        self.assertEqual(len(arts), 500)
+        self.assertTrue(stats["statuses"][200] > 5)
+
+
+    def testThrottling(self):
+        server = StubServer(maxConcurrentRequests = 2, latency = 0.05).start()
+        try:
+            er = self.createClient(server, concurrency = AdaptiveConcurrencyLimiter(initialLimit = 4, minLimit = 4, maxLimit = 4))
+            results = []
+            threads = [threading.Thread(target = lambda: results.append(er.execQuery(QueryArticles(keywords = "obama")))) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            stats = server.getStats()
+        finally:
+            server.stop()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(stats["statuses"][200], 4)
+        self.assertTrue(stats["statuses"].get(429, 0) > 0)
+
+
+    def testRateLimit(self):
+        server = StubServer(maxRequestsPerSecond = 5).start()
+        try:
+            er = self.createClient(server)
+            for i in range(8):
+                er.execQuery(QueryArticles(keywords = "obama"))
+            stats = server.getStats()
+        finally:
+            server.stop()
+        self.assertEqual(stats["statuses"][200], 8)
+        self.assertTrue(stats["statuses"].get(429, 0) > 0)
+
+
+    def testLatency(self):
+        server = StubServer(latency = lognormalLatency(0.05, sigma = 0.1)).start()
+        try:
+            startTime = time.time()
+            self.createClient(server).execQuery(QueryArticles(keywords = "obama"))
+            self.assertTrue(time.time() - startTime >= 0.03)
+        finally:
+            server.stop()
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestStubServer)
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestStubServerFaults))
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,98 @@
+"""
+test tracking of the token spending and throttling of the requests by the TokenBudgetManager
+"""
+import unittest, time, threading
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestTokenBudget(unittest.TestCase):
+
+    def testSpendPerJob(self):
+        budget = TokenBudgetManager(resyncInterval = None, throttleDelay = 0)
+        er = createEventRegistry(FakeSession(10, tokens = "3"), tokenBudget = budget)
+        with RequestContext(jobId = "export"):
+            er.execQuery(QueryArticles(keywords = "obama"))
+            er.execQuery(QueryArticles(keywords = "trump"))
+        er.execQuery(QueryArticles(keywords = "merkel"))
+        self.assertEqual(budget.getJobSpend("export"), 6)
+        self.assertEqual(budget.getJobSpend(), { "export": 6, None: 3 })
+        self.assertEqual(budget.getRemainingTokens(), 900)
+        self.assertEqual(budget.getDailyTokens(), 1000)
+        self.assertTrue(budget.getSpendRate() > 0)
+
+
+    def testPauseLowPriority(self):
+        budget = TokenBudgetManager(resyncInterval = None, maxPauseSeconds = 0, throttleDelay = 0)
+        # only 100 of 1000 tokens remaining - below the reserve for backfill jobs
+        er = createEventRegistry(FakeSession(10, remaining = "100"), tokenBudget = budget)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        with RequestContext(jobId = "backfill", priority = "backfill"):
+            self.assertRaises(TokenBudgetExceededError, er.execQuery, QueryArticles(keywords = "obama"))
+        with RequestContext(jobId = "lookup", priority = "interactive"):
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(budget.getJobSpend("backfill"), 0)
+        self.assertEqual(budget.getJobSpend("lookup"), 1)
+
+
+    def testPauseStopsAtDeadline(self):
+        # the request would be paused indefinitely, but it gives up at the deadline or when cancelled
+        budget = TokenBudgetManager(resyncInterval = None, pauseCheckInterval = 60, throttleDelay = 0)
+        er = createEventRegistry(FakeSession(10, remaining = "100"), tokenBudget = budget)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        startTime = time.time()
+        with RequestContext(priority = "backfill", timeout = 0.2):
+            self.assertRaises(RequestTimeoutError, er.execQuery, QueryArticles(keywords = "obama"))
+        erWithTimeout = createEventRegistry(FakeSession(10, remaining = "100"), tokenBudget = budget, callTimeout = 0.2)
+        with RequestContext(priority = "backfill"):
+            self.assertRaises(RequestTimeoutError, erWithTimeout.execQuery, QueryArticles(keywords = "obama"))
+        with RequestContext(priority = "backfill") as context:
+            threading.Timer(0.2, context.cancel).start()
+            self.assertRaises(RequestCancelledError, er.execQuery, QueryArticles(keywords = "obama"))
+        self.assertTrue(time.time() - startTime < 5)
+
+
+    def testDegradeWhenTight(self):
+        budget = TokenBudgetManager(resyncInterval = None, throttleDelay = 0, degradeReturnInfo = True, degradedBodyLen = 200)
+        # 70 tokens left is above the reserve for feed jobs (50) but within the throttle margin
+        session = FakeSession(10, remaining = "70")
+        er = createEventRegistry(session, tokenBudget = budget)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(session.sentParams[-1]["articleBodyLen"], 200)
+
+
+    def testResync(self):
+        budget = TokenBudgetManager(resyncInterval = 600)
+        session = FakeSession(10, pathResponses = { "/api/v1/usage": { "availableTokens": 5000, "usedTokens": 1000 } })
+        er = createEventRegistry(session, tokenBudget = budget)
+        budget.resync(er)
+        self.assertEqual(budget.getDailyTokens(), 5000)
+        self.assertEqual(budget.getRemainingTokens(), 4000)
+
+
+    def testResyncFailureLogged(self):
+        budget = TokenBudgetManager(resyncInterval = 600)
+        er = createEventRegistry(FakeSession(10))
+        def getUsageInfo():
+            raise Exception("usage not available")
+        er.getUsageInfo = getUsageInfo
+        with self.assertLogs("eventregistry.TokenBudget", level = "WARNING") as logs:
+            budget.resync(er)
+        self.assertTrue("usage not available" in logs.output[0])
+
+
+    def testRequestContext(self):
+        self.assertEqual(RequestContext.getCurrent().priority, "feed")
+        with RequestContext(jobId = "a", priority = "interactive"):
+            with RequestContext(jobId = "b", priority = "backfill"):
+                self.assertEqual(RequestContext.getCurrent().jobId, "b")
+            self.assertEqual(RequestContext.getCurrent().jobId, "a")
+        self.assertIsNone(RequestContext.getCurrent().jobId)
+        self.assertRaises(AssertionError, RequestContext, priority = "urgent")
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTokenBudget)
+    unittest.TextTestRunner(verbosity=3).run(suite)
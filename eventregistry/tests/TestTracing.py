@@ -0,0 +1,93 @@
+"""
+test the tracing of the queries, pages and request attempts
+"""
+import unittest, os, json, shutil, tempfile
+from eventregistry import *
+from eventregistry.Tracing import noopSpan
+from eventregistry.tests.FakeSession import FakeSession, createEventRegistry
+
+
+class TestTracing(unittest.TestCase):
+
+    def testIteratorSpans(self):
+        exporter = ChromeTraceExporter()
+        # 2 pages of results, where the first request fails without a response
+        er = createEventRegistry(FakeSession(20, pages = 2, failCount = 1), retryDelay = 0, tracer = Tracer(exporter))
+        list(QueryArticlesIter(keywords = "obama").execQuery(er))
+        events = exporter.getEvents()
+        byId = dict((event["args"]["spanId"], event) for event in events)
+        pages = [event for event in events if event["name"] == "iteratorPage"]
+        self.assertEqual([page["args"]["page"] for page in pages], [1, 2])
+        queries = [event for event in events if event["name"] == "execQuery"]
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(byId[queries[0]["args"]["parentId"]]["name"], "iteratorPage")
+        self.assertEqual(len(queries[0]["args"]["fingerprint"]), 40)
+        attempts = [event for event in events if event["name"] == "attempt"]
+        self.assertEqual([attempt["args"]["attempt"] for attempt in attempts], [1, 2, 1])
+        self.assertEqual(attempts[0]["args"]["error"], "Connection refused")
+        self.assertEqual(attempts[1]["args"]["status"], 200)
+        # the request spans are children of the query
+        for name in ["attempt", "decode", "wait"]:
+            for event in events:
+                if event["name"] == name:
+                    self.assertEqual(byId[event["args"]["parentId"]]["name"], "execQuery")
+        waits = set(event["args"]["reason"] for event in events if event["name"] == "wait")
+        self.assertEqual(waits, set(["rate", "lock"]))
+        # the spans of a page are contained within it
+        for event in events:
+            if event["args"]["traceId"] == pages[0]["args"]["spanId"]:
+                self.assertTrue(event["ts"] >= pages[0]["ts"])
+                self.assertTrue(event["ts"] + event["dur"] <= pages[0]["ts"] + pages[0]["dur"] + 1)
+
+
+    def testUserSpans(self):
+        exporter = ChromeTraceExporter()
+        tracer = Tracer(exporter)
+        er = createEventRegistry(FakeSession(10), tracer = tracer)
+        with tracer.span("export", jobId = 12) as span:
+            er.execQuery(QueryArticles(keywords = "obama"))
+        self.assertEqual(tracer.getCurrentSpan(), None)
+        events = dict((event["name"], event) for event in exporter.getEvents())
+        self.assertEqual(events["execQuery"]["args"]["parentId"], span.spanId)
+        self.assertEqual(events["export"]["args"]["jobId"], 12)
+
+
+    def testErrorRecorded(self):
+        exporter = ChromeTraceExporter()
+        tracer = Tracer(exporter)
+        try:
+            with tracer.span("failing"):
+                raise ValueError("invalid value")
+        except ValueError:
+            pass
+        self.assertEqual(exporter.getEvents()[0]["args"]["error"], "invalid value")
+
+
+    def testChromeTraceFile(self):
+        dirName = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(dirName, "trace.json")
+            exporter = ChromeTraceExporter(fileName, maxEvents = 2)
+            tracer = Tracer(exporter)
+            for i in range(3):
+                with tracer.span("page", page = i):
+                    pass
+            exporter.flush()
+            with open(fileName) as f:
+                trace = json.load(f)
+            self.assertEqual([event["args"]["page"] for event in trace["traceEvents"]], [0, 1])
+            self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+            self.assertEqual(trace["otherData"]["droppedSpans"], 1)
+        finally:
+            shutil.rmtree(dirName)
+
+
+    def testNoTracer(self):
+        er = EventRegistry(apiKey = "key", minDelayBetweenRequests = 0, versionCheck = False)
+        self.assertTrue(er._span("execQuery") is noopSpan)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTracing)
+    unittest.TextTestRunner(verbosity=3).run(suite)
@@ -0,0 +1,96 @@
+"""
+test the pluggable transports used to send the requests
+"""
+import unittest, threading, warnings
+from eventregistry import *
+from eventregistry.tests.FakeSession import FakeSession
+from eventregistry.benchmarks.BenchTransport import LocalServer
+
+try:
+    import httpx, h2
+    http2Available = True
+except ImportError:
+    http2Available = False
+
+
+class FakeTransport(Transport):
+    """transport whose sessions all record the requests in the same FakeSession"""
+    def __init__(self):
+        self.session = FakeSession(10, pathResponses = { "/api/v1/annotate": { "annotations": [] } })
+        self.sessionCount = 0
+
+    def newSession(self):
+        self.sessionCount += 1
+        return self.session
+
+
+class TestTransport(unittest.TestCase):
+
+    def testDefaultTransport(self):
+        er = EventRegistry(apiKey = "key", versionCheck = False)
+        self.assertTrue(isinstance(er.getTransport(), RequestsTransport))
+
+
+    def testCustomTransport(self):
+        transport = FakeTransport()
+        er = EventRegistry(apiKey = "key", host = "http://host1", hostAnalytics = "http://host2", minDelayBetweenRequests = 0, versionCheck = False, transport = transport)
+        er.execQuery(QueryArticles(keywords = "obama"))
+        er.jsonRequestAnalytics("/api/v1/annotate", { "text": "test" })
+        self.assertEqual(transport.session.urls, ["http://host1/api/v1/article", "http://host2/api/v1/annotate"])
+
+
+    def testParallelSessionsFromTransport(self):
+        transport = FakeTransport()
+        er = EventRegistry(apiKey = "key", minDelayBetweenRequests = 0, versionCheck = False, transport = transport, concurrency = True)
+        count = transport.sessionCount
+        threads = [threading.Thread(target = er.execQuery, args = (QueryArticles(keywords = "obama"),)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # each thread gets its own session from the transport
+        self.assertEqual(transport.sessionCount, count + 3)
+        self.assertEqual(len(transport.session.urls), 3)
+
+
+    @unittest.skipIf(not http2Available, "httpx or h2 is not installed")
+    def testHttp2Multiplexing(self):
+        server = LocalServer(latency = 0.05, connectDelay = 0).start()
+        transport = Http2Transport(maxConnections = 1, priorKnowledge = True)
+        er = EventRegistry(apiKey = "key", host = server.host, minDelayBetweenRequests = 0, versionCheck = False, transport = transport,
+            concurrency = AdaptiveConcurrencyLimiter(initialLimit = 8, minLimit = 8, maxLimit = 8))
+        results = []
+        threads = [threading.Thread(target = lambda: results.append(er.execQuery(QueryArticles(keywords = "obama")))) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        transport.close()
+        server.stop()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(results[0]["articles"]["totalResults"], 100)
+        # all concurrent requests were sent over a single connection
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(server.requests, 8)
+
+
+    @unittest.skipIf(not http2Available, "httpx or h2 is not installed")
+    def testHttp2CompressedBody(self):
+        server = LocalServer(latency = 0, connectDelay = 0).start()
+        transport = Http2Transport(maxConnections = 1, priorKnowledge = True)
+        er = EventRegistry(apiKey = "key", host = server.host, minDelayBetweenRequests = 0, versionCheck = False, transport = transport,
+            compression = RequestCompression(minSize = 100), repeatFailedRequestCount = 1)
+        # the compressed body is passed to httpx as content (sending it as data is deprecated)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            res = er.execQuery(QueryArticles.initWithArticleUriList(["%d" % (1000000000 + i) for i in range(100)]))
+        transport.close()
+        server.stop()
+        self.assertEqual(res["articles"]["totalResults"], 100)
+        self.assertEqual(er.getCompression().getStats()["compressed"], 1)
+
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTransport)
+    unittest.TextTestRunner(verbosity=3).run(suite)
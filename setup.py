@@ -30,7 +30,10 @@ setup(name='eventregistry',
       author = 'Gregor Leban',
       author_email = 'gregor@eventregistry.org',
       license = 'MIT',
-      packages = ['eventregistry'],
+      packages = ['eventregistry', 'eventregistry.benchmarks'],
+      package_data = {
+          'eventregistry.benchmarks': ['*.json']
+      },
       install_requires = [
           'requests', 'six', 'pytz'
       ],